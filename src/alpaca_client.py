@@ -1,39 +1,203 @@
-from alpaca.trading.client import TradingClient
-from alpaca.trading.requests import MarketOrderRequest
-from alpaca.trading.enums import OrderSide, TimeInForce
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from alpaca.trading.requests import GetOrdersRequest, MarketOrderRequest
+from alpaca.trading.enums import OrderSide, QueryOrderStatus, TimeInForce
 from alpaca.common.exceptions import APIError
 from typing import Optional
 
 from .config import settings
+from .clients import get_trading_client
+from .order_dispatch import is_bot_order
+
+
+# Alpaca returns at most this many orders per request
+ORDERS_PAGE_LIMIT = 500
+
+
+def _float(value, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _side(value) -> str:
+    return str(getattr(value, "value", value)).lower()
+
+
+@dataclass
+class BrokerSnapshot:
+    """
+    What the account holds, taken once per trading run:
+    - positions: symbol → market value in USD (negative for shorts)
+    - qty / prices: symbol → shares held / current price
+    - pending:   symbol → unfilled notional of open orders (buys +, sells −)
+    - own_pending: symbol → full value of the bot's own open orders
+                 (filled part included: fills only reach the position
+                 ledger once the order is closed); own_open: their order ids
+    - busy:      symbols with open qty-based orders we can't value; they are
+                 left alone until those orders are done
+    """
+    positions: dict[str, float] = field(default_factory=dict)
+    qty: dict[str, float] = field(default_factory=dict)
+    prices: dict[str, float] = field(default_factory=dict)
+    pending: dict[str, float] = field(default_factory=dict)
+    own_pending: dict[str, float] = field(default_factory=dict)
+    own_open: set[str] = field(default_factory=set)
+    busy: set[str] = field(default_factory=set)
+    n_open_orders: int = 0
+    taken_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def holdings(self) -> dict[str, float]:
+        """Positions plus what open orders will add (so a rerun doesn't buy twice)."""
+        out = dict(self.positions)
+        for sym, value in self.pending.items():
+            out[sym] = out.get(sym, 0.0) + value
+        return out
 
 
 class AlpacaWrapper:
-    def __init__(self):
-        # If settings.env == "live", we go live; otherwise paper
-        self.client = TradingClient(
-            api_key=settings.api_key,
-            secret_key=settings.api_secret,
-            paper=(settings.env != "live"),
-        )
+    def __init__(self, client=None, account_ttl_s: Optional[float] = None):
+        # TradingClient (paper unless settings.env == "live") or an injected stand-in
+        self.client = client if client is not None else get_trading_client()
+        self.account_ttl_s = settings.account_ttl_s if account_ttl_s is None else account_ttl_s
+        self._account = None
+        self._account_at = 0.0
+        self._account_lock = threading.Lock()
+        self._snapshot: Optional[BrokerSnapshot] = None
+        self._snapshot_lock = threading.Lock()
+
+    def account(self, refresh: bool = False):
+        """
+        Account snapshot, cached for account_ttl_s seconds.
+        Invalidated after every order submission.
+        """
+        with self._account_lock:
+            now = time.monotonic()
+            if refresh or self._account is None or now - self._account_at > self.account_ttl_s:
+                self._account = self.client.get_account()
+                self._account_at = now
+            return self._account
 
-    def account(self):
-        return self.client.get_account()
+    def invalidate_account(self):
+        with self._account_lock:
+            self._account = None
+
+    def get_all_positions(self) -> list:
+        """All open positions, in one request."""
+        return self.client.get_all_positions()
+
+    def get_open_orders(self) -> list:
+        """All open (unfilled / partially filled) orders, newest first, paging past ORDERS_PAGE_LIMIT."""
+        return self._paged_orders(QueryOrderStatus.OPEN)
+
+    def get_closed_orders(self, after: Optional[datetime] = None) -> list:
+        """Closed orders (filled, canceled, expired, ...) submitted after `after`, newest first."""
+        return self._paged_orders(QueryOrderStatus.CLOSED, after=after)
+
+    def _paged_orders(self, status, after: Optional[datetime] = None) -> list:
+        orders, until = {}, None
+        while True:
+            page = self.client.get_orders(
+                filter=GetOrdersRequest(status=status, limit=ORDERS_PAGE_LIMIT, after=after, until=until)
+            )
+            new = [o for o in page if o.id not in orders]  # `until` may be inclusive
+            orders.update((o.id, o) for o in new)
+            if len(page) < ORDERS_PAGE_LIMIT or not new:
+                return list(orders.values())
+            until = page[-1].submitted_at
+
+    def snapshot(self, refresh: bool = False) -> BrokerSnapshot:
+        """
+        Positions and open orders, fetched together (2 requests) and kept
+        until refresh=True or the next order submission.
+        """
+        with self._snapshot_lock:
+            if refresh or self._snapshot is None:
+                # open orders first: an order that closes in between is then in the
+                # positions, never in neither (position_ledger relies on this)
+                open_orders = self.get_open_orders()
+                positions = self.get_all_positions()
+
+                snap = BrokerSnapshot(n_open_orders=len(open_orders))
+                prices = snap.prices
+                for p in positions:
+                    snap.positions[p.symbol] = _float(p.market_value)
+                    snap.qty[p.symbol] = _float(p.qty)
+                    prices[p.symbol] = _float(getattr(p, "current_price", None))
+                for o in open_orders:
+                    sign = 1.0 if _side(o.side) == "buy" else -1.0
+                    filled = _float(o.filled_qty) * _float(o.filled_avg_price)
+                    if o.notional is not None:
+                        total = _float(o.notional)
+                    elif prices.get(o.symbol):
+                        total = _float(o.qty) * prices[o.symbol]
+                    else:
+                        snap.busy.add(o.symbol)
+                        continue
+                    snap.pending[o.symbol] = snap.pending.get(o.symbol, 0.0) + sign * max(total - filled, 0.0)
+                    if is_bot_order(o):
+                        snap.own_pending[o.symbol] = snap.own_pending.get(o.symbol, 0.0) + sign * total
+                        snap.own_open.add(str(o.id))
+                self._snapshot = snap
+            return self._snapshot
+
+    def invalidate_snapshot(self):
+        with self._snapshot_lock:
+            self._snapshot = None
 
     def is_trading_blocked(self) -> bool:
         acc = self.account()
         return bool(acc.trading_blocked)
 
-    def submit_market_order(self, symbol: str, side: str, notional_usd: float):
+    def submit_market_order(
+        self,
+        symbol: str,
+        side: str,
+        notional_usd: Optional[float] = None,
+        client_order_id: Optional[str] = None,
+        qty: Optional[float] = None,
+    ):
         """
         side: 'buy' or 'sell'
         notional_usd: dollar value to trade
+        qty: shares to trade instead of a dollar value (full exits, so the
+             sell matches what is held whatever the price does meanwhile)
+        client_order_id: optional idempotency key (Alpaca rejects a second order with the same id)
         """
         side_enum = OrderSide.BUY if side.lower() == "buy" else OrderSide.SELL
 
         req = MarketOrderRequest(
             symbol=symbol,
-            notional=notional_usd,
+            notional=None if qty is not None else notional_usd,
+            qty=qty,
             side=side_enum,
             time_in_force=TimeInForce.DAY,
+            client_order_id=client_order_id,
         )
-        return self.client.submit_order(order_data=req)
+        try:
+            return self.client.submit_order(order_data=req)
+        finally:
+            # cash / buying power / holdings change even if the response was lost
+            self.invalidate_account()
+            self.invalidate_snapshot()
+
+    def get_order_by_client_id(self, client_order_id: str):
+        return self.client.get_order_by_client_id(client_order_id)
+
+
+_WRAPPER: Optional[AlpacaWrapper] = None
+_WRAPPER_LOCK = threading.Lock()
+
+
+def get_alpaca() -> AlpacaWrapper:
+    """Process-wide AlpacaWrapper around the registered trading client."""
+    global _WRAPPER
+    client = get_trading_client()
+    with _WRAPPER_LOCK:
+        if _WRAPPER is None or _WRAPPER.client is not client:
+            _WRAPPER = AlpacaWrapper(client=client)
+        return _WRAPPER
@@ -1,10 +1,22 @@
 # src/audit_utils.py
 from pathlib import Path
 from datetime import datetime
-import pandas as pd
+
+from .event_sink import get_sink
 
 AUDIT_FILE = Path("reports/data_audit_log.csv")
 
+AUDIT_FIELDS = [
+    "run_id",
+    "portfolio",
+    "symbols",
+    "n_symbols",
+    "n_success",
+    "n_failed",
+    "started_at",
+    "finished_at",
+]
+
 def record_data_run(
     run_id: str,
     portfolio: str,
@@ -14,8 +26,6 @@ def record_data_run(
     started_at: datetime,
     finished_at: datetime,
 ):
-    AUDIT_FILE.parent.mkdir(parents=True, exist_ok=True)
-
     row = {
         "run_id": run_id,
         "portfolio": portfolio,
@@ -27,11 +37,8 @@ def record_data_run(
         "finished_at": finished_at.isoformat(),
     }
 
-    if AUDIT_FILE.exists():
-        df = pd.read_csv(AUDIT_FILE)
-        df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
-    else:
-        df = pd.DataFrame([row])
-
-    df.to_csv(AUDIT_FILE, index=False)
+    # appended under a file lock (event_sink), no read-concat-rewrite
+    sink = get_sink(AUDIT_FILE, AUDIT_FIELDS)
+    sink.write(row)
+    sink.flush()
     print(f"✅ Audit updated → {AUDIT_FILE}")
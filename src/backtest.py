@@ -0,0 +1,335 @@
+# src/backtest.py
+"""
+Walk-forward backtest of the ARIMA signal strategy.
+
+1) Forecasts: for every symbol, refit the model every `refit_every` days on
+   a rolling `window` (or expanding, window=None) and produce one-step-ahead
+   forecasts for the following days with the params held fixed (Kalman
+   filter, no re-optimization). Symbols run on a process pool and each
+   symbol's forecast vector is cached on disk, keyed by a hash of its
+   returns and the model/schedule settings. Returns come from one
+   memory-mapped UniversePanel (panel.py) that the workers map as well.
+2) Accounting: forecasts, signals (classify_signal thresholds), weights,
+   P&L, turnover, hit rate and drawdown are computed as (dates × symbols)
+   NumPy arrays — no Python loops over days or symbols.
+
+Usage:
+    python -m src.backtest --portfolio TIER1 --refit-every 21 --window 500
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .bar_store import get_bar_store
+from .config import PROJECT_ROOT
+from .config_strategy import PORTFOLIOS, UP_THRESHOLD, DOWN_THRESHOLD, AR_FIT_METHOD
+from .modeling_ar import fit_ar, is_ar_order
+from .modeling_arima import build_model
+from .logging_utils import init_worker_logging, worker_logging_args
+from .panel import UniversePanel, get_panel, valid_values
+from .signal_engine import open_mmap
+
+REPORTS_DIR = PROJECT_ROOT / "reports"
+CACHE_DIR = PROJECT_ROOT / "data" / "cache" / "backtest"
+TRADING_DAYS = 252
+
+
+# --- walk-forward forecasts -------------------------------------------------
+
+def _refit_points(n: int, min_train: int, refit_every: int) -> range:
+    return range(min_train, n, refit_every)
+
+
+def walk_forward_arima(y: np.ndarray, order, refit_every: int, window: int | None, min_train: int) -> np.ndarray:
+    """forecast[t] = E[y_t | y_<t], NaN before min_train. Params are refit every refit_every points."""
+    n = len(y)
+    out = np.full(n, np.nan)
+    params = None
+    for k in _refit_points(n, min_train, refit_every):
+        start = 0 if window is None else max(0, k - window)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            try:
+                res = build_model(y[start:k], order).fit(start_params=params)
+                params = np.asarray(res.params)
+            except Exception:
+                if params is None:
+                    continue
+            end = min(n, k + refit_every)
+            # one-step predictions over [start, end) with fixed params; keep [k, end)
+            filt = build_model(y[start:end], order).filter(params)
+            out[k:end] = np.asarray(filt.predict())[k - start:end - start]
+    return out
+
+
+def walk_forward_ar(y: np.ndarray, order, refit_every: int, window: int | None, min_train: int) -> np.ndarray:
+    """Same as walk_forward_arima for pure AR(p) orders, via closed-form fits (d must be 0)."""
+    p, d, _ = (int(o) for o in order)
+    if d != 0:
+        raise ValueError("walk_forward_ar supports d=0 only")
+    n = len(y)
+    out = np.full(n, np.nan)
+    ks = list(_refit_points(n, min_train, refit_every))
+    if not ks:
+        return out
+    if p == 0:
+        out[min_train:] = 0.0
+        return out
+
+    # one stacked fit per refit point: rows are the training windows
+    T = max(k - (0 if window is None else max(0, k - window)) for k in ks)
+    Y = np.full((len(ks), T), np.nan)
+    for i, k in enumerate(ks):
+        seg = y[(0 if window is None else max(0, k - window)):k]
+        Y[i, T - len(seg):] = seg
+    phi = fit_ar(Y, p, method=AR_FIT_METHOD)  # (n_refits, p)
+
+    # lag matrix: L[t, j] = y[t-1-j]
+    L = np.full((n, p), np.nan)
+    for j in range(p):
+        L[1 + j:, j] = y[:n - 1 - j]
+    block = np.repeat(np.arange(len(ks)), refit_every)[: n - min_train]
+    out[min_train:] = np.einsum("tp,tp->t", L[min_train:], phi[block])
+    return out
+
+
+def _forecast_task(path: str, col: int, order, backend: str, refit_every: int,
+                   window: int | None, min_train: int) -> np.ndarray:
+    y = np.array(valid_values(open_mmap(path)[:, col]), dtype="float64")
+    if backend == "ar" and is_ar_order(order) and int(order[1]) == 0:
+        return walk_forward_ar(y, order, refit_every, window, min_train)
+    return walk_forward_arima(y, order, refit_every, window, min_train)
+
+
+def _cache_key(y: np.ndarray, order, backend: str, refit_every: int, window: int | None, min_train: int) -> str:
+    h = hashlib.sha1(np.ascontiguousarray(y, dtype="float64").tobytes())
+    h.update(json.dumps([list(order), backend, refit_every, window, min_train]).encode())
+    return h.hexdigest()
+
+
+def walk_forward_forecasts(
+    panel: UniversePanel,
+    orders: dict[str, tuple],
+    backends: dict[str, str],
+    refit_every: int = 21,
+    window: int | None = 500,
+    min_train: int = 250,
+    workers: int | None = None,
+    cache_dir: Path | None = CACHE_DIR,
+) -> dict[str, np.ndarray]:
+    """Walk-forward one-step forecasts for every panel symbol, on its rows (cached, parallel over symbols)."""
+    out: dict[str, np.ndarray] = {}
+    todo = []
+    keys = {}
+    for sym in panel.symbols:
+        keys[sym] = _cache_key(panel.series(sym), orders[sym], backends[sym], refit_every, window, min_train)
+        cached = None if cache_dir is None else cache_dir / f"{keys[sym]}.npy"
+        if cached is not None and cached.exists():
+            out[sym] = np.load(cached)
+        else:
+            todo.append(sym)
+
+    if todo:
+        with tempfile.TemporaryDirectory(prefix="backtest_", ignore_cleanup_errors=True) as tmp, \
+                ProcessPoolExecutor(
+                    max_workers=workers or os.cpu_count() or 1,
+                    initializer=init_worker_logging,
+                    initargs=worker_logging_args(),
+                ) as pool:
+            if panel.path is None:
+                panel = panel.save(Path(tmp) / "panel")
+            path = str(panel.values_path)
+            futures = {
+                sym: pool.submit(
+                    _forecast_task, path, panel.column(sym),
+                    orders[sym], backends[sym], refit_every, window, min_train,
+                )
+                for sym in todo
+            }
+            for sym, fut in futures.items():
+                out[sym] = fut.result()
+                if cache_dir is not None:
+                    cache_dir.mkdir(parents=True, exist_ok=True)
+                    np.save(cache_dir / f"{keys[sym]}.npy", out[sym])
+
+    return {sym: out[sym] for sym in panel.symbols}
+
+
+# --- vectorized accounting --------------------------------------------------
+
+def signals_from_forecasts(F: np.ndarray, up: float = UP_THRESHOLD, down: float = DOWN_THRESHOLD,
+                           allow_short: bool = False) -> np.ndarray:
+    """+1 long / -1 short / 0 flat, same thresholds as classify_signal."""
+    S = np.where(F > up, 1.0, 0.0)
+    if allow_short:
+        S = np.where(F < down, -1.0, S)
+    return np.where(np.isnan(F), 0.0, S)
+
+
+def run_accounting(R: np.ndarray, S: np.ndarray, weighting: str = "fixed", cost_bps: float = 0.0) -> dict:
+    """
+    R, S: (dates × symbols). Position on day t is decided from forecasts made
+    with data up to t-1, so S[t] earns R[t].
+
+    weighting: "fixed"      → each signal gets 1/n_symbols of capital (like $notional per signal)
+               "normalized" → active signals share 100% of capital equally
+    """
+    n_sym = R.shape[1]
+    if weighting == "fixed":
+        W = S / max(n_sym, 1)
+    elif weighting == "normalized":
+        active = np.abs(S).sum(axis=1, keepdims=True)
+        W = np.divide(S, active, out=np.zeros_like(S), where=active > 0)
+    else:
+        raise ValueError(f"Unknown weighting: {weighting}")
+
+    Rz = np.nan_to_num(R)
+    gross_pnl = (W * Rz).sum(axis=1)
+    turnover = np.abs(np.diff(W, axis=0, prepend=np.zeros((1, n_sym)))).sum(axis=1)
+    pnl = gross_pnl - turnover * cost_bps / 1e4
+
+    equity = np.cumprod(1.0 + pnl)
+    drawdown = equity / np.maximum.accumulate(equity) - 1.0
+
+    active = (S != 0) & ~np.isnan(R)
+    hits = (np.sign(Rz) == S) & active
+    n_active = int(active.sum())
+
+    return {
+        "pnl": pnl,
+        "equity": equity,
+        "drawdown": drawdown,
+        "turnover": turnover,
+        "n_long": (S > 0).sum(axis=1),
+        "n_short": (S < 0).sum(axis=1),
+        "hit_rate": float(hits.sum() / n_active) if n_active else float("nan"),
+        "n_active": n_active,
+    }
+
+
+def summarize(acct: dict) -> dict:
+    pnl = acct["pnl"]
+    n = len(pnl)
+    total = float(acct["equity"][-1] - 1.0) if n else 0.0
+    vol = float(np.std(pnl) * np.sqrt(TRADING_DAYS)) if n else 0.0
+    ann = float((1.0 + total) ** (TRADING_DAYS / n) - 1.0) if n else 0.0
+    return {
+        "days": n,
+        "total_return": total,
+        "annual_return": ann,
+        "annual_vol": vol,
+        "sharpe": float(np.mean(pnl) / np.std(pnl) * np.sqrt(TRADING_DAYS)) if n and np.std(pnl) > 0 else 0.0,
+        "max_drawdown": float(acct["drawdown"].min()) if n else 0.0,
+        "avg_daily_turnover": float(acct["turnover"].mean()) if n else 0.0,
+        "hit_rate": acct["hit_rate"],
+        "position_days": acct["n_active"],
+    }
+
+
+def run_backtest(
+    portfolio: str,
+    refit_every: int = 21,
+    window: int | None = 500,
+    min_train: int = 250,
+    start: str | None = None,
+    allow_short: bool = False,
+    weighting: str = "fixed",
+    cost_bps: float = 0.0,
+    workers: int | None = None,
+    timeframe: str = "1Day",
+    store=None,
+    cache_dir: Path | None = CACHE_DIR,
+) -> tuple[pd.DataFrame, dict]:
+    from .generate_signals import model_backend_for
+    from .order_registry import get_order_registry
+
+    symbols = PORTFOLIOS[portfolio]
+    store = store or get_bar_store()
+    panel = get_panel(store, symbols, timeframe, field="return", mmap=True)
+    dates, R = panel.dates, np.asarray(panel.values, dtype="float64")
+    orders = get_order_registry().orders_for(symbols, portfolio=portfolio)
+    backends = {sym: model_backend_for(sym, orders[sym]) for sym in symbols}
+
+    fc = walk_forward_forecasts(panel, orders, backends, refit_every, window, min_train, workers, cache_dir)
+
+    # place each symbol's forecasts on the common date index
+    F = np.full_like(R, np.nan)
+    for j, sym in enumerate(symbols):
+        F[panel.rows(sym), j] = fc[sym]
+
+    keep = np.ones(len(dates), dtype=bool) if start is None else (dates >= pd.Timestamp(start, tz="UTC"))
+    keep &= ~np.isnan(F).all(axis=1)
+    S = signals_from_forecasts(F[keep], allow_short=allow_short)
+    acct = run_accounting(R[keep], S, weighting=weighting, cost_bps=cost_bps)
+
+    daily = pd.DataFrame(
+        {
+            "ts": dates[keep],
+            "pnl": acct["pnl"],
+            "equity": acct["equity"],
+            "drawdown": acct["drawdown"],
+            "turnover": acct["turnover"],
+            "n_long": acct["n_long"],
+            "n_short": acct["n_short"],
+        }
+    )
+    summary = {
+        "portfolio": portfolio,
+        "refit_every": refit_every,
+        "window": window,
+        "allow_short": allow_short,
+        "weighting": weighting,
+        "cost_bps": cost_bps,
+        **summarize(acct),
+    }
+    return daily, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the ARIMA signal strategy")
+    parser.add_argument("--portfolio", default="TIER1", choices=list(PORTFOLIOS))
+    parser.add_argument("--refit-every", type=int, default=21, help="Trading days between refits")
+    parser.add_argument("--window", type=int, default=500, help="Rolling fit window (0 = expanding)")
+    parser.add_argument("--min-train", type=int, default=250)
+    parser.add_argument("--start", default=None, help="First date to trade (YYYY-MM-DD)")
+    parser.add_argument("--allow-short", action="store_true")
+    parser.add_argument("--weighting", default="fixed", choices=["fixed", "normalized"])
+    parser.add_argument("--cost-bps", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    daily, summary = run_backtest(
+        args.portfolio,
+        refit_every=args.refit_every,
+        window=args.window or None,
+        min_train=args.min_train,
+        start=args.start,
+        allow_short=args.allow_short,
+        weighting=args.weighting,
+        cost_bps=args.cost_bps,
+        workers=args.workers,
+    )
+
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    out_path = REPORTS_DIR / f"backtest_{args.portfolio}.csv"
+    daily.to_csv(out_path, index=False)
+    with (REPORTS_DIR / f"backtest_{args.portfolio}_summary.json").open("w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+    for k, v in summary.items():
+        print(f"{k:>20}: {v}")
+    print(f"Saved daily results → {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# src/bar_index.py
+"""
+Persistent metadata index for a bar store (a JSON manifest next to the data).
+
+One entry per stored series (symbol/timeframe/kind):
+- last_ts       → newest timestamp (ISO, UTC)
+- rows          → row count
+- content_hash  → order-independent hash of all rows, updated incrementally
+                  on append (sum of per-row hashes mod 2**64)
+- mtime_ns/size → stat of the backing file; a mismatch marks the entry stale
+                  (e.g. a CSV rewritten by a notebook outside the store)
+
+The manifest is cached in memory and reloaded only when it changes on disk.
+Writes merge with the on-disk copy under a file lock and are swapped in with
+os.replace, so concurrent processes never see a half-written index.
+Use `with index.batch():` to defer the flush to the end of a bulk update.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .file_lock import file_lock
+
+_HASH_MASK = (1 << 64) - 1
+
+
+def frame_hash(df: pd.DataFrame) -> int:
+    """Order-independent 64-bit content hash of a frame's rows."""
+    if df is None or df.empty:
+        return 0
+    norm = {}
+    for c in sorted(df.columns):
+        col = df[c]
+        if c == "ts":
+            col = pd.to_datetime(col, utc=True).astype("int64")
+        elif pd.api.types.is_numeric_dtype(col):
+            col = col.astype("float64")
+        norm[c] = col.to_numpy()
+    # built in one go: column-by-column inserts dominated small (streamed) appends
+    norm = pd.DataFrame(norm, copy=False)
+    row_hashes = pd.util.hash_pandas_object(norm, index=False).to_numpy(dtype=np.uint64)
+    return int(row_hashes.sum(dtype=np.uint64))
+
+
+def combine_hash(a: int, b: int) -> int:
+    return (a + b) & _HASH_MASK
+
+
+def _stat(path: Path) -> tuple[int, int] | None:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class BarIndex:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self._lock = threading.RLock()
+        self._entries: dict[str, dict] = {}
+        self._loaded_stat: tuple[int, int] | None = None
+        self._dirty: set[str] = set()
+        self._batch_depth = 0
+
+    # --- persistence ---------------------------------------------------------
+
+    def _read_disk(self) -> dict[str, dict]:
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                return json.load(f).get("entries", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _maybe_reload(self):
+        st = _stat(self.path)
+        if st != self._loaded_stat:
+            disk = self._read_disk()
+            # keep our unflushed changes on top of what's on disk
+            for key in self._dirty:
+                disk[key] = self._entries[key]
+            self._entries = disk
+            self._loaded_stat = st
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            with file_lock(self.lock_path):
+                merged = self._read_disk()
+                for key in self._dirty:
+                    merged[key] = self._entries[key]
+
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+                with tmp.open("w", encoding="utf-8") as f:
+                    json.dump({"version": 1, "entries": merged}, f, indent=1, sort_keys=True)
+                os.replace(tmp, self.path)
+
+                self._entries = merged
+                self._loaded_stat = _stat(self.path)
+                self._dirty.clear()
+
+    @contextmanager
+    def batch(self):
+        """Defer flushing until the outermost batch exits."""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.flush()
+
+    # --- entries -------------------------------------------------------------
+
+    def get(self, key: str, data_path: Path | None = None) -> dict | None:
+        """Entry for key, or None if missing or stale against data_path's stat."""
+        with self._lock:
+            self._maybe_reload()
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if data_path is not None:
+            st = _stat(data_path)
+            if st is None or [entry.get("mtime_ns"), entry.get("size")] != list(st):
+                return None
+        return entry
+
+    def put(self, key: str, data_path: Path, last_ts: pd.Timestamp | None, rows: int, content_hash: int, **extra):
+        st = _stat(data_path) or (None, None)
+        entry = {
+            "last_ts": None if last_ts is None else pd.Timestamp(last_ts).isoformat(),
+            "rows": int(rows),
+            "content_hash": f"{content_hash & _HASH_MASK:016x}",
+            "mtime_ns": st[0],
+            "size": st[1],
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+            **extra,
+        }
+        with self._lock:
+            self._maybe_reload()
+            self._entries[key] = entry
+            self._dirty.add(key)
+            if self._batch_depth == 0:
+                self.flush()
+        return entry
+
+    def entries(self) -> dict[str, dict]:
+        with self._lock:
+            self._maybe_reload()
+            return dict(self._entries)
@@ -0,0 +1,694 @@
+# src/bar_store.py
+"""
+Pluggable storage for per-symbol bar and returns series.
+
+Backends:
+- "csv"     → data/{symbol}_{timeframe}.csv (+ _returns_only.csv), the original layout
+- "parquet" → data/parquet/{symbol}_{timeframe}[_returns_only]/part-00000.parquet, ...
+- "feather" → same layout as parquet, Arrow IPC part files
+
+Intraday series (timeframes.INTRADAY) are partitioned by New York trading
+date: the series path is a directory with one partition per day
+(data/SPY_1Min/2024-05-01.csv, data/parquet/SPY_1Min/date=2024-05-01/...),
+so appends only touch the current day, backfills rewrite only the days they
+change, and read(start=...) only loads the partitions it needs.
+
+Every backend supports append-only writes: bars newer than the last stored
+timestamp are appended (a new CSV tail / a new part file) without reading
+or rewriting history. Backfills and overlapping rows fall back to a full
+merge + rewrite.
+
+Each store keeps a metadata index (see bar_index.py) with the last ts,
+row count and content hash of every series, so planning an update needs
+no data reads.
+
+Long-running processes can call keep_resident(): every series read or
+written is then kept in memory, appends extend the in-memory copy, and
+reads only go to disk when the index says the data changed underneath.
+
+CLI:
+    python -m src.bar_store migrate --to parquet
+    python -m src.bar_store bench --symbols SPY QQQ
+"""
+from __future__ import annotations
+
+import argparse
+import os
+from abc import ABC, abstractmethod
+import shutil
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+
+from .config import settings, PROJECT_ROOT
+from .bar_index import BarIndex, combine_hash, frame_hash
+from .market_calendar import MARKET_TZ
+from .timeframes import is_intraday
+
+DATA_DIR = PROJECT_ROOT / "data"
+
+# kind → filename suffix (matches the original CSV naming)
+KIND_SUFFIX = {
+    "bars": "",
+    "returns": "_returns_only",
+}
+
+# Columnar stores compact their part files once a series has this many
+COMPACT_AFTER_PARTS = 64
+
+
+@dataclass
+class AppendResult:
+    added: int                # rows that were not stored before
+    total: int                # rows stored after the write
+    rewritten: bool           # history was rewritten (backfill / overlap)
+    appended: pd.DataFrame    # the new rows, sorted by ts
+    prev_last_ts: pd.Timestamp | None = None  # last stored ts before the write
+
+
+def entry_signature(entry: dict) -> tuple:
+    """(rows, content_hash, last_ts) of an index entry: changes whenever the stored bars do."""
+    return entry["rows"], entry["content_hash"], entry["last_ts"]
+
+
+def _market_days(ts: pd.Series) -> pd.Series:
+    """Trading date (New York) of each timestamp, as midnight-normalized datetimes."""
+    return ts.dt.tz_convert(MARKET_TZ).dt.tz_localize(None).dt.normalize()
+
+
+def _day_key(day) -> str:
+    return pd.Timestamp(day).strftime("%Y-%m-%d")
+
+
+def _normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df["ts"] = pd.to_datetime(df["ts"], utc=True)
+    return df.drop_duplicates(subset=["ts"]).sort_values("ts").reset_index(drop=True)
+
+
+class BarStore(ABC):
+    """
+    Base class for bar stores. Subclasses implement the storage primitives
+    (the abstract methods: path_for, _keys, _partition_path, _partitions,
+    _columns, _read, _write, _append_rows); the merge logic and index
+    bookkeeping live here.
+    """
+
+    backend = "base"
+
+    def __init__(self, root: Path | str | None = None):
+        self.root = Path(root) if root is not None else DATA_DIR
+        self._index: BarIndex | None = None
+        self._resident: dict[str, tuple[tuple, pd.DataFrame]] | None = None
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / "_index.json"
+
+    @property
+    def index(self) -> BarIndex:
+        if self._index is None:
+            self._index = BarIndex(self.index_path)
+        return self._index
+
+    def keep_resident(self, enabled: bool = True):
+        """Keep series in memory between reads (see module docstring)."""
+        self._resident = {} if enabled else None
+
+    def _remember(self, key: str, entry: dict, df: pd.DataFrame):
+        if self._resident is not None:
+            self._resident[key] = (entry_signature(entry), df)
+
+    def key(self, symbol: str, timeframe: str, kind: str = "bars") -> str:
+        return f"{symbol}_{timeframe}{KIND_SUFFIX[kind]}"
+
+    @abstractmethod
+    def path_for(self, symbol: str, timeframe: str, kind: str = "bars") -> Path:
+        ...
+
+    def exists(self, symbol: str, timeframe: str, kind: str = "bars") -> bool:
+        return self.path_for(symbol, timeframe, kind).exists()
+
+    @abstractmethod
+    def _keys(self) -> list[str]:
+        ...
+
+    def series(self) -> list[tuple[str, str, str]]:
+        """(symbol, timeframe, kind) for every stored series."""
+        found = []
+        for stem in sorted(self._keys()):
+            kind = "bars"
+            if stem.endswith(KIND_SUFFIX["returns"]):
+                kind = "returns"
+                stem = stem[: -len(KIND_SUFFIX["returns"])]
+            if "_" not in stem:
+                continue
+            symbol, timeframe = stem.rsplit("_", 1)
+            found.append((symbol, timeframe, kind))
+        return found
+
+    def _partitioned_keys(self, base: Path) -> list[str]:
+        """Names of the partitioned (intraday) series directories under base."""
+        if not base.exists():
+            return []
+        found = []
+        for p in base.iterdir():
+            stem = p.name.removesuffix(KIND_SUFFIX["returns"])
+            if p.is_dir() and "_" in stem and is_intraday(stem.rsplit("_", 1)[1]):
+                found.append(p.name)
+        return found
+
+    # --- storage primitives --------------------------------------------------
+
+    @abstractmethod
+    def _partition_path(self, path: Path, day: str) -> Path:
+        """Where one trading day of a partitioned series lives."""
+
+    @abstractmethod
+    def _partitions(self, path: Path) -> list[tuple[str, Path]]:
+        """(YYYY-MM-DD, path) of every partition, oldest first."""
+
+    @abstractmethod
+    def _columns(self, path: Path) -> list[str]:
+        """Stored column names of a series file/directory."""
+
+    @abstractmethod
+    def _read(self, path: Path) -> pd.DataFrame:
+        ...
+
+    @abstractmethod
+    def _write(self, path: Path, df: pd.DataFrame):
+        ...
+
+    @abstractmethod
+    def _append_rows(self, path: Path, df: pd.DataFrame) -> bool:
+        """Append rows newer than everything stored. Return False if not possible."""
+
+    # --- (optionally partitioned) series I/O ---------------------------------
+
+    def _load(self, path: Path, timeframe: str, start: pd.Timestamp | None = None) -> pd.DataFrame:
+        """The whole series; for partitioned series only days from `start` on."""
+        if not is_intraday(timeframe):
+            return self._read(path)
+        first = None if start is None else _day_key(_market_days(pd.Series([start]))[0])
+        frames = [self._read(p) for day, p in self._partitions(path) if first is None or day >= first]
+        if not frames:
+            return pd.DataFrame(columns=["ts"])
+        return pd.concat(frames, ignore_index=True).sort_values("ts").reset_index(drop=True)
+
+    def _load_days(self, path: Path, days: set[str]) -> pd.DataFrame:
+        """The stored rows of just these days of a partitioned series."""
+        frames = [self._read(p) for day, p in self._partitions(path) if day in days]
+        if not frames:
+            return pd.DataFrame(columns=["ts"])
+        return pd.concat(frames, ignore_index=True).sort_values("ts").reset_index(drop=True)
+
+    def _save(self, path: Path, timeframe: str, df: pd.DataFrame, days: set[str] | None = None):
+        """
+        Replace the series. Partitioned series are rebuilt in a temp directory
+        and swapped in, or, with `days`, only those partitions are rewritten.
+        """
+        if not is_intraday(timeframe):
+            self._write(path, df)
+            return
+        by_day = {_day_key(day): grp.reset_index(drop=True) for day, grp in df.groupby(_market_days(df["ts"]))}
+        if days is not None:
+            for day in sorted(days):
+                self._write(self._partition_path(path, day), by_day[day])
+            os.utime(path)
+            return
+
+        tmp_dir = path.with_name(path.name + ".tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        for day, grp in by_day.items():
+            self._write(self._partition_path(tmp_dir, day), grp)
+        old_dir = path.with_name(path.name + ".old")
+        if path.exists():
+            os.replace(path, old_dir)
+        os.replace(tmp_dir, path)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def _save_tail(self, path: Path, timeframe: str, df: pd.DataFrame) -> bool:
+        """Append rows newer than everything stored (into the last / new partitions)."""
+        if not is_intraday(timeframe):
+            return self._append_rows(path, df)
+        parts = self._partitions(path)
+        if parts:
+            columns = self._columns(parts[-1][1])
+            if set(df.columns) - set(columns):
+                return False
+            df = df.reindex(columns=columns)
+        stored = {day for day, _ in parts}
+        for day, grp in df.groupby(_market_days(df["ts"])):
+            day, grp = _day_key(day), grp.reset_index(drop=True)
+            part = self._partition_path(path, day)
+            if day not in stored:
+                self._write(part, grp)
+            elif not self._append_rows(part, grp):
+                return False
+        # appends inside a partition don't touch the series directory's mtime,
+        # which the index uses to spot changes made behind its back
+        os.utime(path)
+        return True
+
+    # --- index bookkeeping ---------------------------------------------------
+
+    def _record(self, symbol: str, timeframe: str, kind: str, df: pd.DataFrame, meta: dict | None = None) -> dict:
+        """Index a full copy of the series."""
+        path = self.path_for(symbol, timeframe, kind)
+        last = None if df.empty else df["ts"].max()
+        return self.index.put(self.key(symbol, timeframe, kind), path, last, len(df), frame_hash(df), **(meta or {}))
+
+    def info(self, symbol: str, timeframe: str, kind: str = "bars") -> dict | None:
+        """
+        Index entry (last_ts, rows, content_hash) for a series, or None if
+        nothing is stored. Stale or missing entries are rebuilt from the data.
+        """
+        path = self.path_for(symbol, timeframe, kind)
+        entry = self.index.get(self.key(symbol, timeframe, kind), path)
+        if entry is not None:
+            return entry
+        if not path.exists():
+            return None
+        return self._record(symbol, timeframe, kind, self._load(path, timeframe))
+
+    # --- public API ----------------------------------------------------------
+
+    def read(self, symbol: str, timeframe: str, kind: str = "bars", start=None) -> pd.DataFrame:
+        """
+        Stored rows sorted by ts (UTC), from `start` on if given (partitioned
+        series then only load the partitions needed). Raises
+        FileNotFoundError if missing.
+        """
+        path = self.path_for(symbol, timeframe, kind)
+        if not path.exists():
+            raise FileNotFoundError(f"No {kind} stored for {symbol} {timeframe}: {path}")
+        start = None if start is None else pd.Timestamp(start)
+        if start is not None and start.tzinfo is None:
+            start = start.tz_localize("UTC")
+
+        if self._resident is None:
+            df = self._load(path, timeframe, start)
+        else:
+            key = self.key(symbol, timeframe, kind)
+            entry = self.info(symbol, timeframe, kind)
+            hit = self._resident.get(key)
+            if hit is None or entry is None or hit[0] != entry_signature(entry):
+                df = self._load(path, timeframe)
+                if entry is not None:
+                    self._remember(key, entry, df)
+            else:
+                df = hit[1]
+            df = df.copy(deep=False)
+
+        if start is not None and len(df):
+            df = df[df["ts"] >= start].reset_index(drop=True)
+        return df
+
+    def write(self, symbol: str, timeframe: str, df: pd.DataFrame, kind: str = "bars", meta: dict | None = None) -> int:
+        """Replace the whole series. Returns rows written. `meta` is stored in the index entry."""
+        path = self.path_for(symbol, timeframe, kind)
+        df = _normalize_frame(df)
+        self._save(path, timeframe, df)
+        entry = self._record(symbol, timeframe, kind, df, meta)
+        self._remember(self.key(symbol, timeframe, kind), entry, df)
+        return len(df)
+
+    def last_ts(self, symbol: str, timeframe: str, kind: str = "bars") -> pd.Timestamp | None:
+        entry = self.info(symbol, timeframe, kind)
+        if entry is None or entry["last_ts"] is None:
+            return None
+        return pd.Timestamp(entry["last_ts"])
+
+    def count(self, symbol: str, timeframe: str, kind: str = "bars") -> int:
+        entry = self.info(symbol, timeframe, kind)
+        return 0 if entry is None else int(entry["rows"])
+
+    def append(
+        self,
+        symbol: str,
+        timeframe: str,
+        new_rows: pd.DataFrame,
+        kind: str = "bars",
+        meta: dict | None = None,
+    ) -> AppendResult:
+        """
+        Merge new rows into the stored series.
+
+        - Rows strictly after the last stored ts are appended in place.
+        - Rows at or before it that are already stored are ignored.
+        - Any genuinely new older row (backfill) triggers a full rewrite;
+          existing rows win on duplicate timestamps.
+        - `meta` (if given) is stored in the index entry.
+        """
+        path = self.path_for(symbol, timeframe, kind)
+        entry = self.info(symbol, timeframe, kind)
+        last = None if entry is None or entry["last_ts"] is None else pd.Timestamp(entry["last_ts"])
+
+        if new_rows is None or new_rows.empty:
+            return AppendResult(0, 0 if entry is None else int(entry["rows"]), False, new_rows, last)
+
+        new_rows = _normalize_frame(new_rows)
+
+        if last is None:
+            self.write(symbol, timeframe, new_rows, kind=kind, meta=meta)
+            return AppendResult(len(new_rows), len(new_rows), False, new_rows, last)
+
+        tail = new_rows[new_rows["ts"] > last]
+        older = new_rows[new_rows["ts"] <= last]
+
+        existing = None
+        overlap_days: set[str] = set()
+        if not older.empty:
+            if is_intraday(timeframe):
+                # partitioned series: only the days the older rows fall on
+                overlap_days = {_day_key(d) for d in _market_days(older["ts"]).unique()}
+                overlap = existing = self._load_days(path, overlap_days)
+            else:
+                overlap = existing = self._load(path, timeframe, start=older["ts"].min())
+            older = older[~older["ts"].isin(overlap["ts"])]
+
+        if older.empty:
+            if tail.empty:
+                return AppendResult(0, int(entry["rows"]), False, tail, last)
+            if self._save_tail(path, timeframe, tail):
+                total = int(entry["rows"]) + len(tail)
+                content_hash = combine_hash(int(entry["content_hash"], 16), frame_hash(tail))
+                key = self.key(symbol, timeframe, kind)
+                new_entry = self.index.put(key, path, tail["ts"].max(), total, content_hash, **(meta or {}))
+                hit = None if self._resident is None else self._resident.get(key)
+                if hit is not None and hit[0] == entry_signature(entry):
+                    self._remember(key, new_entry, pd.concat([hit[1], tail], ignore_index=True))
+                return AppendResult(len(tail), total, False, tail.reset_index(drop=True), last)
+
+        if is_intraday(timeframe):
+            result = self._backfill_days(symbol, timeframe, kind, entry, new_rows, meta, existing, overlap_days)
+            if result is not None:
+                return result
+
+        # Backfill (or schema change): merge and rewrite everything
+        if existing is None or is_intraday(timeframe):
+            existing = self._load(path, timeframe)
+        combined = pd.concat([existing, new_rows], ignore_index=True)
+        combined = combined.drop_duplicates(subset=["ts"]).sort_values("ts").reset_index(drop=True)
+        self._save(path, timeframe, combined)
+        self._remember(self.key(symbol, timeframe, kind), self._record(symbol, timeframe, kind, combined, meta), combined)
+
+        added = len(combined) - len(existing)
+        appended = new_rows[~new_rows["ts"].isin(existing["ts"])].reset_index(drop=True)
+        return AppendResult(added, len(combined), not older.empty, appended, last)
+
+    def _backfill_days(
+        self,
+        symbol: str,
+        timeframe: str,
+        kind: str,
+        entry: dict,
+        new_rows: pd.DataFrame,
+        meta: dict | None,
+        loaded: pd.DataFrame | None = None,
+        loaded_days: set[str] = frozenset(),
+    ) -> AppendResult | None:
+        """
+        Backfill a partitioned series by reading and rewriting only the days
+        that receive rows (`loaded` already holds `loaded_days`); the index
+        entry is updated from the added rows (the content hash is
+        additive). None when the new rows bring columns the series doesn't
+        have (the caller rewrites everything).
+        """
+        path = self.path_for(symbol, timeframe, kind)
+        parts = self._partitions(path)
+        columns = self._columns(parts[-1][1]) if parts else []
+        if not columns or set(new_rows.columns) - set(columns):
+            return None
+
+        days = {_day_key(d) for d in _market_days(new_rows["ts"]).unique()}
+        frames = [f for f in (loaded, self._load_days(path, days - set(loaded_days))) if f is not None and len(f)]
+        stored = pd.concat(frames, ignore_index=True) if frames else None
+        added = new_rows if stored is None else new_rows[~new_rows["ts"].isin(stored["ts"])]
+        added = added.reindex(columns=columns).reset_index(drop=True)
+        combined = pd.concat([f for f in (stored, added) if f is not None], ignore_index=True)
+        combined = combined.sort_values("ts").reset_index(drop=True)
+        self._save(path, timeframe, combined, days=days)
+
+        prev_last = pd.Timestamp(entry["last_ts"])
+        total = int(entry["rows"]) + len(added)
+        content_hash = combine_hash(int(entry["content_hash"], 16), frame_hash(added))
+        key = self.key(symbol, timeframe, kind)
+        self.index.put(key, path, max(prev_last, added["ts"].max()), total, content_hash, **(meta or {}))
+        if self._resident is not None:
+            self._resident.pop(key, None)
+        return AppendResult(len(added), total, True, added, prev_last)
+
+
+class CsvBarStore(BarStore):
+    """One CSV per symbol/timeframe/kind; appends write a CSV tail without a header."""
+
+    backend = "csv"
+
+    def path_for(self, symbol: str, timeframe: str, kind: str = "bars") -> Path:
+        if is_intraday(timeframe):
+            return self.root / self.key(symbol, timeframe, kind)
+        return self.root / f"{self.key(symbol, timeframe, kind)}.csv"
+
+    def _keys(self) -> list[str]:
+        return [p.stem for p in self.root.glob("*.csv")] + self._partitioned_keys(self.root)
+
+    def _partition_path(self, path: Path, day: str) -> Path:
+        return path / f"{day}.csv"
+
+    def _partitions(self, path: Path) -> list[tuple[str, Path]]:
+        return [(p.stem, p) for p in sorted(path.glob("????-??-??.csv"))]
+
+    def _columns(self, path: Path) -> list[str]:
+        return self._header(path)
+
+    def _read(self, path: Path) -> pd.DataFrame:
+        # round_trip keeps floats bit-identical to what was written (stable hashes)
+        df = pd.read_csv(path, parse_dates=["ts"], float_precision="round_trip")
+        df["ts"] = pd.to_datetime(df["ts"], utc=True)
+        return df.sort_values("ts").reset_index(drop=True)
+
+    def _write(self, path: Path, df: pd.DataFrame):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        df.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+
+    def _header(self, path: Path) -> list[str]:
+        with path.open("r", newline="") as f:
+            return f.readline().strip().split(",")
+
+    def _append_rows(self, path: Path, df: pd.DataFrame) -> bool:
+        header = self._header(path)
+        if set(df.columns) - set(header):
+            return False
+        df.reindex(columns=header).to_csv(path, mode="a", header=False, index=False)
+        return True
+
+
+class ColumnarBarStore(BarStore):
+    """
+    One directory per symbol/timeframe/kind holding sequentially numbered
+    part files (Parquet or Arrow IPC/Feather). Timestamps are stored typed,
+    so nothing is re-parsed on read. Appends add a part file; the directory
+    is compacted into a single part every COMPACT_AFTER_PARTS appends.
+    """
+
+    def __init__(self, root: Path | str | None = None, fmt: str = "parquet"):
+        super().__init__(root)
+        if fmt not in ("parquet", "feather"):
+            raise ValueError(f"Unsupported columnar format: {fmt}")
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError(f"The '{fmt}' bar store requires pyarrow (pip install pyarrow)") from e
+        self.fmt = fmt
+        self.backend = fmt
+        self.ext = ".parquet" if fmt == "parquet" else ".arrow"
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / self.fmt / "_index.json"
+
+    def path_for(self, symbol: str, timeframe: str, kind: str = "bars") -> Path:
+        return self.root / self.fmt / self.key(symbol, timeframe, kind)
+
+    def _keys(self) -> list[str]:
+        base = self.root / self.fmt
+        if not base.exists():
+            return []
+        return [
+            p.name for p in base.iterdir()
+            if p.is_dir() and not p.name.endswith((".tmp", ".old"))
+        ]
+
+    def _parts(self, path: Path) -> list[Path]:
+        return sorted(path.glob(f"part-*{self.ext}"))
+
+    def _partition_path(self, path: Path, day: str) -> Path:
+        return path / f"date={day}"
+
+    def _partitions(self, path: Path) -> list[tuple[str, Path]]:
+        return [
+            (p.name[5:], p) for p in sorted(path.glob("date=????-??-??"))
+            if p.is_dir()
+        ]
+
+    def _columns(self, path: Path) -> list[str]:
+        parts = self._parts(path)
+        return self._part_columns(parts[-1]) if parts else []
+
+    def _read_part(self, part: Path, columns: list[str] | None = None) -> pd.DataFrame:
+        if self.fmt == "parquet":
+            return pd.read_parquet(part, columns=columns)
+        return pd.read_feather(part, columns=columns)
+
+    def _part_columns(self, part: Path) -> list[str]:
+        if self.fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            return list(pq.read_schema(part).names)
+        return list(self._read_part(part).columns)
+
+    def _write_part(self, part: Path, df: pd.DataFrame):
+        tmp = part.with_name(part.name + ".tmp")
+        if self.fmt == "parquet":
+            df.to_parquet(tmp, index=False)
+        else:
+            df.reset_index(drop=True).to_feather(tmp)
+        os.replace(tmp, part)
+
+    def _part_name(self, n: int) -> str:
+        return f"part-{n:05d}{self.ext}"
+
+    def _read(self, path: Path) -> pd.DataFrame:
+        parts = self._parts(path)
+        if not parts:
+            return pd.DataFrame(columns=["ts"])
+        df = pd.concat([self._read_part(p) for p in parts], ignore_index=True)
+        return df.sort_values("ts").reset_index(drop=True)
+
+    def _write(self, path: Path, df: pd.DataFrame):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = path.with_name(path.name + ".tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        self._write_part(tmp_dir / self._part_name(0), df.reset_index(drop=True))
+        old_dir = path.with_name(path.name + ".old")
+        if path.exists():
+            os.replace(path, old_dir)
+        os.replace(tmp_dir, path)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def _append_rows(self, path: Path, df: pd.DataFrame) -> bool:
+        parts = self._parts(path)
+        if parts:
+            existing_cols = self._part_columns(parts[-1])
+            if set(df.columns) - set(existing_cols):
+                return False
+            df = df.reindex(columns=existing_cols)
+        if len(parts) >= COMPACT_AFTER_PARTS:
+            self._write(path, pd.concat([self._read(path), df], ignore_index=True))
+            return True
+        n = int(parts[-1].name[5:10]) + 1 if parts else 0
+        self._write_part(path / self._part_name(n), df.reset_index(drop=True))
+        return True
+
+
+BACKENDS = ("csv", "parquet", "feather")
+
+_STORES: dict[tuple[str, str], BarStore] = {}
+
+
+def get_bar_store(backend: str | None = None, root: Path | str | None = None) -> BarStore:
+    """Return the (cached) store for a backend; default comes from settings.bar_store."""
+    backend = (backend or settings.bar_store).lower()
+    root = Path(root) if root is not None else DATA_DIR
+    key = (backend, str(root))
+    if key not in _STORES:
+        if backend == "csv":
+            _STORES[key] = CsvBarStore(root)
+        elif backend in ("parquet", "feather"):
+            _STORES[key] = ColumnarBarStore(root, fmt=backend)
+        else:
+            raise ValueError(f"Unknown bar store backend: {backend} (choose from {BACKENDS})")
+    return _STORES[key]
+
+
+def migrate(src_backend: str, dst_backend: str, root: Path | None = None, symbols: list[str] | None = None) -> int:
+    """Copy every series from one backend to another. Returns series migrated."""
+    src = get_bar_store(src_backend, root)
+    dst = get_bar_store(dst_backend, root)
+    n = 0
+    for symbol, timeframe, kind in src.series():
+        if symbols and symbol not in symbols:
+            continue
+        rows = dst.write(symbol, timeframe, src.read(symbol, timeframe, kind), kind=kind)
+        print(f"  {symbol} {timeframe} {kind}: {rows} rows → {dst.path_for(symbol, timeframe, kind)}")
+        n += 1
+    return n
+
+
+def bench(symbols: list[str], timeframe: str = "1Day", backends: tuple[str, ...] = BACKENDS, root: Path | None = None):
+    """Time full reads, last_ts lookups and a one-row append per backend (on a scratch copy)."""
+    src = get_bar_store("csv", root)
+    scratch = (root or DATA_DIR) / "_bench"
+    rows = []
+    try:
+        for backend in backends:
+            store = get_bar_store(backend, scratch / backend)
+            for sym in symbols:
+                store.write(sym, timeframe, src.read(sym, timeframe))
+
+            t0 = time.perf_counter()
+            for sym in symbols:
+                store.read(sym, timeframe)
+            t_read = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            for sym in symbols:
+                store.last_ts(sym, timeframe)
+            t_last = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            for sym in symbols:
+                last = store.read(sym, timeframe).tail(1).copy()
+                last["ts"] = last["ts"] + pd.Timedelta(days=1)
+                store.append(sym, timeframe, last)
+            t_append = time.perf_counter() - t0
+
+            rows.append({"backend": backend, "read_s": t_read, "last_ts_s": t_last, "append_s": t_append})
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bar store maintenance")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_mig = sub.add_parser("migrate", help="Convert existing CSV series to another backend")
+    p_mig.add_argument("--from", dest="src", default="csv", choices=BACKENDS)
+    p_mig.add_argument("--to", dest="dst", default="parquet", choices=BACKENDS)
+    p_mig.add_argument("--symbols", nargs="*", default=None)
+
+    p_bench = sub.add_parser("bench", help="Compare backends on existing CSV series")
+    p_bench.add_argument("--symbols", nargs="+", required=True)
+    p_bench.add_argument("--timeframe", default="1Day")
+    p_bench.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+
+    args = parser.parse_args()
+
+    if args.cmd == "migrate":
+        n = migrate(args.src, args.dst, symbols=args.symbols)
+        print(f"✅ Migrated {n} series from {args.src} to {args.dst}")
+    else:
+        print(bench(args.symbols, timeframe=args.timeframe, backends=tuple(args.backends)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# src/bench_import.py
+"""
+Startup-time budget for the CLI.
+
+Each command's import set is timed in a fresh interpreter (median of
+--repeat runs) and compared with its target:
+
+- cli    → import src.main (argument parsing only)
+- check  → + alpaca_client (trading client)
+- update → + update_data (market-data client, bar store)
+- run    → + generate_signals, trading_engine (statsmodels, pandas, ...)
+
+With --top N, the slowest modules of each set (python -X importtime,
+cumulative) are listed too. Results go to reports/bench_import.json; the
+exit code is 1 if any command is over its target.
+
+Usage:
+    python -m src.bench_import
+    python -m src.bench_import --target check=800 --top 10
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from .config import PROJECT_ROOT
+
+REPORTS_DIR = PROJECT_ROOT / "reports"
+
+COMMAND_IMPORTS = {
+    "cli": ["src.main"],
+    "check": ["src.main", "src.alpaca_client"],
+    "update": ["src.main", "src.alpaca_client", "src.update_data"],
+    "run": ["src.main", "src.alpaca_client", "src.update_data", "src.generate_signals", "src.trading_engine"],
+}
+
+# milliseconds
+DEFAULT_TARGETS = {"cli": 250, "check": 1200, "update": 1500, "run": 3500}
+
+_TIMER = "import time; t = time.perf_counter(); {imports}; print(time.perf_counter() - t)"
+
+
+def time_imports(modules: list[str], repeat: int = 5) -> float:
+    """Median wall time (ms) to import `modules` in a fresh interpreter."""
+    code = _TIMER.format(imports="; ".join(f"import {m}" for m in modules))
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        )
+        runs.append(1000.0 * float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(runs)
+
+
+def slowest_imports(modules: list[str], top: int = 10) -> list[tuple[str, float]]:
+    """(module, cumulative ms) of the slowest top-level imports, from -X importtime."""
+    code = "; ".join(f"import {m}" for m in modules)
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit() and not name.startswith("     "):
+            # only direct imports of the measured set (nesting depth 0/1)
+            rows.append((name.strip(), int(cumulative) / 1000.0))
+    return sorted(rows, key=lambda r: -r[1])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure CLI import time per command")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--target", action="append", default=[], help="Override a target, e.g. check=800 (ms)")
+    parser.add_argument("--top", type=int, default=0, help="Also list the N slowest imports per command")
+    parser.add_argument("--out", default=str(REPORTS_DIR / "bench_import.json"))
+    args = parser.parse_args()
+
+    targets = dict(DEFAULT_TARGETS)
+    for t in args.target:
+        name, ms = t.split("=")
+        targets[name] = float(ms)
+
+    results = []
+    for command, modules in COMMAND_IMPORTS.items():
+        ms = time_imports(modules, repeat=args.repeat)
+        ok = ms <= targets[command]
+        results.append({"command": command, "import_ms": round(ms, 1), "target_ms": targets[command], "ok": ok})
+        print(f"{'✅' if ok else '❌'} {command:<7} {ms:8.1f} ms  (target {targets[command]:.0f} ms)")
+        if args.top:
+            results[-1]["slowest"] = slowest_imports(modules, args.top)
+            for name, cum in results[-1]["slowest"]:
+                print(f"      {cum:8.1f} ms  {name}")
+
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("w", encoding="utf-8") as f:
+        json.dump({"python": sys.version.split()[0], "results": results}, f, indent=2)
+    print(f"Saved import benchmark → {out_path}")
+
+    if not all(r["ok"] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
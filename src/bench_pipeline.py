@@ -0,0 +1,226 @@
+# src/bench_pipeline.py
+"""
+End-to-end benchmark of the daily pipeline against the offline Alpaca stand-in.
+
+For each universe size, a synthetic portfolio of N symbols runs through the
+same code as `python -m src.main --allow-trade`, in a scratch data dir, and
+each stage is timed:
+
+- update_cold   → first update_portfolio_data (full history fetch + save + returns)
+- update_warm   → second update (nothing new to fetch: planning / index overhead)
+- returns       → full rebuild of every returns file
+- signals_cold  → build_signals_df with empty model and signal caches
+- signals_warm  → build_signals_df again (unchanged inputs: signal-cache hits)
+- signals_filter → again without the signal cache (cached params, filter-only)
+- orders        → execute_test_trades through the fake trading client
+
+The fake clients add `--latency-ms` per API call and fail `--error-rate` of
+calls with 429/5xx. Results go to reports/bench_pipeline.json. With
+--baseline, stages more than --tolerance slower than the baseline report
+are listed and the exit code is 1.
+
+Usage:
+    python -m src.bench_pipeline --sizes 10,100,1000,5000 --store parquet
+    python -m src.bench_pipeline --sizes 10,100 --baseline reports/bench_pipeline.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from . import trading_engine, update_data
+from .bar_store import get_bar_store
+from .clients import use_clients
+from .config import PROJECT_ROOT
+from .config_strategy import PORTFOLIOS
+from .fake_alpaca import FakeAlpaca
+from .generate_signals import build_signals_df
+from .model_cache import ModelStateCache
+from .order_registry import OrderRegistry
+from .process_data import update_returns
+from .signal_cache import SignalCache
+from .trading_engine import execute_test_trades
+
+REPORTS_DIR = PROJECT_ROOT / "reports"
+DEFAULT_SIZES = "10,100,1000,5000"
+
+
+def bench_symbols(n: int) -> list[str]:
+    return [f"SYM{i:05d}" for i in range(n)]
+
+
+@contextmanager
+def _scratch_logs(root: Path):
+    """Point the audit / trades logs and the position ledger at the scratch dir for the duration."""
+    prev = (update_data.AUDIT_LOG, trading_engine.TRADES_LOG, trading_engine.LEDGER_PATH)
+    update_data.AUDIT_LOG = root / "data_updates.csv"
+    trading_engine.TRADES_LOG = root / "trades.csv"
+    trading_engine.LEDGER_PATH = root / "bot_positions.json"
+    try:
+        yield
+    finally:
+        update_data.AUDIT_LOG, trading_engine.TRADES_LOG, trading_engine.LEDGER_PATH = prev
+
+
+class _Timer:
+    def __init__(self):
+        self.stages: list[dict] = []
+
+    @contextmanager
+    def stage(self, name: str, n_symbols: int, **extra):
+        t0 = time.perf_counter()
+        yield extra
+        seconds = time.perf_counter() - t0
+        self.stages.append(
+            {
+                "n_symbols": n_symbols,
+                "stage": name,
+                "seconds": round(seconds, 6),
+                "per_symbol_ms": round(1000.0 * seconds / max(n_symbols, 1), 6),
+                **extra,
+            }
+        )
+        print(f"  {name:<14} {seconds:9.3f}s  ({1000.0 * seconds / max(n_symbols, 1):.3f} ms/symbol)")
+
+
+def run_size(
+    n: int,
+    timer: _Timer,
+    store_backend: str,
+    history_days: int,
+    latency_s: float,
+    error_rate: float,
+    workers: int,
+    signal_workers: int,
+    notional: float,
+):
+    name = f"_BENCH_{n}"
+    PORTFOLIOS[name] = bench_symbols(n)
+    try:
+        fake = FakeAlpaca(latency_s=latency_s, error_rate=error_rate)
+
+        with tempfile.TemporaryDirectory(prefix="bench_", ignore_cleanup_errors=True) as tmp, \
+                use_clients(data=fake.data_client, trading=fake.trading_client), \
+                _scratch_logs(Path(tmp)):
+            root = Path(tmp)
+            store = get_bar_store(store_backend, root / "data")
+            registry = OrderRegistry(reports_dir=root / "reports")
+            model_cache = ModelStateCache(root=root / "models")
+            print(f"== {n} symbols ({store_backend}) ==")
+
+            for stage in ("update_cold", "update_warm"):
+                calls_before = fake.stats.as_dict()["calls"].get("get_stock_bars", 0)
+                with timer.stage(stage, n) as extra:
+                    update_data.update_portfolio_data(
+                        name,
+                        lookback_days_if_missing=history_days,
+                        workers=workers,
+                        calls_per_minute=1e9,
+                        store=store,
+                    )
+                extra["api_calls"] = fake.stats.as_dict()["calls"].get("get_stock_bars", 0) - calls_before
+
+            with timer.stage("returns", n):
+                for sym in PORTFOLIOS[name]:
+                    update_returns(store, sym, update_data.TIMEFRAME)
+
+            signals_df = None
+            signal_cache = SignalCache(root / "signals.json")
+            for stage in ("signals_cold", "signals_warm", "signals_filter"):
+                with timer.stage(stage, n) as extra:
+                    signals_df = build_signals_df(
+                        name, store=store, workers=signal_workers, model_cache=model_cache, order_registry=registry,
+                        signal_cache=False if stage == "signals_filter" else signal_cache,
+                    )
+                    extra.update(signals_df.attrs.get("signal_cache", {}))
+
+            with timer.stage("orders", n) as extra:
+                execute_test_trades(signals_df, notional_usd=notional)
+            extra["orders"] = len(fake.trading_client.orders)
+            extra["api_errors"] = fake.stats.as_dict()["errors"]
+    finally:
+        del PORTFOLIOS[name]
+
+
+def compare_to_baseline(results: list[dict], baseline_path: Path, tolerance: float) -> list[str]:
+    """Stages that got slower than baseline * (1 + tolerance)."""
+    with baseline_path.open("r", encoding="utf-8") as f:
+        baseline = {(r["n_symbols"], r["stage"]): r["seconds"] for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        base = baseline.get((r["n_symbols"], r["stage"]))
+        if base and r["seconds"] > base * (1.0 + tolerance):
+            regressions.append(
+                f"{r['stage']} @ {r['n_symbols']} symbols: {r['seconds']:.3f}s vs baseline {base:.3f}s "
+                f"(+{100.0 * (r['seconds'] / base - 1.0):.0f}%)"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the daily pipeline against a fake Alpaca")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated universe sizes")
+    parser.add_argument("--store", default="csv", choices=["csv", "parquet", "feather"])
+    parser.add_argument("--history-days", type=int, default=750, help="Calendar days of history per symbol")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added latency per fake API call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake API calls that fail")
+    parser.add_argument("--workers", type=int, default=4, help="Data update threads")
+    parser.add_argument("--signal-workers", type=int, default=1, help="Processes for ARIMA fitting")
+    parser.add_argument("--notional", type=float, default=1.0)
+    parser.add_argument("--out", default=str(REPORTS_DIR / "bench_pipeline.json"))
+    parser.add_argument("--baseline", default=None, help="Earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    timer = _Timer()
+    for n in (int(s) for s in args.sizes.split(",")):
+        run_size(
+            n,
+            timer,
+            store_backend=args.store,
+            history_days=args.history_days,
+            latency_s=args.latency_ms / 1000.0,
+            error_rate=args.error_rate,
+            workers=args.workers,
+            signal_workers=args.signal_workers,
+            notional=args.notional,
+        )
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")},
+        "results": timer.stages,
+    }
+
+    regressions = []
+    if args.baseline:
+        regressions = compare_to_baseline(timer.stages, Path(args.baseline), args.tolerance)
+        report["baseline"] = args.baseline
+        report["regressions"] = regressions
+
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved benchmark report → {out_path}")
+
+    if regressions:
+        print("❌ Regressions vs baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    if args.baseline:
+        print("✅ No regressions vs baseline.")
+
+
+if __name__ == "__main__":
+    main()
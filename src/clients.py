@@ -0,0 +1,166 @@
+# src/clients.py
+"""
+Single place where Alpaca clients are constructed.
+
+Code that talks to Alpaca calls make_data_client() / make_trading_client()
+instead of building StockHistoricalDataClient / TradingClient itself, so the
+clients can be swapped out — e.g. for the offline stand-ins in fake_alpaca:
+
+    fake = FakeAlpaca(latency_s=0.05, error_rate=0.01)
+    with use_clients(data=fake.data_client, trading=fake.trading_client):
+        run_strategy(...)
+
+Setting ALPACA_FAKE=1 installs the offline stand-ins for the whole process
+(runs main.py end to end without credentials).
+
+get_data_client() / get_trading_client() return process-wide instances of
+the same, and all real clients share one requests.Session — a single
+connection pool (settings.http_pool_size connections per host) for the
+trading and market-data endpoints, so TLS connections are reused across
+the whole run.
+"""
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable
+
+from .config import settings
+
+_data_factory: Callable[[], Any] | None = None
+_trading_factory: Callable[[], Any] | None = None
+_fake = None
+
+_registry: dict[str, Any] = {}
+_registry_lock = threading.Lock()
+_session = None
+
+
+def _default_fake():
+    global _fake
+    if _fake is None:
+        from .fake_alpaca import FakeAlpaca
+
+        _fake = FakeAlpaca()
+    return _fake
+
+
+def get_session():
+    """The process-wide HTTP session shared by all real Alpaca clients."""
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        with _registry_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.http_pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def make_data_client():
+    """Market-data client (StockHistoricalDataClient or an injected stand-in)."""
+    if _data_factory is not None:
+        return _data_factory()
+    if settings.fake_alpaca:
+        return _default_fake().data_client
+
+    from alpaca.data.historical import StockHistoricalDataClient
+
+    return StockHistoricalDataClient(
+        api_key=settings.api_key,
+        secret_key=settings.api_secret,
+    )
+
+
+def make_data_stream():
+    """
+    Live market-data websocket (StockDataStream, feed settings.data_feed).
+    There is no fake: replay recorded bars with streaming.ReplaySource instead.
+    """
+    from alpaca.data.enums import DataFeed
+    from alpaca.data.live import StockDataStream
+
+    return StockDataStream(
+        api_key=settings.api_key,
+        secret_key=settings.api_secret,
+        feed=DataFeed(settings.data_feed),
+    )
+
+
+def make_trading_client():
+    """Trading client (TradingClient or an injected stand-in)."""
+    if _trading_factory is not None:
+        return _trading_factory()
+    if settings.fake_alpaca:
+        return _default_fake().trading_client
+
+    from alpaca.trading.client import TradingClient
+
+    # If settings.env == "live", we go live; otherwise paper
+    return TradingClient(
+        api_key=settings.api_key,
+        secret_key=settings.api_secret,
+        paper=(settings.env != "live"),
+    )
+
+
+def _registered(name: str, factory: Callable[[], Any], setup: Callable[[Any], Any] | None = None):
+    client = _registry.get(name)
+    if client is None:
+        session = get_session()
+        with _registry_lock:
+            client = _registry.get(name)
+            if client is None:
+                client = factory()
+                # alpaca-py REST clients keep their own requests.Session in
+                # `_session`; auth headers are added per request, so one
+                # session can serve them all.
+                if hasattr(client, "_session"):
+                    client._session = session
+                if setup is not None:
+                    setup(client)
+                _registry[name] = client
+    return client
+
+
+def get_data_client():
+    """
+    Process-wide market-data client. Every page it requests takes a token
+    from the caller's rate_limit.paced() bucket, and 429s are left to
+    rate_limit.call_with_retry.
+    """
+    from .rate_limit import pace_requests
+
+    return _registered("data", make_data_client, setup=pace_requests)
+
+
+def get_trading_client():
+    """Process-wide trading client."""
+    return _registered("trading", make_trading_client)
+
+
+def set_client_factories(data: Callable[[], Any] | None = None, trading: Callable[[], Any] | None = None):
+    """Install client factories (None restores the real Alpaca clients)."""
+    global _data_factory, _trading_factory
+    with _registry_lock:
+        _data_factory, _trading_factory = data, trading
+        _registry.clear()
+
+
+@contextmanager
+def use_clients(data=None, trading=None):
+    """Temporarily serve the given client objects from make_*_client() / get_*_client()."""
+    prev = (_data_factory, _trading_factory)
+    set_client_factories(
+        data=(lambda: data) if data is not None else prev[0],
+        trading=(lambda: trading) if trading is not None else prev[1],
+    )
+    try:
+        yield
+    finally:
+        set_client_factories(*prev)
@@ -0,0 +1,105 @@
+# src/compare_backends.py
+"""
+Speed / accuracy comparison of the closed-form AR backend vs statsmodels.
+
+For each symbol and AR order, both backends produce 1-step forecasts at the
+last n_origins points of the returns history (expanding window). We report
+per-symbol wall time, the mean absolute difference between the two
+forecasts, and each backend's RMSE against the realized returns.
+
+Usage:
+    python -m src.compare_backends --portfolio all --orders 1,0,0 2,0,0
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from .bar_store import get_bar_store
+from .config import PROJECT_ROOT
+from .config_symbols import PORTFOLIOS
+from .modeling_ar import forecast_ar_universe
+from .modeling_arima import forecast_next_return_array
+
+REPORTS_DIR = PROJECT_ROOT / "reports"
+
+
+def compare_backends(
+    series: dict[str, np.ndarray],
+    order=(2, 0, 0),
+    n_origins: int = 20,
+    method: str = "ols",
+) -> pd.DataFrame:
+    symbols = list(series)
+    rows = {sym: {"symbol": sym, "order": str(tuple(order))} for sym in symbols}
+
+    # statsmodels: one fit per symbol per origin
+    sm_fc = {sym: [] for sym in symbols}
+    for sym in symbols:
+        y = series[sym]
+        t0 = time.perf_counter()
+        for k in range(n_origins, 0, -1):
+            sm_fc[sym].append(forecast_next_return_array(y[:-k], order=order))
+        rows[sym]["statsmodels_s"] = time.perf_counter() - t0
+
+    # AR: one stacked fit per origin for the whole universe
+    ar_fc = {sym: [] for sym in symbols}
+    t0 = time.perf_counter()
+    for k in range(n_origins, 0, -1):
+        fc = forecast_ar_universe({sym: series[sym][:-k] for sym in symbols}, order=order, method=method)
+        for sym in symbols:
+            ar_fc[sym].append(fc[sym])
+    ar_total = time.perf_counter() - t0
+
+    for sym in symbols:
+        realized = series[sym][-n_origins:]
+        sm = np.asarray(sm_fc[sym])
+        ar = np.asarray(ar_fc[sym])
+        rows[sym].update(
+            {
+                "ar_s": ar_total / len(symbols),
+                "mean_abs_diff": float(np.mean(np.abs(sm - ar))),
+                "max_abs_diff": float(np.max(np.abs(sm - ar))),
+                "rmse_statsmodels": float(np.sqrt(np.mean((sm - realized) ** 2))),
+                "rmse_ar": float(np.sqrt(np.mean((ar - realized) ** 2))),
+                "n_points": len(series[sym]),
+            }
+        )
+
+    return pd.DataFrame(list(rows.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare AR(p) closed-form vs statsmodels forecasts")
+    parser.add_argument("--portfolio", default="all", choices=list(PORTFOLIOS))
+    parser.add_argument("--orders", nargs="+", default=["1,0,0", "2,0,0"], help="AR orders as p,d,q")
+    parser.add_argument("--n-origins", type=int, default=20)
+    parser.add_argument("--method", default="ols", choices=["ols", "yule_walker"])
+    parser.add_argument("--timeframe", default="1Day")
+    args = parser.parse_args()
+
+    store = get_bar_store()
+    series = {}
+    for sym in PORTFOLIOS[args.portfolio]:
+        df = store.read(sym, args.timeframe, kind="returns").dropna(subset=["return"])
+        series[sym] = df["return"].to_numpy(dtype="float64")
+
+    frames = []
+    for o in args.orders:
+        order = tuple(int(x) for x in o.split(","))
+        frames.append(compare_backends(series, order=order, n_origins=args.n_origins, method=args.method))
+    report = pd.concat(frames, ignore_index=True)
+
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    out_path = REPORTS_DIR / f"ar_backend_comparison_{args.portfolio}.csv"
+    report.to_csv(out_path, index=False)
+
+    print(report.groupby("order")[["statsmodels_s", "ar_s", "mean_abs_diff", "rmse_statsmodels", "rmse_ar"]].mean())
+    print(f"Saved comparison → {out_path}")
+
+
+if __name__ == "__main__":
+    main()
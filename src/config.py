@@ -16,5 +16,33 @@ class Settings:
     data_dir: str = os.getenv("DATA_DIR", "data")
     reports_dir: str = os.getenv("REPORTS_DIR", "reports")
     default_notional: float = float(os.getenv("DEFAULT_NOTIONAL", "1.00"))
+    fetch_batch_size: int = int(os.getenv("FETCH_BATCH_SIZE", "100"))
+    intraday_lookback_days: int = int(os.getenv("INTRADAY_LOOKBACK_DAYS", "30"))
+    intraday_chunk_days: int = int(os.getenv("INTRADAY_CHUNK_DAYS", "5"))
+    bar_store: str = os.getenv("BAR_STORE", "csv").lower()
+    api_calls_per_minute: int = int(os.getenv("ALPACA_CALLS_PER_MINUTE", "200"))
+    signal_workers: int = int(os.getenv("SIGNAL_WORKERS", "1"))
+    signal_timeout_s: float = float(os.getenv("SIGNAL_TIMEOUT_S", "60"))
+    order_workers: int = int(os.getenv("ORDER_WORKERS", "8"))
+    http_pool_size: int = int(os.getenv("HTTP_POOL_SIZE", "16"))
+    account_ttl_s: float = float(os.getenv("ACCOUNT_TTL_S", "5"))
+    audit_max_mb: float = float(os.getenv("AUDIT_MAX_MB", "50"))
+    audit_rotate: str = os.getenv("AUDIT_ROTATE", "").lower()
+    audit_backups: int = int(os.getenv("AUDIT_BACKUPS", "10"))
+    log_level: str = os.getenv("LOG_LEVEL", "INFO").upper()
+    log_json: bool = os.getenv("LOG_FORMAT", "text").lower() == "json"
+    daemon_schedule: str = os.getenv("DAEMON_AT", "open+5")
+    daemon_host: str = os.getenv("DAEMON_HOST", "127.0.0.1")
+    daemon_port: int = int(os.getenv("DAEMON_PORT", "8765"))
+    data_feed: str = os.getenv("ALPACA_DATA_FEED", "iex").lower()
+    fake_alpaca: bool = os.getenv("ALPACA_FAKE", "").lower() in ("1", "true", "yes")
+    metrics_enabled: bool = os.getenv("METRICS", "").lower() in ("1", "true", "yes")
+    metrics_prom_file: str = os.getenv("METRICS_PROM_FILE", "")
 
 settings = Settings()
+
+
+def ensure_runtime_dirs():
+    """Create the log / data / reports directories (called once by the CLI, not at import)."""
+    for d in (settings.log_dir, settings.data_dir, settings.reports_dir):
+        (PROJECT_ROOT / d).mkdir(parents=True, exist_ok=True)
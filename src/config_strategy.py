@@ -24,7 +24,52 @@ UP_THRESHOLD = 0.0008     # +0.08%
 DOWN_THRESHOLD = -0.0008  # -0.08%
 
 
-# --- Portfolio Exposure (for later, when you use weights) -------------------
+# --- Portfolio Exposure (portfolio.py) --------------------------------------
 
 LONG_EXPOSURE = 0.20      # +20% total long exposure
 SHORT_EXPOSURE = -0.20    # -20% total short exposure
+MAX_POSITION_WEIGHT = 0.05  # per-symbol cap, fraction of equity
+MIN_TRADE_NOTIONAL = 1.0  # skip rebalancing trades smaller than this (USD; Alpaca's notional minimum)
+ALLOW_SHORT = False       # notional orders can't open shorts, so short targets are held at 0
+WEIGHTING_SCHEME = "equal"  # or "forecast": weight in proportion to |forecast_return|
+
+# How orders are sized: "notional" → $notional per long signal (test trades);
+# "weights" → target weights above × account equity
+ORDER_SIZING = "notional"
+
+
+# --- Forecasting models -----------------------------------------------------
+
+DEFAULT_ORDER = (1, 0, 1)
+
+# "statsmodels" → full ARIMA MLE; "ar" → closed-form AR(p) (pure AR orders only,
+# other orders fall back to statsmodels)
+DEFAULT_MODEL_BACKEND = "statsmodels"
+MODEL_BACKENDS = {
+    # "SPY": "ar",
+}
+AR_FIT_METHOD = "ols"           # or "yule_walker"
+
+# Intraday timeframes: fit on roughly the last this-many bars (the window
+# start moves in blocks of this size, so cached model state stays valid)
+INTRADAY_LOOKBACK_BARS = 2000
+
+
+# --- Model state cache (warm-started / filter-only forecasts) ---------------
+
+USE_MODEL_CACHE = True          # reuse fitted params between runs
+MODEL_REFIT_EVERY = 20          # full (warm-started) refit after this many new observations
+MODEL_MAX_AGE_DAYS = 30         # ...or when the last fit is older than this
+MODEL_DRIFT_THRESHOLD = 4.0     # ...or when new standardized residuals² average above this
+
+
+# --- Signal cache (skip forecasts whose inputs are unchanged) ---------------
+
+USE_SIGNAL_CACHE = True         # key: hash of the returns + order + backend
+SIGNAL_CACHE_MAX_ENTRIES = 20000  # least recently used entries are evicted beyond this
+
+
+# --- Universe panel (one 2-D array of returns/closes per run, see panel.py) --
+
+PANEL_DTYPE = "float64"         # "float32" halves memory; forecasts then differ in the last digits
+PANEL_MMAP = False              # signals: keep the panel on disk and memory-map it (tuning/backtest always do)
@@ -0,0 +1,286 @@
+# src/daemon.py
+"""
+Long-running mode: one process runs update → signals → trades on a
+market-calendar-aware schedule and keeps its state warm between cycles.
+
+    python -m src.main daemon --at open+5 --at close-15 --port 8765
+
+- Schedule: run times are "open+N" / "close-N" (minutes, so early closes
+  are handled) or "HH:MM" in New York time, on trading days only
+  (market_calendar).
+- Resident state: modules stay imported, the bar store keeps every series
+  in memory (BarStore.keep_resident) and only appends new bars, fitted
+  ARIMA params stay in the ModelStateCache, and the Alpaca clients / HTTP
+  pool / order registry are process-wide singletons.
+- Control: a local HTTP endpoint (default 127.0.0.1:8765)
+    GET  /status   → schedule, next run, last cycle timings, counters
+    GET  /signals  → signals from the last cycle
+    POST /run      → run a cycle now (409 if one is running)
+    POST /stop     → finish the current cycle and exit
+- Metrics: with METRICS=1 each cycle is one metrics run (report under
+  reports/metrics/cycle-*.json) and its timers show up in /status.
+- Trades are only placed while the market is open; off-hours cycles
+  (e.g. an on-demand POST /run at night) stop after signals.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import signal
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import metrics
+from .clients import get_trading_client
+from .config import settings
+from .config_strategy import ORDER_SIZING
+from .market_calendar import MarketCalendar, next_run, parse_run_time
+
+log = logging.getLogger(__name__)
+
+# re-check the schedule at least this often (clock changes, calendar updates)
+MAX_SLEEP_S = 900.0
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class Daemon:
+    def __init__(
+        self,
+        portfolio: str,
+        run_times: list[str],
+        allow_trade: bool = False,
+        notional: float = 1.0,
+        workers: int = 1,
+        signal_workers: int | None = None,
+        order_workers: int | None = None,
+        host: str | None = None,
+        port: int | None = None,
+        timeframe: str = "1Day",
+        sizing: str | None = None,
+    ):
+        from .bar_store import get_bar_store
+        from .model_cache import MODELS_DIR, ModelStateCache
+        from .timeframes import is_intraday, validate
+
+        self.portfolio = portfolio
+        self.run_times = list(run_times)
+        self.specs = [parse_run_time(s) for s in self.run_times]
+        self.allow_trade = allow_trade
+        self.notional = notional if notional > 0 else 1.0
+        self.workers = workers
+        self.signal_workers = signal_workers
+        self.order_workers = order_workers
+        self.host = host or settings.daemon_host
+        self.port = settings.daemon_port if port is None else port
+        self.timeframe = validate(timeframe)
+        self.sizing = sizing or ORDER_SIZING
+
+        self.store = get_bar_store()
+        self.store.keep_resident()
+        self.model_cache = ModelStateCache(root=MODELS_DIR / timeframe if is_intraday(timeframe) else None)
+        self.calendar = MarketCalendar(get_trading_client())
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._run_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._requested: str | None = None
+        self._httpd: ThreadingHTTPServer | None = None
+
+        self.started_at = _now()
+        self.next_run_at: datetime | None = None
+        self.cycles = 0
+        self.failures = 0
+        self.last_cycle: dict | None = None
+        self.last_signals: list[dict] = []
+
+    # --- one cycle ----------------------------------------------------------
+
+    def run_cycle(self, trigger: str = "manual") -> dict | None:
+        """Run update → signals → trades once. Returns the cycle summary, or None if one is already running."""
+        if not self._run_lock.acquire(blocking=False):
+            return None
+        from .generate_signals import build_signals_df
+        from .trading_engine import execute_test_trades
+        from .update_data import update_portfolio_data
+
+        started = _now()
+        stages: dict[str, float] = {}
+        summary = {"trigger": trigger, "started_at": started.isoformat(), "status": "running"}
+        with self._state_lock:
+            self.last_cycle = summary
+
+        def timed(name, fn, *args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stages[name] = round(time.perf_counter() - t0, 4)
+                metrics.observe(f"stage.{name}", stages[name])
+
+        metrics.start_run(started.strftime("cycle-%Y%m%dT%H%M%SZ"))
+        try:
+            log.info("Cycle started (%s) for portfolio='%s'", trigger, self.portfolio)
+            timed(
+                "update",
+                update_portfolio_data,
+                portfolio_name=self.portfolio,
+                workers=self.workers,
+                store=self.store,
+                timeframe=self.timeframe,
+            )
+            signals_df = timed(
+                "signals",
+                build_signals_df,
+                portfolio_name=self.portfolio,
+                store=self.store,
+                workers=self.signal_workers,
+                model_cache=self.model_cache,
+                timeframe=self.timeframe,
+            )
+            summary["n_signals"] = int((signals_df["signal"] != "flat").sum())
+            summary["signal_cache"] = signals_df.attrs.get("signal_cache")
+
+            if not self.allow_trade:
+                summary["trades"] = "disabled"
+            elif not self.calendar.is_open(_now()):
+                summary["trades"] = "skipped (market closed)"
+                log.info("Market closed: not placing trades this cycle.")
+            else:
+                timed(
+                    "trades",
+                    execute_test_trades,
+                    signals_df,
+                    notional_usd=self.notional,
+                    workers=self.order_workers,
+                    sizing=self.sizing,
+                )
+                summary["trades"] = "submitted"
+
+            summary["status"] = "ok"
+            with self._state_lock:
+                self.last_signals = signals_df.to_dict(orient="records")
+        except Exception as e:
+            log.exception("Cycle failed: %s", e)
+            summary["status"] = "error"
+            summary["error"] = repr(e)
+        finally:
+            summary["stages_s"] = stages
+            summary["duration_s"] = round((_now() - started).total_seconds(), 4)
+            report = metrics.finish_run()
+            if report is not None:
+                summary["metrics"] = {"run": report["run"], "timers": report["timers"], "counters": report["counters"]}
+            with self._state_lock:
+                self.cycles += 1
+                self.failures += summary["status"] == "error"
+                self.last_cycle = summary
+            self._run_lock.release()
+            log.info("Cycle finished: %s in %.2fs %s", summary["status"], summary["duration_s"], stages)
+        return summary
+
+    # --- control ------------------------------------------------------------
+
+    def request_run(self, trigger: str = "http") -> bool:
+        """Ask the main loop for a cycle now. False if one is already running."""
+        if self._run_lock.locked():
+            return False
+        self._requested = trigger
+        self._wake.set()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def status(self) -> dict:
+        with self._state_lock:
+            return {
+                "portfolio": self.portfolio,
+                "timeframe": self.timeframe,
+                "run_times": self.run_times,
+                "allow_trade": self.allow_trade,
+                "sizing": self.sizing,
+                "started_at": self.started_at.isoformat(),
+                "uptime_s": round((_now() - self.started_at).total_seconds(), 1),
+                "next_run": None if self.next_run_at is None else self.next_run_at.isoformat(),
+                "running": self._run_lock.locked(),
+                "cycles": self.cycles,
+                "failures": self.failures,
+                "last_cycle": self.last_cycle,
+                "resident_series": len(self.store._resident or {}),
+            }
+
+    # --- main loop ----------------------------------------------------------
+
+    def _start_http(self):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, code: int, body: dict | list):
+                data = json.dumps(body, default=str).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/status":
+                    self._reply(200, daemon.status())
+                elif self.path == "/signals":
+                    with daemon._state_lock:
+                        self._reply(200, daemon.last_signals)
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                if self.path == "/run":
+                    ok = daemon.request_run("http")
+                    self._reply(202 if ok else 409, {"accepted": ok})
+                elif self.path == "/stop":
+                    daemon.stop()
+                    self._reply(202, {"stopping": True})
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def log_message(self, fmt, *args):
+                log.debug("http %s - " + fmt, self.address_string(), *args)
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        threading.Thread(target=self._httpd.serve_forever, name="daemon-http", daemon=True).start()
+        log.info("Control endpoint on http://%s:%d", self.host, self._httpd.server_address[1])
+
+    def serve_forever(self):
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, lambda *_: self.stop())
+        self._start_http()
+        try:
+            while not self._stop.is_set():
+                now = _now()
+                self.next_run_at = next_run(self.calendar, self.specs, now)
+                wait = MAX_SLEEP_S
+                if self.next_run_at is not None:
+                    wait = min(wait, max(0.0, (self.next_run_at - now).total_seconds()))
+                log.info("Next scheduled run: %s", self.next_run_at)
+
+                self._wake.wait(timeout=wait)
+                self._wake.clear()
+                if self._stop.is_set():
+                    break
+
+                requested, self._requested = self._requested, None
+                if requested:
+                    self.run_cycle(requested)
+                elif self.next_run_at is not None and _now() >= self.next_run_at:
+                    self.run_cycle("schedule")
+        finally:
+            if self._httpd is not None:
+                self._httpd.shutdown()
+                self._httpd.server_close()
+            log.info("Daemon stopped after %d cycles.", self.cycles)
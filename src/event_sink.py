@@ -0,0 +1,216 @@
+# src/event_sink.py
+"""
+Buffered, append-only CSV event sink shared by all audit / trade logs.
+
+- Rows are buffered in memory and written in batches (every `buffer_rows`
+  rows, every `flush_interval_s` seconds, on flush()/close() and at exit).
+- One open append handle per file per process (get_sink() caches sinks by
+  path), reopened only if another process rotated the file.
+- Each batch is written under a cross-process lock (file_lock on a
+  `<file>.lock` sidecar), so overlapping runs never interleave partial rows.
+- Rotation by size (`max_bytes`) and/or by day (`rotate="daily"`): the
+  current file is renamed to `<stem>.<timestamp><suffix>` and a fresh one
+  started; only the newest `backup_count` rotated files are kept.
+- If an existing file has an older header whose columns are a subset of
+  the current ones, it is upgraded in place once; any other header
+  mismatch rotates the old file aside.
+
+    sink = get_sink(Path("logs/trades.csv"), ["timestamp", "symbol", ...])
+    sink.write({...})
+    sink.flush()
+"""
+from __future__ import annotations
+
+import atexit
+import csv
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .config import settings
+from .file_lock import file_lock
+
+
+class CsvEventSink:
+    def __init__(
+        self,
+        path: Path | str,
+        fieldnames: list[str],
+        buffer_rows: int = 256,
+        flush_interval_s: float = 2.0,
+        max_bytes: int | None = None,
+        rotate: str | None = None,
+        backup_count: int = 10,
+    ):
+        if rotate not in (None, "daily"):
+            raise ValueError(f"Unknown rotation: {rotate!r} (None or 'daily')")
+        self.path = Path(path)
+        self.fieldnames = list(fieldnames)
+        self.buffer_rows = buffer_rows
+        self.flush_interval_s = flush_interval_s
+        self.max_bytes = max_bytes
+        self.rotate = rotate
+        self.backup_count = backup_count
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+
+        self._buffer: list[dict] = []
+        self._lock = threading.Lock()
+        self._handle = None
+        self._last_flush = time.monotonic()
+
+    # --- public API -------------------------------------------------------
+
+    def write(self, row: dict):
+        self.write_many([row])
+
+    def write_many(self, rows: list[dict]):
+        with self._lock:
+            self._buffer.extend(rows)
+            due = (
+                len(self._buffer) >= self.buffer_rows
+                or time.monotonic() - self._last_flush >= self.flush_interval_s
+            )
+            if due:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- internals --------------------------------------------------------
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+        rows, self._buffer = self._buffer, []
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.lock_path):
+            self._reopen_if_moved()
+            self._check_header()
+            self._maybe_rotate()
+            f = self._open()
+            writer = csv.DictWriter(f, fieldnames=self.fieldnames, extrasaction="ignore")
+            if f.tell() == 0:
+                writer.writeheader()
+            writer.writerows(rows)
+            f.flush()
+
+    def _open(self):
+        if self._handle is None:
+            self._handle = self.path.open("a", newline="", encoding="utf-8")
+            self._handle.seek(0, os.SEEK_END)
+        return self._handle
+
+    def _close_handle(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def _reopen_if_moved(self):
+        """Another process may have rotated / removed the file since our last write."""
+        if self._handle is None:
+            return
+        try:
+            same = os.path.samestat(os.fstat(self._handle.fileno()), os.stat(self.path))
+        except FileNotFoundError:
+            same = False
+        if not same:
+            self._close_handle()
+
+    def _existing_header(self) -> list[str] | None:
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return None
+        with self.path.open("r", newline="", encoding="utf-8") as f:
+            return next(csv.reader(f), None)
+
+    def _check_header(self):
+        header = self._existing_header()
+        if header is None or header == self.fieldnames:
+            return
+        self._close_handle()
+        if set(header) <= set(self.fieldnames):
+            with self.path.open("r", newline="", encoding="utf-8") as f:
+                rows = list(csv.DictReader(f))
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with tmp.open("w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=self.fieldnames)
+                writer.writeheader()
+                writer.writerows(rows)
+            os.replace(tmp, self.path)
+        else:
+            self._rotate_file()
+
+    def _maybe_rotate(self):
+        if not self.path.exists():
+            return
+        st = self.path.stat()
+        if st.st_size == 0:
+            return
+        too_big = self.max_bytes is not None and st.st_size >= self.max_bytes
+        stale = self.rotate == "daily" and (
+            datetime.fromtimestamp(st.st_mtime, timezone.utc).date() != datetime.now(timezone.utc).date()
+        )
+        if too_big or stale:
+            self._close_handle()
+            self._rotate_file()
+
+    def _rotate_file(self):
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S-%f")
+        os.replace(self.path, self.path.with_name(f"{self.path.stem}.{stamp}{self.path.suffix}"))
+        backups = sorted(self.path.parent.glob(f"{self.path.stem}.*{self.path.suffix}"))
+        for old in backups[: max(0, len(backups) - self.backup_count)]:
+            old.unlink(missing_ok=True)
+
+
+_SINKS: dict[Path, CsvEventSink] = {}
+_SINKS_LOCK = threading.Lock()
+
+
+def get_sink(path: Path | str, fieldnames: list[str], **kwargs) -> CsvEventSink:
+    """
+    Process-wide sink for `path` (created on first use). Rotation defaults
+    come from settings (AUDIT_MAX_MB, AUDIT_ROTATE, AUDIT_BACKUPS).
+    """
+    key = Path(path).resolve()
+    with _SINKS_LOCK:
+        sink = _SINKS.get(key)
+        if sink is None:
+            kwargs.setdefault("max_bytes", int(settings.audit_max_mb * 1024 * 1024) or None)
+            kwargs.setdefault("rotate", settings.audit_rotate or None)
+            kwargs.setdefault("backup_count", settings.audit_backups)
+            sink = _SINKS[key] = CsvEventSink(key, fieldnames, **kwargs)
+        return sink
+
+
+def flush_all():
+    with _SINKS_LOCK:
+        sinks = list(_SINKS.values())
+    for sink in sinks:
+        sink.flush()
+
+
+def close_all():
+    with _SINKS_LOCK:
+        sinks = list(_SINKS.values())
+        _SINKS.clear()
+    for sink in sinks:
+        sink.close()
+
+
+atexit.register(close_all)
@@ -0,0 +1,379 @@
+# src/fake_alpaca.py
+"""
+Offline stand-ins for the Alpaca market-data and trading clients.
+
+- FakeDataClient.get_stock_bars(req) → object with a `.df` shaped like
+  alpaca-py's BarSet.df (MultiIndex symbol, timestamp; open/high/low/close/
+  volume/trade_count/vwap). Prices are a deterministic random walk per
+  symbol, so overlapping requests always agree and incremental updates
+  line up with earlier fetches. Minute bars (09:30–16:00 ET on weekdays)
+  are a Brownian bridge between each day's open and close; other intraday
+  timeframes are resampled from them. Nothing after "now" is returned.
+- FakeTradingClient: get_account(), submit_order(order_data=...),
+  get_order_by_client_id(), get_all_positions(), get_orders() and
+  get_calendar(). Duplicate client_order_ids are rejected (422)
+  like Alpaca does; `lost_response_rate` accepts an order but raises a 504,
+  to exercise idempotent retries. Orders fill at once at FAKE_PRICE into
+  positions, or stay open with fill_orders=False (fill_open_orders()
+  fills them later).
+
+Both sleep `latency_s` (± jitter) per call and raise APIError with a 429 or
+5xx status at `error_rate`, so retry / rate-limit paths get exercised.
+Call counts are kept in `.stats`.
+"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import requests
+from alpaca.common.exceptions import APIError
+
+FAKE_PRICE = 100.0  # every fake fill / position is valued at this price
+EPOCH = pd.Timestamp("2010-01-04", tz="UTC")  # first day of the synthetic history
+BAR_HOUR_UTC = 5  # Alpaca daily bars are stamped 04:00/05:00 UTC
+
+
+def _api_error(status: int, message: str) -> APIError:
+    resp = requests.Response()
+    resp.status_code = status
+    return APIError(f'{{"code": {status}, "message": "{message}"}}', requests.HTTPError(response=resp))
+
+
+def _splitmix(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer on uint64 arrays (wrapping arithmetic)."""
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _uniform(seed: np.ndarray, day: np.ndarray, salt: int) -> np.ndarray:
+    x = _splitmix(seed[:, None] * np.uint64(1_000_003) + day[None, :] + np.uint64(salt << 40))
+    return ((x >> np.uint64(11)).astype("float64") + 0.5) * 2.0 ** -53
+
+
+def _symbol_seed(symbols: list[str]) -> np.ndarray:
+    return np.array([zlib.crc32(s.encode()) for s in symbols], dtype=np.uint64)
+
+
+def _utc(ts) -> pd.Timestamp:
+    ts = pd.Timestamp(ts)
+    return ts.tz_convert("UTC") if ts.tzinfo else ts.tz_localize("UTC")
+
+
+def synthetic_daily_bars(symbols: list[str], start, end, daily_vol: float = 0.012) -> pd.DataFrame:
+    """Deterministic daily OHLCV for business days in [start, end], Alpaca .df layout."""
+    start, end = max(_utc(start), EPOCH), _utc(end)
+    days = pd.bdate_range(EPOCH.normalize(), end.normalize(), tz="UTC")
+    if not symbols or len(days) == 0:
+        return pd.DataFrame(columns=["open", "high", "low", "close", "volume", "trade_count", "vwap"])
+
+    seed = _symbol_seed(symbols)
+    day_idx = np.arange(len(days), dtype=np.uint64)
+    u1, u2 = _uniform(seed, day_idx, 1), _uniform(seed, day_idx, 2)
+    z = np.sqrt(-2.0 * np.log(u1)) * np.cos(2.0 * np.pi * u2)
+
+    base = 20.0 + (seed % np.uint64(480)).astype("float64")
+    close = base[:, None] * np.exp(np.cumsum(0.0002 + daily_vol * z, axis=1))
+    open_ = np.concatenate([close[:, :1], close[:, :-1]], axis=1)
+    spread = 1.0 + 0.5 * daily_vol * _uniform(seed, day_idx, 3)
+    high = np.maximum(open_, close) * spread
+    low = np.minimum(open_, close) / spread
+    volume = np.floor(1e5 + 1e6 * _uniform(seed, day_idx, 4))
+
+    ts = days + pd.Timedelta(hours=BAR_HOUR_UTC)
+    keep = (ts >= start) & (ts <= end)
+    n_sym, n_days = len(symbols), int(keep.sum())
+    index = pd.MultiIndex.from_arrays(
+        [np.repeat(np.asarray(symbols, dtype=object), n_days), np.tile(ts[keep], n_sym)],
+        names=["symbol", "timestamp"],
+    )
+    cols = {
+        "open": open_[:, keep],
+        "high": high[:, keep],
+        "low": low[:, keep],
+        "close": close[:, keep],
+        "volume": volume[:, keep],
+    }
+    df = pd.DataFrame({k: v.ravel() for k, v in cols.items()}, index=index)
+    df["trade_count"] = np.floor(df["volume"] / 100.0)
+    df["vwap"] = (df["high"] + df["low"] + df["close"]) / 3.0
+    return df
+
+
+MINUTES_PER_SESSION = 390
+
+
+def synthetic_minute_bars(symbols: list[str], start, end, daily_vol: float = 0.012) -> pd.DataFrame:
+    """
+    Deterministic 1Min OHLCV for the regular session of business days in
+    [start, end], Alpaca .df layout. Each day runs from the daily bar's open
+    to its close, so minute and daily histories agree.
+    """
+    start, end = max(_utc(start), EPOCH), _utc(end)
+    cols = ["open", "high", "low", "close", "volume", "trade_count", "vwap"]
+    daily = synthetic_daily_bars(symbols, start.normalize(), end.normalize() + pd.Timedelta(hours=BAR_HOUR_UTC), daily_vol)
+    if daily.empty:
+        return pd.DataFrame(columns=cols)
+
+    days = daily.index.get_level_values("timestamp").unique().normalize()
+    n_sym, n_days, n_min = len(symbols), len(days), MINUTES_PER_SESSION
+    opens = daily["open"].to_numpy().reshape(n_sym, n_days)
+    closes = daily["close"].to_numpy().reshape(n_sym, n_days)
+
+    seed = _symbol_seed(symbols)
+    day_idx = ((days - EPOCH.normalize()).days.to_numpy().astype(np.uint64) * np.uint64(n_min))
+    minute_idx = (day_idx[:, None] + np.arange(n_min, dtype=np.uint64)[None, :]).ravel()
+    u1, u2 = _uniform(seed, minute_idx, 5), _uniform(seed, minute_idx, 6)
+    z = (np.sqrt(-2.0 * np.log(u1)) * np.cos(2.0 * np.pi * u2)).reshape(n_sym, n_days, n_min)
+
+    # Brownian bridge from log(open) to log(close) over the session
+    walk = np.cumsum(z, axis=2) * (daily_vol / np.sqrt(n_min))
+    frac = np.arange(1, n_min + 1) / n_min
+    bridge = walk - frac * walk[:, :, -1:]
+    log_close = np.log(opens)[:, :, None] + frac * np.log(closes / opens)[:, :, None] + bridge
+    close = np.exp(log_close)
+    open_ = np.concatenate([opens[:, :, None], close[:, :, :-1]], axis=2)
+    spread = 1.0 + 0.25 * daily_vol / np.sqrt(n_min) * _uniform(seed, minute_idx, 7).reshape(n_sym, n_days, n_min)
+    high = np.maximum(open_, close) * spread
+    low = np.minimum(open_, close) / spread
+    volume = np.floor(100 + 5000 * _uniform(seed, minute_idx, 8)).reshape(n_sym, n_days, n_min)
+
+    session_open = (days.tz_localize(None) + pd.Timedelta(hours=9, minutes=30)).tz_localize("America/New_York")
+    first = session_open.tz_convert("UTC").tz_localize(None).to_numpy()
+    ts = (first[:, None] + np.arange(n_min) * np.timedelta64(1, "m")).ravel()
+    ts = pd.DatetimeIndex(ts).tz_localize("UTC")
+    keep = (ts >= start) & (ts <= end)
+    n_keep = int(keep.sum())
+    index = pd.MultiIndex.from_arrays(
+        [np.repeat(np.asarray(symbols, dtype=object), n_keep), np.tile(ts[keep], n_sym)],
+        names=["symbol", "timestamp"],
+    )
+    values = {"open": open_, "high": high, "low": low, "close": close, "volume": volume}
+    df = pd.DataFrame({k: v.reshape(n_sym, -1)[:, keep].ravel() for k, v in values.items()}, index=index)
+    df["trade_count"] = np.floor(df["volume"] / 10.0)
+    df["vwap"] = (df["high"] + df["low"] + df["close"]) / 3.0
+    return df
+
+
+def synthetic_bars(symbols: list[str], start, end, timeframe: str = "1Day") -> pd.DataFrame:
+    """Synthetic bars for any supported timeframe (intraday ones resampled from 1Min)."""
+    from .timeframes import DAILY, BASE_INTRADAY, resample_bars
+
+    if timeframe == DAILY:
+        return synthetic_daily_bars(symbols, start, end)
+    minutes = synthetic_minute_bars(symbols, start, end)
+    if timeframe == BASE_INTRADAY or minutes.empty:
+        return minutes
+    frames = {
+        sym: resample_bars(grp.droplevel("symbol").rename_axis("ts").reset_index(), timeframe,
+                           complete_before=_utc(end) + pd.Timedelta(minutes=1))
+        for sym, grp in minutes.groupby(level="symbol", sort=False)
+    }
+    return pd.concat(frames, names=["symbol"]).droplevel(1).set_index("ts", append=True).rename_axis(["symbol", "timestamp"])
+
+
+def _timeframe_name(tf) -> str:
+    """alpaca-py TimeFrame → our timeframe name ("5Min", "1Hour", "1Day")."""
+    return str(getattr(tf, "value", tf))
+
+
+@dataclass
+class FakeStats:
+    calls: dict = field(default_factory=dict)
+    errors: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def count(self, name: str):
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            return {"calls": dict(self.calls), "errors": self.errors}
+
+
+class _FakeBase:
+    def __init__(self, latency_s: float = 0.0, jitter_s: float = 0.0, error_rate: float = 0.0,
+                 seed: int | None = None, stats: FakeStats | None = None):
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.error_rate = error_rate
+        self.stats = stats or FakeStats()
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def _call(self, name: str):
+        self.stats.count(name)
+        with self._rng_lock:
+            delay = self.latency_s + (self._rng.uniform(-self.jitter_s, self.jitter_s) if self.jitter_s else 0.0)
+            fail = self._rng.random() < self.error_rate
+            status = self._rng.choice((429, 500, 503))
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            with self.stats.lock:
+                self.stats.errors += 1
+            raise _api_error(status, f"fake {name} failure")
+
+
+class FakeDataClient(_FakeBase):
+    """Stand-in for StockHistoricalDataClient (daily and intraday bars)."""
+
+    def get_stock_bars(self, request_params):
+        self._call("get_stock_bars")
+        symbols = request_params.symbol_or_symbols
+        symbols = [symbols] if isinstance(symbols, str) else list(symbols)
+        now = datetime.now(timezone.utc)
+        end = min(_utc(request_params.end or now), _utc(now))
+        timeframe = _timeframe_name(request_params.timeframe)
+        return SimpleNamespace(df=synthetic_bars(symbols, request_params.start, end, timeframe))
+
+
+class FakeTradingClient(_FakeBase):
+    """Stand-in for TradingClient (account + order submission)."""
+
+    def __init__(self, equity: float = 100_000.0, trading_blocked: bool = False, lost_response_rate: float = 0.0,
+                 fill_orders: bool = True, **kwargs):
+        super().__init__(**kwargs)
+        self.equity = equity
+        self.trading_blocked = trading_blocked
+        self.lost_response_rate = lost_response_rate
+        self.fill_orders = fill_orders
+        self.orders: list = []
+        self.positions: dict[str, float] = {}  # symbol → qty (negative = short)
+        self._by_client_id: dict = {}
+        self._orders_lock = threading.Lock()
+
+    def _fill(self, order):
+        qty = float(order.qty) if order.qty is not None else float(order.notional) / FAKE_PRICE
+        sign = 1.0 if str(getattr(order.side, "value", order.side)).lower() == "buy" else -1.0
+        order.status, order.filled_qty, order.filled_avg_price = "filled", str(qty), str(FAKE_PRICE)
+        order.filled_at = datetime.now(timezone.utc)
+        held = self.positions.get(order.symbol, 0.0) + sign * qty
+        if abs(held) < 1e-9:
+            self.positions.pop(order.symbol, None)
+        else:
+            self.positions[order.symbol] = held
+
+    def fill_open_orders(self):
+        with self._orders_lock:
+            for order in self.orders:
+                if order.status == "accepted":
+                    self._fill(order)
+
+    def get_account(self):
+        self._call("get_account")
+        return SimpleNamespace(
+            status="ACTIVE",
+            equity=str(self.equity),
+            cash=str(self.equity),
+            buying_power=str(self.equity),
+            trading_blocked=self.trading_blocked,
+        )
+
+    def submit_order(self, order_data):
+        self._call("submit_order")
+        client_order_id = getattr(order_data, "client_order_id", None) or str(uuid.uuid4())
+        order = SimpleNamespace(
+            id=uuid.uuid4(),
+            client_order_id=client_order_id,
+            symbol=order_data.symbol,
+            side=order_data.side,
+            notional=getattr(order_data, "notional", None),
+            qty=getattr(order_data, "qty", None),
+            status="accepted",
+            submitted_at=datetime.now(timezone.utc),
+            filled_at=None,
+            filled_qty="0",
+            filled_avg_price=None,
+        )
+        with self._orders_lock:
+            if client_order_id in self._by_client_id:
+                raise _api_error(422, "client_order_id must be unique")
+            self.orders.append(order)
+            self._by_client_id[client_order_id] = order
+            if self.fill_orders:
+                self._fill(order)
+        with self._rng_lock:
+            lost = self._rng.random() < self.lost_response_rate
+        if lost:
+            # the order was accepted but the caller never sees the response
+            raise _api_error(504, "fake gateway timeout after accepting order")
+        return order
+
+    def get_all_positions(self):
+        self._call("get_all_positions")
+        with self._orders_lock:
+            return [
+                SimpleNamespace(
+                    symbol=sym,
+                    qty=str(qty),
+                    side="long" if qty > 0 else "short",
+                    market_value=str(qty * FAKE_PRICE),
+                    current_price=str(FAKE_PRICE),
+                )
+                for sym, qty in self.positions.items()
+            ]
+
+    def get_orders(self, filter=None):
+        """Orders newest first, honouring status (open / closed / all), limit, after and until."""
+        self._call("get_orders")
+        status = str(getattr(getattr(filter, "status", None), "value", None) or "open")
+        limit = getattr(filter, "limit", None) or 50
+        after = getattr(filter, "after", None)
+        until = getattr(filter, "until", None)
+        with self._orders_lock:
+            orders = [
+                o for o in reversed(self.orders)
+                if status == "all" or (o.status == "accepted") == (status == "open")
+            ]
+        if after is not None:
+            orders = [o for o in orders if o.submitted_at > after]
+        if until is not None:
+            orders = [o for o in orders if o.submitted_at < until]
+        return orders[:limit]
+
+    def cancel_open_orders(self):
+        """Cancel every order not filled yet (fill_orders=False), as the broker does at the close."""
+        with self._orders_lock:
+            for order in self.orders:
+                if order.status == "accepted":
+                    order.status = "canceled"
+
+    def get_calendar(self, filters=None):
+        """Weekday sessions 09:30–16:00 New York time (no holidays)."""
+        self._call("get_calendar")
+        start = getattr(filters, "start", None) or datetime.now(timezone.utc).date()
+        end = getattr(filters, "end", None) or start
+        return [
+            SimpleNamespace(date=d.date(), open=d.replace(hour=9, minute=30), close=d.replace(hour=16))
+            for d in pd.bdate_range(start, end).to_pydatetime()
+        ]
+
+    def get_order_by_client_id(self, client_id: str):
+        self._call("get_order_by_client_id")
+        with self._orders_lock:
+            if client_id not in self._by_client_id:
+                raise _api_error(404, "order not found")
+            return self._by_client_id[client_id]
+
+
+class FakeAlpaca:
+    """A matching pair of fake data / trading clients sharing one stats object."""
+
+    def __init__(self, latency_s: float = 0.0, jitter_s: float = 0.0, error_rate: float = 0.0,
+                 seed: int | None = 0, **trading_kwargs):
+        self.stats = FakeStats()
+        common = dict(latency_s=latency_s, jitter_s=jitter_s, error_rate=error_rate, stats=self.stats)
+        self.data_client = FakeDataClient(seed=seed, **common)
+        self.trading_client = FakeTradingClient(seed=None if seed is None else seed + 1, **common, **trading_kwargs)
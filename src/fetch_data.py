@@ -4,33 +4,25 @@
 from pathlib import Path
 import argparse
 import logging
-from logging.handlers import RotatingFileHandler
 
 import pandas as pd
-from alpaca.data.historical import StockHistoricalDataClient
 from alpaca.data.requests import StockBarsRequest
-from alpaca.data.timeframe import TimeFrame
 
-from src.config import settings
+from src.config import PROJECT_ROOT, settings
+from src.clients import get_data_client
+from src.rate_limit import call_with_retry
+from src.logging_utils import get_logger, setup_logging
+from src.bar_store import AppendResult, BarStore, get_bar_store
+from src.timeframes import TIMEFRAMES, alpaca_timeframe
 
-TF_MAP = {
-    "1Day": TimeFrame.Day,
-    "1Min": TimeFrame.Minute,
-    "5Min": TimeFrame(5, TimeFrame.Minute),
-    "15Min": TimeFrame(15, TimeFrame.Minute),
-    "30Min": TimeFrame(30, TimeFrame.Minute),
-    "1Hour": TimeFrame.Hour,
-}
+TF_MAP = {tf: alpaca_timeframe(tf) for tf in TIMEFRAMES}
 
 def fetch_bars(symbol: str, start: str, end: str | None, timeframe: str = "1Day") -> pd.DataFrame:
     """Fetch historical bars from Alpaca and return a tidy DataFrame."""
     if timeframe not in TF_MAP:
         raise ValueError(f"Unsupported timeframe: {timeframe}")
 
-    client = StockHistoricalDataClient(
-        api_key=settings.api_key,
-        secret_key=settings.api_secret
-    )
+    client = get_data_client()
 
     req = StockBarsRequest(
         symbol_or_symbols=[symbol],
@@ -39,7 +31,7 @@ def fetch_bars(symbol: str, start: str, end: str | None, timeframe: str = "1Day"
         end=end,
     )
 
-    bars = client.get_stock_bars(req)
+    bars = call_with_retry(lambda: client.get_stock_bars(req))
     df = bars.df.copy()
 
     if df.empty:
@@ -83,29 +75,29 @@ def merge_and_save(df_new: pd.DataFrame, outfile: Path, logger: logging.Logger)
     logger.info(f"Saved {len(combined)} total rows → {outfile}")
     return combined
 
+def save_bars(
+    df_new: pd.DataFrame,
+    symbol: str,
+    timeframe: str,
+    logger: logging.Logger,
+    store: BarStore | None = None,
+) -> AppendResult:
+    """Append newly fetched bars to the bar store (no full re-read unless backfilling)."""
+    store = store or get_bar_store()
+    if df_new.empty:
+        logger.warning("No new data to save.")
+
+    result = store.append(symbol, timeframe, df_new)
+    logger.info(
+        f"Saved {result.added} new rows ({result.total} total, rewritten={result.rewritten}) "
+        f"→ {store.path_for(symbol, timeframe)}"
+    )
+    return result
+
 # 3) Add error logging that writes to logs/fetch_data.log
 def setup_logger(log_path: Path) -> logging.Logger:
-    log_path.parent.mkdir(parents=True, exist_ok=True)
-
-    logger = logging.getLogger("fetch_data")
-    logger.setLevel(logging.INFO)
-
-    # Avoid adding multiple handlers if this is called twice
-    if not logger.handlers:
-        handler = RotatingFileHandler(
-            log_path,
-            maxBytes=500_000,  # ~500 KB
-            backupCount=3,
-            encoding="utf-8",
-        )
-        fmt = logging.Formatter(
-            "%(asctime)s - %(levelname)s - %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
-        )
-        handler.setFormatter(fmt)
-        logger.addHandler(handler)
-
-    return logger
+    # records go through the shared queue listener (logging_utils)
+    return get_logger("fetch_data", log_path)
 
 #4) Wire it all together in main()
 def main():
@@ -114,16 +106,18 @@ def main():
     parser.add_argument("--start", required=True, help="Start date YYYY-MM-DD (UTC)")
     parser.add_argument("--end", default=None, help="End date YYYY-MM-DD (UTC, optional)")
     parser.add_argument("--timeframe", default="1Day", choices=list(TF_MAP.keys()))
-    parser.add_argument("--outfile", default=None, help="Output CSV path (default: data/{symbol}_{timeframe}.csv)")
+    parser.add_argument("--outfile", default=None, help="Output CSV path (default: the configured bar store)")
     args = parser.parse_args()
 
     data_dir = Path("data")
-    logs_dir = Path("logs")
+    logs_dir = PROJECT_ROOT / settings.log_dir
     logs_dir.mkdir(parents=True, exist_ok=True)
 
+    setup_logging(console=True, level=settings.log_level)
     logger = setup_logger(logs_dir / "fetch_data.log")
 
-    outfile = Path(args.outfile) if args.outfile else data_dir / f"{args.symbol}_{args.timeframe}.csv"
+    store = get_bar_store(root=data_dir)
+    outfile = Path(args.outfile) if args.outfile else store.path_for(args.symbol, args.timeframe)
     logger.info(
         f"Starting fetch: symbol={args.symbol}, timeframe={args.timeframe}, "
         f"start={args.start}, end={args.end}, outfile={outfile}"
@@ -138,8 +132,11 @@ def main():
         )
         logger.info(f"Fetched {len(df_new)} new rows from Alpaca.")
 
-        merged = merge_and_save(df_new, outfile, logger)
-        print(f"Done. Total rows in {outfile}: {len(merged)}")
+        if args.outfile:
+            total = len(merge_and_save(df_new, outfile, logger))
+        else:
+            total = save_bars(df_new, args.symbol, args.timeframe, logger, store=store).total
+        print(f"Done. Total rows in {outfile}: {total}")
 
     except Exception as e:
         logger.exception(f"Error during data fetch: {e}")
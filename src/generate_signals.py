@@ -1,13 +1,39 @@
+import logging
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
-from src.modeling_arima import forecast_next_return
-from src.config_strategy import PORTFOLIOS, DEFAULT_PORTFOLIO, UP_THRESHOLD, DOWN_THRESHOLD
+from src import metrics
+from src.bar_store import BarStore, get_bar_store
+from src.config import settings
+from src.model_cache import MODELS_DIR, ModelStateCache
+from src.modeling_arima import forecast_next_return_checked
+from src.signal_engine import forecast_many
+from src.config_strategy import (
+    PORTFOLIOS,
+    DEFAULT_PORTFOLIO,
+    UP_THRESHOLD,
+    DOWN_THRESHOLD,
+    USE_MODEL_CACHE,
+    USE_SIGNAL_CACHE,
+    DEFAULT_MODEL_BACKEND,
+    MODEL_BACKENDS,
+    AR_FIT_METHOD,
+    INTRADAY_LOOKBACK_BARS,
+    PANEL_MMAP,
+)
+from src.modeling_ar import forecast_ar_universe, is_ar_order
+from src.order_registry import OrderRegistry, get_order_registry
+from src.panel import UniversePanel, get_panel
+from src.signal_cache import SignalCache, forecast_key, get_signal_cache
+from src.timeframes import DAILY, is_intraday, validate
 
 # Compute project root based on THIS file's location
 ROOT_DIR = Path(__file__).resolve().parents[1]
 DATA_DIR = ROOT_DIR / "data"
 
+log = logging.getLogger(__name__)
+
 
 def classify_signal(r):
     if r > UP_THRESHOLD:
@@ -18,25 +44,162 @@ def classify_signal(r):
         return "flat"
 
 
-def build_signals_df(portfolio_name: str = DEFAULT_PORTFOLIO) -> pd.DataFrame:
-    symbols = PORTFOLIOS[portfolio_name]
-    records = []
+def model_backend_for(symbol: str, order) -> str:
+    """Configured backend for a symbol; "ar" only applies to pure AR orders."""
+    backend = MODEL_BACKENDS.get(symbol, DEFAULT_MODEL_BACKEND)
+    if backend == "ar" and not is_ar_order(order):
+        return "statsmodels"
+    return backend
+
+
+def _lookback(s: np.ndarray, bars: int) -> np.ndarray:
+    """
+    Between `bars` and 2*`bars` of the most recent points. The window start
+    only jumps every `bars` points, so between jumps the series keeps its
+    prefix and the model cache can filter instead of refitting.
+    """
+    if len(s) <= 2 * bars:
+        return s
+    return s[((len(s) - bars) // bars) * bars:]
+
+
+def _forecast_statsmodels(series: dict, orders: dict, workers: int, model_cache) -> tuple[dict, set]:
+    """Forecasts per symbol, plus the symbols whose forecast failed (failed fits, timeouts, worker errors)."""
+    if workers > 1:
+        results = forecast_many(
+            {sym: np.asarray(s, dtype="float64") for sym, s in series.items()},
+            orders=orders,
+            workers=workers,
+            timeout_s=settings.signal_timeout_s,
+            model_cache=model_cache,
+        )
+        forecasts, failed = {}, set()
+        for res in results:
+            metrics.observe("forecast", res.seconds, symbol=res.symbol)
+            if res.error:
+                log.warning("Forecast failed for %s: %s", res.symbol, res.error)
+                failed.add(res.symbol)
+            forecasts[res.symbol] = res.forecast
+        return forecasts, failed
+
+    forecasts, failed = {}, set()
+    for sym, s in series.items():
+        with metrics.timer("forecast", symbol=sym):
+            forecasts[sym], error = forecast_next_return_checked(
+                np.asarray(s, dtype="float64"), order=orders[sym], symbol=sym, cache=model_cache
+            )
+        if error:
+            failed.add(sym)
+    return forecasts, failed
+
 
+def _forecast_ar(series: dict, orders: dict) -> dict:
+    """One stacked least-squares fit per distinct AR order."""
+    forecasts = {}
+    for order in sorted(set(orders[sym] for sym in series)):
+        group = {sym: np.asarray(s, dtype="float64") for sym, s in series.items() if orders[sym] == order}
+        with metrics.timer("forecast_ar"):
+            forecasts.update(forecast_ar_universe(group, order=order, method=AR_FIT_METHOD))
+    return forecasts
+
+
+def build_signals_df(
+    portfolio_name: str = DEFAULT_PORTFOLIO,
+    store: BarStore | None = None,
+    workers: int | None = None,
+    model_cache: ModelStateCache | None = None,
+    order_registry: OrderRegistry | None = None,
+    timeframe: str = DAILY,
+    symbols: list[str] | None = None,
+    signal_cache: SignalCache | bool | None = None,
+    panel: UniversePanel | None = None,
+) -> pd.DataFrame:
+    """
+    Forecast next-bar returns (next-day for "1Day") for every symbol in the
+    portfolio and classify them.
+
+    workers > 1 fits the models on a process pool (signal_engine); the result
+    is identical to the serial path. Default: settings.signal_workers.
+    With USE_MODEL_CACHE, fitted params are reused between runs (model_cache).
+    Each symbol's (p,d,q) comes from the tuning reports (order_registry),
+    falling back to DEFAULT_ORDER. Symbols configured for the "ar" backend (MODEL_BACKENDS) are forecast
+    together with the closed-form AR(p) fit (modeling_ar).
+    Intraday timeframes use the last ~INTRADAY_LOOKBACK_BARS returns and keep
+    their model state under data/models/<timeframe>/.
+    `symbols` restricts the run to part of the portfolio (e.g. the symbols a
+    streamed bar just updated).
+    With USE_SIGNAL_CACHE, symbols whose returns, order and backend are
+    unchanged since an earlier run reuse that forecast (signal_cache); the
+    hit/miss counts are logged and kept in df.attrs["signal_cache"].
+    signal_cache=False turns it off for a call (e.g. streaming, where every
+    run has new inputs).
+    Returns are read once into a UniversePanel (panel.py; memory-mapped with
+    PANEL_MMAP); pass `panel` to reuse one the caller already built.
+    """
+    symbols = symbols or PORTFOLIOS[portfolio_name]
+    store = store or get_bar_store(root=DATA_DIR)
+    workers = settings.signal_workers if workers is None else workers
+    intraday = is_intraday(validate(timeframe))
+    if model_cache is None and USE_MODEL_CACHE:
+        model_cache = ModelStateCache(root=MODELS_DIR / timeframe if intraday else None)
+    if signal_cache is None and USE_SIGNAL_CACHE:
+        signal_cache = get_signal_cache()
+    elif signal_cache is False:
+        signal_cache = None
+
+    if panel is None:
+        with metrics.timer("panel"):
+            panel = get_panel(store, symbols, timeframe, field="return", mmap=PANEL_MMAP)
+    series = {}
     for sym in symbols:
-        path = DATA_DIR / f"{sym}_1Day_returns_only.csv"
-        df = pd.read_csv(path, parse_dates=["ts"])
-        df = df.sort_values("ts").dropna(subset=["return"]).reset_index(drop=True)
+        y = panel.series(sym)
+        series[sym] = _lookback(y, INTRADAY_LOOKBACK_BARS) if intraday else y
 
-        series = df["return"]
-        forecast = forecast_next_return(series)
+    registry = order_registry or get_order_registry()
+    orders = registry.orders_for(list(series), portfolio=portfolio_name)
+    ar_syms = {sym for sym in series if model_backend_for(sym, orders[sym]) == "ar"}
 
+    forecasts, keys = {}, {}
+    if signal_cache is not None:
+        for sym, s in series.items():
+            backend = f"ar-{AR_FIT_METHOD}" if sym in ar_syms else "statsmodels"
+            keys[sym] = forecast_key(s, orders[sym], backend)
+            hit = signal_cache.get(keys[sym])
+            if hit is not None:
+                forecasts[sym] = hit
+    todo = {sym: s for sym, s in series.items() if sym not in forecasts}
+
+    computed = _forecast_ar({sym: s for sym, s in todo.items() if sym in ar_syms}, orders)
+    sm_forecasts, failed = _forecast_statsmodels(
+        {sym: s for sym, s in todo.items() if sym not in ar_syms}, orders, workers, model_cache
+    )
+    computed.update(sm_forecasts)
+    forecasts.update(computed)
+
+    cache_report = None
+    if signal_cache is not None:
+        for sym, forecast in computed.items():
+            if sym not in failed:
+                signal_cache.put(keys[sym], forecast, symbol=sym)
+        signal_cache.flush()
+        cache_report = {"hits": len(series) - len(todo), "misses": len(todo)}
+        metrics.incr("signal_cache.hits", cache_report["hits"])
+        metrics.incr("signal_cache.misses", cache_report["misses"])
+        log.info("Signal cache: %d hit(s), %d miss(es)", cache_report["hits"], cache_report["misses"])
+
+    records = []
+    for sym, s in series.items():
+        forecast = forecasts[sym]
         records.append(
             {
                 "symbol": sym,
                 "forecast_return": forecast,
                 "signal": classify_signal(forecast),
-                "n_points": len(series),
+                "n_points": len(s),
             }
         )
 
-    return pd.DataFrame(records)
\ No newline at end of file
+    out = pd.DataFrame(records)
+    if cache_report is not None:
+        out.attrs["signal_cache"] = cache_report
+    return out
@@ -1,19 +1,11 @@
-import logging, os, sys
-from logging.handlers import RotatingFileHandler
+from .config import PROJECT_ROOT, settings
+from .logging_utils import get_logger as _get_logger
 
-def get_logger(name: str, log_dir: str = "logs") -> logging.Logger:
-    os.makedirs(log_dir, exist_ok=True)
-    logger = logging.getLogger(name)
-    if logger.handlers:
-        return logger
-    logger.setLevel(logging.INFO)
-    fmt = logging.Formatter("%(asctime)s | %(levelname)s | %(name)s | %(message)s")
 
-    ch = logging.StreamHandler(sys.stdout)
-    ch.setFormatter(fmt)
-    logger.addHandler(ch)
-
-    fh = RotatingFileHandler(os.path.join(log_dir, f"{name}.log"), maxBytes=1_000_000, backupCount=3)
-    fh.setFormatter(fmt)
-    logger.addHandler(fh)
-    return logger
+def get_logger(name: str, log_dir: str | None = None, console: bool = False):
+    """
+    Logger writing to <log_dir>/<name>.log, and to stdout with console=True
+    (see logging_utils). A relative log_dir (default settings.log_dir) is
+    under PROJECT_ROOT, like the directories ensure_runtime_dirs creates.
+    """
+    return _get_logger(name, PROJECT_ROOT / (log_dir or settings.log_dir) / f"{name}.log", console=console)
@@ -1,30 +1,212 @@
 # src/logging_utils.py
+"""
+One logging subsystem for the whole bot.
+
+- Every logger hands records to a QueueHandler on the root logger; a single
+  QueueListener thread does the formatting and I/O (rotating files, plus
+  stdout when asked for), so worker threads never block on disk.
+- Records are routed to logs/<top-level logger name>.log when that name was
+  registered with get_logger() (e.g. "bot" → logs/bot.log), otherwise to
+  logs/app.log.
+- LOG_FORMAT=json writes one JSON object per line (with any `extra=` fields);
+  LOG_LEVEL sets the level (default INFO) of the loggers from get_logger().
+- Importing code doesn't get console output or a new root level: the CLI
+  entry points opt in with setup_logging(console=True, level=...), library
+  callers with get_logger(name, console=True).
+- Process pools: pass `initializer=init_worker_logging,
+  initargs=worker_logging_args()` and worker records are shipped back over a
+  multiprocessing queue to the parent's listener.
+"""
+from __future__ import annotations
+
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import multiprocessing
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
-def get_logger(name: str, log_path: Path) -> logging.Logger:
+from .config import PROJECT_ROOT, settings
+
+DEFAULT_LOG_NAME = "app"
+TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+
+# LogRecord attributes that are not user-supplied `extra=` fields
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "process": record.processName,
+            "thread": record.threadName,
+        }
+        out.update({k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS})
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, default=str)
+
+
+def _make_formatter(json_format: bool) -> logging.Formatter:
+    return JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+
+
+class _FileRouter(logging.Handler):
+    """Sends each record to the rotating file of its top-level logger name."""
+
+    def __init__(self, default_path: Path, formatter: logging.Formatter):
+        super().__init__()
+        self._formatter = formatter
+        self._files: dict[str, RotatingFileHandler] = {}
+        self._paths: dict[str, Path] = {}
+        self._files_lock = threading.Lock()
+        self.add(DEFAULT_LOG_NAME, default_path)
+
+    def add(self, name: str, path: Path, max_bytes: int = 1_000_000, backup_count: int = 3):
+        path = Path(path)
+        with self._files_lock:
+            if self._paths.get(name) == path:
+                return
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+            handler.setFormatter(self._formatter)
+            old = self._files.get(name)
+            self._files[name], self._paths[name] = handler, path
+        if old is not None:
+            old.close()
+
+    def emit(self, record: logging.LogRecord):
+        files = self._files
+        handler = files.get(record.name.split(".", 1)[0]) or files[DEFAULT_LOG_NAME]
+        handler.handle(record)
+
+    def close(self):
+        with self._files_lock:
+            for handler in self._files.values():
+                handler.close()
+        super().close()
+
+
+class _State:
+    listener: QueueListener | None = None
+    router: _FileRouter | None = None
+    console: logging.Handler | None = None
+    formatter: logging.Formatter | None = None
+    records: queue.SimpleQueue | None = None
+    handlers: list[logging.Handler] = []
+    mp_queue = None
+    mp_listener: QueueListener | None = None
+    lock = threading.Lock()
+
+
+def setup_logging(
+    log_dir: Path | str | None = None,
+    level: str | int | None = None,
+    json_format: bool | None = None,
+    console: bool = False,
+) -> None:
     """
-    Create or return a logger with a rotating file handler.
-    Ensures we don't attach duplicate handlers if called multiple times.
+    Install the queue handler + background listener (once).
+    console: also write records to stdout. level: set the root logger's
+    level; only the CLI entry points pass it, so importing code keeps the
+    host application's logging config. Later calls can still turn the
+    console on or set the level.
     """
-    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with _State.lock:
+        if _State.listener is None:
+            log_dir = Path(log_dir) if log_dir is not None else PROJECT_ROOT / settings.log_dir
+            json_format = settings.log_json if json_format is None else json_format
+
+            formatter = _make_formatter(json_format)
+            q: queue.SimpleQueue = queue.SimpleQueue()
+            logging.getLogger().addHandler(QueueHandler(q))
+            _State.formatter, _State.records = formatter, q
+            _State.router = _FileRouter(log_dir / f"{DEFAULT_LOG_NAME}.log", formatter)
+            _State.handlers = [_State.router]
+            _State.listener = _start_listener(q)
+
+        if console and _State.console is None:
+            _State.console = logging.StreamHandler(sys.stdout)
+            _State.console.setFormatter(_State.formatter)
+            _State.handlers = _State.handlers + [_State.console]
+            # a listener's handlers are fixed: stop it (which handles what's already queued) and start a new one
+            _State.listener.stop()
+            _State.listener = _start_listener(_State.records)
+        if level is not None:
+            logging.getLogger().setLevel(level.upper() if isinstance(level, str) else level)
+
+
+def _start_listener(q, *handlers: logging.Handler) -> QueueListener:
+    listener = QueueListener(q, *(handlers or _State.handlers), respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def shutdown_logging():
+    """Drain the queues and stop the listener threads."""
+    with _State.lock:
+        for attr in ("mp_listener", "listener"):
+            listener = getattr(_State, attr)
+            if listener is not None:
+                listener.stop()
+                setattr(_State, attr, None)
+        for handler in _State.handlers:
+            handler.close()
+        _State.handlers = []
+        _State.console = _State.records = None
+        root = logging.getLogger()
+        for handler in [h for h in root.handlers if isinstance(h, QueueHandler)]:
+            root.removeHandler(handler)
+        _State.mp_queue = None
+
+
+atexit.register(shutdown_logging)
 
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
-
-    if not logger.handlers:  # avoid duplicate handlers
-        handler = RotatingFileHandler(
-            log_path,
-            maxBytes=500_000,  # ~500KB
-            backupCount=3,
-            encoding="utf-8",
-        )
-        fmt = logging.Formatter(
-            "%(asctime)s - %(levelname)s - %(name)s - %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
-        )
-        handler.setFormatter(fmt)
-        logger.addHandler(handler)
 
+def get_logger(name: str, log_path: Path | str | None = None, console: bool = False) -> logging.Logger:
+    """
+    Logger `name` at LOG_LEVEL, with its records written to log_path
+    (default: <LOG_DIR>/<name>.log) by the background listener, and to
+    stdout with console=True. Other loggers' levels are left alone.
+    """
+    setup_logging(console=console)
+    path = Path(log_path) if log_path is not None else PROJECT_ROOT / settings.log_dir / f"{name}.log"
+    _State.router.add(name.split(".", 1)[0], path)
+    logger = logging.getLogger(name)
+    logger.setLevel(settings.log_level)
     return logger
+
+
+# --- process pools ----------------------------------------------------------
+
+def worker_logging_args() -> tuple:
+    """initargs for init_worker_logging: (queue or None, level)."""
+    with _State.lock:
+        if _State.listener is None:
+            return (None, logging.getLogger().level)
+        if _State.mp_queue is None:
+            _State.mp_queue = multiprocessing.get_context().Queue()
+            # worker records join the main queue, so the main listener does all the I/O
+            _State.mp_listener = _start_listener(_State.mp_queue, QueueHandler(_State.records))
+        return (_State.mp_queue, logging.getLogger().level)
+
+
+def init_worker_logging(log_queue, level) -> None:
+    """ProcessPoolExecutor initializer: forward worker records to the parent."""
+    if log_queue is None:
+        return
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
@@ -1,13 +1,25 @@
+"""
+CLI entry point.
+
+    python -m src.main check            # connectivity only (same as --check)
+    python -m src.main update           # data update only (same as --update-only)
+    python -m src.main [run] [flags]    # update → signals → optional trades
+    python -m src.main daemon [flags]   # the same on a schedule, state kept warm (same as --daemon)
+
+Each command imports only what it needs (the heavy modules — statsmodels,
+the market-data client, the bar store — are loaded inside the command
+functions), so `check` starts fast enough for cron health checks.
+See src/bench_import.py for the startup-time budget.
+"""
 import argparse
 import sys
 
-from .config import settings
-from .logger import get_logger
-from .alpaca_client import AlpacaWrapper
-from .generate_signals import build_signals_df
-from .trading_engine import execute_test_trades
+from . import metrics
+from .config import ensure_runtime_dirs, settings
 from .config_strategy import DEFAULT_PORTFOLIO
-from .update_data import update_portfolio_data
+from .logger import get_logger
+from .logging_utils import setup_logging
+from .timeframes import DAILY, TIMEFRAMES
 
 
 def smoke_check(logger):
@@ -17,8 +29,10 @@ def smoke_check(logger):
     - logs status, equity, cash
     - warns if trading is blocked
     """
+    from .alpaca_client import get_alpaca
+
     try:
-        alp = AlpacaWrapper()
+        alp = get_alpaca()
         acc = alp.account()
         logger.info(f"Connected. Account status={acc.status}, equity={acc.equity}, cash={acc.cash}")
         if alp.is_trading_blocked():
@@ -29,7 +43,19 @@ def smoke_check(logger):
         return False
 
 
-def run_strategy(portfolio: str, allow_trade: bool, notional: float, no_update: bool, update_only: bool, logger):
+def run_strategy(
+    portfolio: str,
+    allow_trade: bool,
+    notional: float,
+    no_update: bool,
+    update_only: bool,
+    logger,
+    workers: int = 1,
+    signal_workers: int | None = None,
+    order_workers: int | None = None,
+    timeframe: str = DAILY,
+    sizing: str | None = None,
+):
 
     """
     End-to-end:
@@ -38,8 +64,11 @@ def run_strategy(portfolio: str, allow_trade: bool, notional: float, no_update:
     - optionally place tiny paper trades
     """
     if not no_update:
-        logger.info(f"Updating market data for portfolio='{portfolio}'...")
-        update_portfolio_data(portfolio_name=portfolio)
+        from .update_data import update_portfolio_data
+
+        logger.info(f"Updating {timeframe} market data for portfolio='{portfolio}'...")
+        with metrics.stage("update", logger):
+            update_portfolio_data(portfolio_name=portfolio, workers=workers, timeframe=timeframe)
     else:
         logger.info("Skipping data update (--no-update). Using existing CSVs.")
 
@@ -47,8 +76,11 @@ def run_strategy(portfolio: str, allow_trade: bool, notional: float, no_update:
         logger.info("Update-only mode (--update-only). Exiting after data update.")
         return
 
-    logger.info(f"Building signals for portfolio='{portfolio}'")
-    signals_df = build_signals_df(portfolio_name=portfolio)
+    from .generate_signals import build_signals_df
+
+    logger.info(f"Building {timeframe} signals for portfolio='{portfolio}'")
+    with metrics.stage("signals", logger):
+        signals_df = build_signals_df(portfolio_name=portfolio, workers=signal_workers, timeframe=timeframe)
 
     print("=== Signals ===")
     print(signals_df)
@@ -58,27 +90,65 @@ def run_strategy(portfolio: str, allow_trade: bool, notional: float, no_update:
         return
 
     # If notional is 0 or negative, fall back to a small default (e.g., $1)
+    from .trading_engine import execute_test_trades
+
     trade_notional = notional if notional > 0 else 1.0
     logger.info(f"Placing paper trades at notional=${trade_notional:.2f} per symbol.")
-    execute_test_trades(signals_df, notional_usd=trade_notional)
+    with metrics.stage("trades", logger):
+        execute_test_trades(signals_df, notional_usd=trade_notional, workers=order_workers, sizing=sizing)
 
 
 def main():
     parser = argparse.ArgumentParser(description="ARIMA-based Alpaca bot")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="run",
+        choices=["run", "check", "update", "daemon"],
+        help="run (default): update, signals, optional trades; check: connection test; update: data only; "
+             "daemon: run on a schedule in one long-lived process.",
+    )
     parser.add_argument(
         "--check",
         action="store_true",
         help="Smoke test Alpaca connection (no orders).",
     )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Stay resident and run on a schedule (see --at, --port).",
+    )
+    parser.add_argument(
+        "--at",
+        action="append",
+        default=None,
+        help="Daemon run time: open+N, close-N or HH:MM New York time; repeatable "
+             f"(default: DAEMON_AT env or {settings.daemon_schedule}).",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=None,
+        help="Daemon control endpoint port (default: DAEMON_PORT env or 8765).",
+    )
     parser.add_argument(
         "--portfolio",
         default=DEFAULT_PORTFOLIO,
         help=f"Portfolio name to use (default: {DEFAULT_PORTFOLIO}).",
     )
+    parser.add_argument(
+        "--timeframe",
+        default=DAILY,
+        choices=list(TIMEFRAMES),
+        help="Bar timeframe for data and signals (default: 1Day). Intraday timeframes are "
+             "built from 1Min bars.",
+    )
     parser.add_argument(
         "--allow-trade",
         action="store_true",
-        help="Actually place small paper trades based on signals.",
+        help="Actually place small paper trades based on signals. Orders are netted against current "
+             "holdings; a flat/short signal sells only the shares the bot bought itself "
+             "(data/bot_positions.json, from its own fills), never shares bought outside the bot.",
     )
     parser.add_argument(
         "--notional",
@@ -86,6 +156,19 @@ def main():
         default=0.0,
         help="USD notional per trade (default: $1 if not specified).",
     )
+    parser.add_argument(
+        "--sizing",
+        default=None,
+        choices=["notional", "weights"],
+        help="Order sizing: $notional per long signal, or target weights × equity "
+             "(LONG_EXPOSURE / SHORT_EXPOSURE; default: ORDER_SIZING in config_strategy).",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="Record per-stage / per-symbol timings and write a run report to reports/metrics/ "
+             "(also METRICS=1; METRICS_PROM_FILE adds a Prometheus text file).",
+    )
     parser.add_argument(
         "--no-update", 
         action="store_true", 
@@ -96,23 +179,73 @@ def main():
         action="store_true", 
         help="Only update data then exit.",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Parallel workers for the data update (default: 1, sequential).",
+    )
+    parser.add_argument(
+        "--signal-workers",
+        type=int,
+        default=None,
+        help="Processes for ARIMA fitting (default: SIGNAL_WORKERS env or 1).",
+    )
+    parser.add_argument(
+        "--order-workers",
+        type=int,
+        default=None,
+        help="Threads submitting orders (default: ORDER_WORKERS env or 8).",
+    )
 
     args = parser.parse_args()
+    command = "check" if args.check else "update" if args.update_only else "daemon" if args.daemon else args.command
 
+    ensure_runtime_dirs()
+    setup_logging(console=True, level=settings.log_level)
     logger = get_logger("bot", settings.log_dir)
+    if args.metrics:
+        metrics.enable()
 
-    if args.check:
+    if command == "check":
         ok = smoke_check(logger)
         sys.exit(0 if ok else 1)
 
-    run_strategy(
-        portfolio=args.portfolio,
-        allow_trade=args.allow_trade,
-        notional=args.notional,
-        no_update=args.no_update,
-        update_only=args.update_only,
-        logger=logger,
-    )
+    if command == "daemon":
+        from .daemon import Daemon
+
+        run_times = args.at or [t.strip() for t in settings.daemon_schedule.split(",") if t.strip()]
+        Daemon(
+            portfolio=args.portfolio,
+            run_times=run_times,
+            allow_trade=args.allow_trade,
+            notional=args.notional,
+            workers=args.workers,
+            signal_workers=args.signal_workers,
+            order_workers=args.order_workers,
+            port=args.port,
+            timeframe=args.timeframe,
+            sizing=args.sizing,
+        ).serve_forever()
+        return
+
+    metrics.start_run()
+    try:
+        run_strategy(
+            portfolio=args.portfolio,
+            allow_trade=args.allow_trade,
+            notional=args.notional,
+            no_update=args.no_update and command != "update",
+            update_only=command == "update",
+            logger=logger,
+            workers=args.workers,
+            signal_workers=args.signal_workers,
+            order_workers=args.order_workers,
+            timeframe=args.timeframe,
+            sizing=args.sizing,
+        )
+    finally:
+        metrics.finish_run()
 
 
 
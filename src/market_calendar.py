@@ -0,0 +1,132 @@
+# src/market_calendar.py
+"""
+US equity trading sessions, from Alpaca's calendar endpoint.
+
+- sessions(start, end) → [Session(date, open, close)] with tz-aware
+  America/New_York open/close (early closes included).
+- Calendar pages are cached per process; if the endpoint is unavailable
+  (or the client doesn't have one), weekdays 09:30–16:00 ET are assumed.
+- parse_run_time / next_run: schedule specs like "open+5", "close-10" or
+  "15:45" (ET), resolved against each session.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+log = logging.getLogger(__name__)
+
+MARKET_TZ = ZoneInfo("America/New_York")
+REGULAR_OPEN = time(9, 30)
+REGULAR_CLOSE = time(16, 0)
+
+
+@dataclass(frozen=True)
+class Session:
+    date: date
+    open: datetime
+    close: datetime
+
+
+def _as_market_time(value, day: date, default: time) -> datetime:
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=MARKET_TZ) if value.tzinfo is None else value.astimezone(MARKET_TZ)
+    if isinstance(value, str) and value:
+        hh, mm = value.split(":")[:2]
+        return datetime.combine(day, time(int(hh), int(mm)), MARKET_TZ)
+    return datetime.combine(day, default, MARKET_TZ)
+
+
+def _weekday_sessions(start: date, end: date) -> list[Session]:
+    out = []
+    d = start
+    while d <= end:
+        if d.weekday() < 5:
+            out.append(Session(d, datetime.combine(d, REGULAR_OPEN, MARKET_TZ), datetime.combine(d, REGULAR_CLOSE, MARKET_TZ)))
+        d += timedelta(days=1)
+    return out
+
+
+class MarketCalendar:
+    def __init__(self, client=None):
+        self.client = client
+        self._cache: dict[tuple[date, date], list[Session]] = {}
+        self._lock = threading.Lock()
+
+    def _fetch(self, start: date, end: date) -> list[Session]:
+        get_calendar = getattr(self.client, "get_calendar", None)
+        if get_calendar is None:
+            return _weekday_sessions(start, end)
+        try:
+            from alpaca.trading.requests import GetCalendarRequest
+
+            rows = get_calendar(GetCalendarRequest(start=start, end=end))
+        except Exception as e:
+            log.warning("Calendar lookup failed (%r); assuming weekday sessions.", e)
+            return _weekday_sessions(start, end)
+        return [
+            Session(r.date, _as_market_time(r.open, r.date, REGULAR_OPEN), _as_market_time(r.close, r.date, REGULAR_CLOSE))
+            for r in rows
+        ]
+
+    def sessions(self, start: date, end: date) -> list[Session]:
+        """Sessions with start <= date <= end (fetched a calendar month at a time)."""
+        out = []
+        month = date(start.year, start.month, 1)
+        while month <= end:
+            nxt = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+            key = (month, nxt - timedelta(days=1))
+            with self._lock:
+                if key not in self._cache:
+                    self._cache[key] = self._fetch(*key)
+                page = self._cache[key]
+            out.extend(s for s in page if start <= s.date <= end)
+            month = nxt
+        return out
+
+    def session_for(self, day: date) -> Session | None:
+        found = self.sessions(day, day)
+        return found[0] if found else None
+
+    def is_open(self, at: datetime) -> bool:
+        s = self.session_for(at.astimezone(MARKET_TZ).date())
+        return s is not None and s.open <= at < s.close
+
+
+# --- schedule specs ---------------------------------------------------------
+
+_SPEC = re.compile(r"^(open|close)\s*([+-]\s*\d+)?$|^(\d{1,2}):(\d{2})$")
+
+
+def parse_run_time(spec: str) -> tuple:
+    """'open+5' → ("open", 5); 'close-10' → ("close", -10); '15:45' → ("at", time(15, 45))"""
+    m = _SPEC.match(spec.strip().lower())
+    if not m:
+        raise ValueError(f"Bad run time {spec!r} (use open+N, close-N or HH:MM, minutes / ET)")
+    if m.group(1):
+        return (m.group(1), int((m.group(2) or "0").replace(" ", "")))
+    return ("at", time(int(m.group(3)), int(m.group(4))))
+
+
+def resolve(spec: tuple, session: Session) -> datetime:
+    kind, value = spec
+    if kind == "open":
+        return session.open + timedelta(minutes=value)
+    if kind == "close":
+        return session.close + timedelta(minutes=value)
+    return datetime.combine(session.date, value, MARKET_TZ)
+
+
+def next_run(calendar: MarketCalendar, specs: list[tuple], after: datetime, horizon_days: int = 14) -> datetime | None:
+    """Earliest scheduled time strictly after `after` on a trading day."""
+    day = after.astimezone(MARKET_TZ).date()
+    for session in calendar.sessions(day, day + timedelta(days=horizon_days)):
+        times = sorted(resolve(spec, session) for spec in specs)
+        for t in times:
+            if t > after:
+                return t
+    return None
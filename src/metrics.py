@@ -0,0 +1,311 @@
+# src/metrics.py
+"""
+Lightweight run metrics: timers, counters and histograms for the hot paths
+(fetch, merge, returns, model fit, forecast, order submit) and the
+pipeline stages.
+
+    from . import metrics
+
+    with metrics.timer("merge", symbol=sym):
+        ...
+    metrics.incr("bars_fetched", len(bars), symbol=sym)
+    metrics.observe("order_submit", latency_s)
+
+    @metrics.timed("signals_build")
+    def build(...): ...
+
+    with metrics.stage("update", logger):   # always timed + logged
+        ...
+
+- Off by default (METRICS=1 or `--metrics` turns it on). Disabled, every
+  call returns after one attribute check and timer() hands back a shared
+  no-op context manager, so the instrumented code pays well under a
+  microsecond per call.
+- Timers feed histograms (fixed Prometheus-style buckets, so memory does
+  not grow with the number of observations). With `symbol`, a per-symbol
+  total is kept as well.
+- Per run: start_run() clears everything; finish_run() writes the JSON run
+  report (reports/metrics/<run>.json) and, with METRICS_PROM_FILE, a
+  Prometheus text-format file (for node_exporter's textfile collector),
+  and returns the report.
+- Only the current process is measured: pool workers report their own
+  per-symbol times back (see signal_engine.ForecastResult.seconds).
+"""
+from __future__ import annotations
+
+import functools
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .config import PROJECT_ROOT, settings
+
+log = logging.getLogger(__name__)
+
+METRICS_DIR = PROJECT_ROOT / settings.reports_dir / "metrics"
+PROM_PREFIX = "arima_bot"
+
+# histogram bucket upper bounds, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last bucket: +Inf
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Linear interpolation inside the bucket holding the q-th observation (like histogram_quantile)."""
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= rank:
+                lo = BUCKETS[i - 1] if i > 0 else 0.0
+                hi = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return max(min(lo + (hi - lo) * (rank - seen) / c, self.max), self.min)
+            seen += c
+        return self.max
+
+    def summary(self) -> dict:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "total_s": round(self.total, 6),
+            "mean_s": round(self.total / self.count, 6),
+            "min_s": round(self.min, 6),
+            "p50_s": round(self.quantile(0.5), 6),
+            "p95_s": round(self.quantile(0.95), 6),
+            "max_s": round(self.max, 6),
+        }
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("registry", "name", "symbol", "t0", "seconds")
+
+    def __init__(self, registry: Metrics, name: str, symbol: str | None):
+        self.registry = registry
+        self.name = name
+        self.symbol = symbol
+        self.seconds = 0.0
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self.t0
+        self.registry.observe(self.name, self.seconds, symbol=self.symbol)
+        if exc_type is not None:
+            self.registry.incr(f"{self.name}.errors", symbol=self.symbol)
+        return False
+
+
+class Metrics:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, run: str | None = None):
+        with self._lock:
+            # pid + random suffix: runs started within the same second get their own report file
+            self.run = run or (
+                datetime.now(timezone.utc).strftime("run-%Y%m%dT%H%M%SZ") + f"-{os.getpid()}-{os.urandom(2).hex()}"
+            )
+            self.started_at = datetime.now(timezone.utc)
+            self._t0 = time.perf_counter()
+            self.histograms: dict[str, _Histogram] = {}
+            self.counters: dict[str, float] = {}
+            self.symbols: dict[str, dict[str, float]] = {}
+
+    # --- recording ------------------------------------------------------------
+
+    def timer(self, name: str, symbol: str | None = None):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, symbol)
+
+    def observe(self, name: str, seconds: float, symbol: str | None = None):
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = _Histogram()
+            hist.add(seconds)
+            if symbol is not None:
+                per = self.symbols.setdefault(symbol, {})
+                per[f"{name}_s"] = per.get(f"{name}_s", 0.0) + seconds
+
+    def incr(self, name: str, n: float = 1, symbol: str | None = None):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+            if symbol is not None:
+                per = self.symbols.setdefault(symbol, {})
+                per[name] = per.get(name, 0) + n
+
+    # --- reporting ------------------------------------------------------------
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "run": self.run,
+                "started_at": self.started_at.isoformat(),
+                "duration_s": round(time.perf_counter() - self._t0, 4),
+                "timers": {name: h.summary() for name, h in sorted(self.histograms.items())},
+                "counters": dict(sorted(self.counters.items())),
+                "symbols": {
+                    sym: {k: round(v, 6) if isinstance(v, float) else v for k, v in per.items()}
+                    for sym, per in sorted(self.symbols.items())
+                },
+            }
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format (histograms in seconds, counters as *_total)."""
+        lines = []
+        with self._lock:
+            for name, h in sorted(self.histograms.items()):
+                metric = f"{PROM_PREFIX}_{_prom_name(name)}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, c in zip(BUCKETS + (math.inf,), h.counts):
+                    cumulative += c
+                    le = "+Inf" if bound == math.inf else repr(bound)
+                    lines.append(f'{metric}_bucket{{le="{le}"}} {cumulative}')
+                lines.append(f"{metric}_sum {h.total:.6f}")
+                lines.append(f"{metric}_count {h.count}")
+            for name, value in sorted(self.counters.items()):
+                metric = f"{PROM_PREFIX}_{_prom_name(name)}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _prom_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _write_atomic(path: Path, text: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+_METRICS = Metrics(enabled=settings.metrics_enabled)
+
+
+def get_metrics() -> Metrics:
+    """Process-wide metrics registry."""
+    return _METRICS
+
+
+def enable(enabled: bool = True):
+    _METRICS.enabled = enabled
+
+
+def enabled() -> bool:
+    return _METRICS.enabled
+
+
+def timer(name: str, symbol: str | None = None):
+    if not _METRICS.enabled:
+        return _NULL_TIMER
+    return _Timer(_METRICS, name, symbol)
+
+
+def observe(name: str, seconds: float, symbol: str | None = None):
+    if _METRICS.enabled:
+        _METRICS.observe(name, seconds, symbol)
+
+
+def incr(name: str, n: float = 1, symbol: str | None = None):
+    if _METRICS.enabled:
+        _METRICS.incr(name, n, symbol)
+
+
+def timed(name: str):
+    """Decorator: time every call of the function under `name`."""
+
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not _METRICS.enabled:
+                return fn(*args, **kwargs)
+            with _METRICS.timer(name):
+                return fn(*args, **kwargs)
+
+        return inner
+
+    return wrap
+
+
+@contextmanager
+def stage(name: str, logger: logging.Logger | None = None):
+    """
+    A pipeline stage: always timed and logged ("<name> finished in 1.23s"),
+    recorded as the "stage.<name>" timer when metrics are on.
+    """
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - t0
+        _METRICS.observe(f"stage.{name}", seconds)
+        (logger or log).info("%s finished in %.2fs", name.capitalize(), seconds)
+
+
+def start_run(run: str | None = None):
+    """Clear all metrics for a new run."""
+    _METRICS.reset(run)
+
+
+def finish_run(report_dir: Path | None = None, prom_file: str | Path | None = None) -> dict | None:
+    """
+    Write the run report (JSON) and, if configured, the Prometheus file.
+    Returns the report, or None when metrics are disabled.
+    """
+    if not _METRICS.enabled:
+        return None
+    report = _METRICS.report()
+    path = (report_dir or METRICS_DIR) / f"{report['run']}.json"
+    _write_atomic(path, json.dumps(report, indent=2))
+    log.info("Metrics report → %s", path)
+    prom_file = prom_file or settings.metrics_prom_file
+    if prom_file:
+        _write_atomic(Path(prom_file), _METRICS.prometheus())
+    return report
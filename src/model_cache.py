@@ -0,0 +1,150 @@
+# src/model_cache.py
+"""
+Persisted ARIMA state per symbol/order, so daily forecasts don't refit from scratch.
+
+For each (symbol, order) we keep the fitted params, the series length they
+were fitted on, and a hash of the series prefix they have seen. On the next
+forecast:
+
+- unchanged prefix, few new points → filter-only update: run the Kalman filter
+  over the full series with the stored params (no optimization) and forecast
+- refit due (MODEL_REFIT_EVERY new points, MODEL_MAX_AGE_DAYS old, or the new
+  standardized residuals drift above MODEL_DRIFT_THRESHOLD)
+                                     → fit warm-started from the stored params
+- history rewritten / no state yet   → full fit (warm-started if params exist)
+
+States live in data/models/{symbol}_{p}-{d}-{q}.json and in memory.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from . import metrics
+from .config import PROJECT_ROOT
+from .config_strategy import MODEL_REFIT_EVERY, MODEL_MAX_AGE_DAYS, MODEL_DRIFT_THRESHOLD
+from .modeling_arima import build_model
+
+MODELS_DIR = PROJECT_ROOT / "data" / "models"
+
+
+@dataclass
+class ModelState:
+    symbol: str
+    order: tuple
+    params: list
+    nobs: int            # series length seen at the last forecast
+    prefix_hash: str     # hash of y[:nobs]
+    fit_nobs: int        # series length at the last (re)fit
+    fitted_at: str       # ISO timestamp of the last (re)fit
+    sigma2: float
+
+
+def _prefix_hash(y: np.ndarray, n: int) -> str:
+    return hashlib.sha1(np.ascontiguousarray(y[:n], dtype="float64").tobytes()).hexdigest()
+
+
+class ModelStateCache:
+    def __init__(
+        self,
+        root: Path | str | None = None,
+        refit_every: int = MODEL_REFIT_EVERY,
+        max_age_days: float = MODEL_MAX_AGE_DAYS,
+        drift_threshold: float = MODEL_DRIFT_THRESHOLD,
+    ):
+        self.root = Path(root) if root is not None else MODELS_DIR
+        self.refit_every = refit_every
+        self.max_age_days = max_age_days
+        self.drift_threshold = drift_threshold
+        self._mem: dict[tuple, ModelState] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, symbol: str, order: tuple) -> Path:
+        return self.root / f"{symbol}_{'-'.join(str(int(o)) for o in order)}.json"
+
+    def load(self, symbol: str, order: tuple) -> ModelState | None:
+        key = (symbol, tuple(order))
+        with self._lock:
+            if key in self._mem:
+                return self._mem[key]
+        path = self._path(symbol, order)
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        raw["order"] = tuple(raw["order"])
+        state = ModelState(**raw)
+        with self._lock:
+            self._mem[key] = state
+        return state
+
+    def save(self, state: ModelState):
+        with self._lock:
+            self._mem[(state.symbol, tuple(state.order))] = state
+        path = self._path(state.symbol, state.order)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(asdict(state), f)
+        os.replace(tmp, path)
+
+    def _refit_due(self, state: ModelState, n: int) -> bool:
+        if n - state.fit_nobs >= self.refit_every:
+            return True
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(state.fitted_at)
+        return age.total_seconds() > self.max_age_days * 86400
+
+    def _drifted(self, res, state: ModelState, n: int) -> bool:
+        n_new = n - state.fit_nobs
+        if n_new <= 0 or not state.sigma2 or state.sigma2 <= 0:
+            return False
+        z = np.asarray(res.resid[-n_new:]) / np.sqrt(state.sigma2)
+        return float(np.mean(z ** 2)) > self.drift_threshold
+
+    def _fit(self, symbol: str, y: np.ndarray, order: tuple, start_params=None):
+        model = build_model(y, order)
+        with metrics.timer("model_fit", symbol=symbol):
+            res = model.fit(start_params=start_params)
+        params = np.asarray(res.params, dtype="float64")
+        sigma2 = float(params[list(model.param_names).index("sigma2")]) if "sigma2" in model.param_names else 0.0
+        now = datetime.now(timezone.utc).isoformat()
+        state = ModelState(symbol, tuple(order), params.tolist(), len(y), _prefix_hash(y, len(y)), len(y), now, sigma2)
+        self.save(state)
+        return res
+
+    def forecast(self, symbol: str, y: np.ndarray, order=(1, 0, 1)) -> tuple[float, str]:
+        """
+        1-step-ahead forecast for y (clean float64 array).
+        Returns (forecast, mode) with mode in {"fit", "warm", "filter"}.
+        Exceptions propagate to the caller.
+        """
+        order = tuple(order)
+        state = self.load(symbol, order)
+
+        if state is None:
+            return float(self._fit(symbol, y, order).forecast(steps=1)[0]), "fit"
+
+        n = len(y)
+        same_history = n >= state.nobs and _prefix_hash(y, state.nobs) == state.prefix_hash
+        if not same_history or self._refit_due(state, n):
+            res = self._fit(symbol, y, order, start_params=state.params)
+            return float(res.forecast(steps=1)[0]), "warm"
+
+        res = build_model(y, order).filter(np.asarray(state.params))
+        if self._drifted(res, state, n):
+            res = self._fit(symbol, y, order, start_params=state.params)
+            return float(res.forecast(steps=1)[0]), "warm"
+
+        if n != state.nobs:
+            state.nobs = n
+            state.prefix_hash = _prefix_hash(y, n)
+            self.save(state)
+        return float(res.forecast(steps=1)[0]), "filter"
@@ -0,0 +1,151 @@
+# src/modeling_ar.py
+"""
+Closed-form AR(p) forecasting for a whole universe at once.
+
+Series are right-aligned into one (n_symbols, T) matrix (NaN-padded on the
+left), and AR coefficients are estimated for every row simultaneously:
+
+- "ols"         → conditional least squares (no constant, like trend="n")
+- "yule_walker" → Yule-Walker equations on the uncentered autocovariances
+
+Both reduce to p×p systems per symbol, built from lagged products of the
+matrix and solved with one batched np.linalg.solve. Nothing is materialized
+beyond a few (n_symbols, T) arrays, so thousands of symbols fit in
+milliseconds. Only pure AR orders (p, d, 0) are supported; d > 0 is
+handled by differencing and integrating the forecast back.
+"""
+from __future__ import annotations
+
+from math import comb
+
+import numpy as np
+
+MIN_POINTS = 100  # same minimum history as the statsmodels path
+
+
+def stack_right_aligned(series: list[np.ndarray], window: int | None = None) -> np.ndarray:
+    """(n, T) float64 matrix with each series right-aligned, NaN on the left."""
+    T = max((len(s) for s in series), default=0)
+    if window is not None:
+        T = min(T, window)
+    Y = np.full((len(series), T), np.nan)
+    for i, s in enumerate(series):
+        s = np.asarray(s, dtype="float64")[-T:] if T else s[:0]
+        if len(s):
+            Y[i, T - len(s):] = s
+    return Y
+
+
+def _lag_products(Y: np.ndarray, p: int):
+    """XtX (n,p,p) and Xty (n,p) for regressing y_t on y_{t-1..t-p}, skipping NaN rows."""
+    n, T = Y.shape
+    target = Y[:, p:]
+    lags = [Y[:, p - 1 - k:T - 1 - k] for k in range(p)]
+    valid = ~np.isnan(target)
+    for lag in lags:
+        valid &= ~np.isnan(lag)
+    target = np.where(valid, target, 0.0)
+    lags = [np.where(valid, lag, 0.0) for lag in lags]
+
+    XtX = np.empty((n, p, p))
+    Xty = np.empty((n, p))
+    for k in range(p):
+        Xty[:, k] = np.einsum("nt,nt->n", lags[k], target)
+        for j in range(k, p):
+            XtX[:, k, j] = XtX[:, j, k] = np.einsum("nt,nt->n", lags[k], lags[j])
+    return XtX, Xty, valid.sum(axis=1)
+
+
+def _autocov(Y: np.ndarray, p: int) -> np.ndarray:
+    """Uncentered autocovariances gamma_0..gamma_p per row (n, p+1), NaN-aware."""
+    n, T = Y.shape
+    mask = ~np.isnan(Y)
+    Z = np.where(mask, Y, 0.0)
+    cnt = mask.sum(axis=1).clip(min=1)
+    gam = np.empty((n, p + 1))
+    for k in range(p + 1):
+        gam[:, k] = np.einsum("nt,nt->n", Z[:, k:], Z[:, :T - k]) / cnt
+    return gam
+
+
+def _solve(A: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Batched solve; singular systems get zero coefficients."""
+    out = np.zeros_like(b)
+    ok = np.abs(np.linalg.det(A)) > 1e-300
+    if ok.any():
+        out[ok] = np.linalg.solve(A[ok], b[ok][..., None])[..., 0]
+    return out
+
+
+def fit_ar(Y: np.ndarray, p: int, method: str = "ols") -> np.ndarray:
+    """AR(p) coefficients (n, p) for each row of Y (phi_1..phi_p)."""
+    if p == 0:
+        return np.zeros((Y.shape[0], 0))
+    if method == "ols":
+        XtX, Xty, _ = _lag_products(Y, p)
+        return _solve(XtX, Xty)
+    if method == "yule_walker":
+        gam = _autocov(Y, p)
+        idx = np.abs(np.arange(p)[:, None] - np.arange(p)[None, :])
+        R = gam[:, idx]
+        return _solve(R, gam[:, 1:])
+    raise ValueError(f"Unknown AR fit method: {method}")
+
+
+def _difference(Y: np.ndarray, d: int) -> np.ndarray:
+    for _ in range(d):
+        Y = Y[:, 1:] - Y[:, :-1]
+    return Y
+
+
+def _last_valid(Y: np.ndarray, k: int) -> np.ndarray:
+    """The last k observations of each right-aligned row, oldest first (n, k)."""
+    return Y[:, Y.shape[1] - k:]
+
+
+def forecast_ar_matrix(Y: np.ndarray, order=(1, 0, 0), method: str = "ols") -> np.ndarray:
+    """
+    1-step-ahead forecasts (n,) for a right-aligned (n, T) matrix.
+    Rows with fewer than MIN_POINTS observations forecast 0.0.
+    """
+    p, d, q = (int(o) for o in order)
+    if q != 0:
+        raise ValueError(f"AR backend only supports (p, d, 0) orders, got {order}")
+
+    n_obs = (~np.isnan(Y)).sum(axis=1)
+    W = _difference(Y, d)
+    phi = fit_ar(W, p, method=method)
+
+    if p:
+        recent = _last_valid(W, p)[:, ::-1]  # w_T, w_{T-1}, ...
+        fc = np.einsum("np,np->n", phi, np.nan_to_num(recent))
+    else:
+        fc = np.zeros(Y.shape[0])
+
+    # integrate back: y_{T+1} = w_hat + sum_k (-1)^(k+1) C(d,k) y_{T+1-k}
+    if d:
+        last = _last_valid(Y, d)[:, ::-1]
+        for k in range(1, d + 1):
+            fc = fc + (-1) ** (k + 1) * comb(d, k) * last[:, k - 1]
+
+    fc = np.where(n_obs >= MIN_POINTS, fc, 0.0)
+    return np.nan_to_num(fc)
+
+
+def forecast_ar_universe(
+    series: dict[str, np.ndarray],
+    order=(1, 0, 0),
+    method: str = "ols",
+    window: int | None = None,
+) -> dict[str, float]:
+    """{symbol: forecast} for clean float64 arrays sharing one AR order."""
+    symbols = list(series)
+    if not symbols:
+        return {}
+    Y = stack_right_aligned([series[s] for s in symbols], window=window)
+    fc = forecast_ar_matrix(Y, order=order, method=method)
+    return {sym: float(f) for sym, f in zip(symbols, fc)}
+
+
+def is_ar_order(order) -> bool:
+    return int(order[2]) == 0
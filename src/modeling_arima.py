@@ -1,41 +1,80 @@
 # src/modeling_arima.py
 
+import logging
+
 import pandas as pd
 import numpy as np
 from statsmodels.tsa.arima.model import ARIMA
 
-def forecast_next_return(series: pd.Series, order=(1, 0, 1)) -> float:
+from . import metrics
+
+log = logging.getLogger(__name__)
+
+def build_model(y: np.ndarray, order=(1, 0, 1)) -> ARIMA:
+    """The ARIMA spec used everywhere for returns (no constant, unconstrained)."""
+    return ARIMA(
+        y,
+        order=order,
+        trend="n",                  # no constant for returns
+        enforce_stationarity=False,
+        enforce_invertibility=False,
+    )
+
+
+def forecast_next_return(series: pd.Series, order=(1, 0, 1), symbol: str | None = None, cache=None) -> float:
     """
     Fit a simple ARIMA model with a fixed (p,d,q) order
     and return a 1-step-ahead forecast of returns.
 
     - Converts to a plain NumPy array (avoids pandas index quirks).
-    - If fitting fails, returns 0.0 and prints the error.
+    - With a ModelStateCache and symbol, reuses the stored fit (see model_cache.py).
+    - If fitting fails, returns 0.0 and logs the error.
     """
     # Clean series
     series = series.dropna().astype(float)
 
-    # Require a decent history length
-    if len(series) < 100:
-        print(f"Series too short for ARIMA (len={len(series)}). Returning 0.0.")
-        return 0.0
-
     # Convert to numpy array to avoid index-related issues
-    y = np.asarray(series.values, dtype="float64")
+    return forecast_next_return_array(
+        np.asarray(series.values, dtype="float64"), order=order, symbol=symbol, cache=cache
+    )
+
+
+def forecast_next_return_array(y: np.ndarray, order=(1, 0, 1), symbol: str | None = None, cache=None) -> float:
+    """
+    Same as forecast_next_return, for a clean float64 array (no NaNs).
+    Used by the process-pool signal engine, which ships plain arrays.
+    """
+    return forecast_next_return_checked(y, order=order, symbol=symbol, cache=cache)[0]
+
+
+def forecast_next_return_checked(
+    y: np.ndarray, order=(1, 0, 1), symbol: str | None = None, cache=None
+) -> tuple[float, str]:
+    """
+    forecast_next_return_array that also reports a failed fit: (forecast, error),
+    with error "" on success and forecast 0.0 on failure. Callers that keep
+    forecasts (the signal cache) use it to tell a real 0.0 from a failure.
+    """
+    # Require a decent history length
+    if len(y) < 100:
+        log.debug("Series too short for ARIMA (len=%d). Returning 0.0.", len(y), extra={"symbol": symbol})
+        return 0.0, ""
 
     try:
-        model = ARIMA(
-            y,
-            order=order,
-            trend="n",                  # no constant for returns
-            enforce_stationarity=False,
-            enforce_invertibility=False,
-        )
-        fit = model.fit()
+        if cache is not None and symbol is not None:
+            forecast, mode = cache.forecast(symbol, y, order)
+            metrics.incr(f"model.{mode}")
+            return forecast, ""
+
+        with metrics.timer("model_fit", symbol=symbol):
+            fit = build_model(y, order).fit()
+        metrics.incr("model.fit")
 
         forecast = fit.forecast(steps=1)[0]
-        return float(forecast)
+        return float(forecast), ""
 
     except Exception as e:
-        print(f"ARIMA failed for series length {len(y)} with order={order}: {repr(e)}")
-        return 0.0
+        log.warning(
+            "ARIMA failed for series length %d with order=%s: %r", len(y), order, e, extra={"symbol": symbol}
+        )
+        return 0.0, repr(e)
@@ -0,0 +1,160 @@
+# src/order_dispatch.py
+"""
+Concurrent order submission.
+
+- Orders go out from a thread pool, all workers sharing one TokenBucket
+  (settings.api_calls_per_minute by default).
+- Transient failures (429 / 5xx / connection errors) are retried per order
+  with jittered exponential backoff.
+- Every order carries a client_order_id fixed before the first attempt, so
+  a retry after a lost response can't create a second order: Alpaca rejects
+  the duplicate id and we look the original order up instead. The
+  CLIENT_ORDER_ID_PREFIX also marks the bot's own orders when they are
+  read back from the broker (position_ledger).
+- Orders are dollar amounts ("notional"); an order with a "qty" (a full
+  exit, see portfolio.rebalance_orders) is sent as a share quantity.
+- Results are handed to `on_result` as soon as each order finishes (in
+  completion order), with the attempt count and end-to-end latency.
+"""
+from __future__ import annotations
+
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable
+
+from alpaca.common.exceptions import APIError
+
+from . import metrics
+from .config import settings
+from .rate_limit import TokenBucket, backoff_delay, call_with_retry, is_transient_error
+
+CLIENT_ORDER_ID_PREFIX = "arima"
+
+
+@dataclass
+class OrderResult:
+    order: dict
+    client_order_id: str
+    status: str  # "success" or "error"
+    order_id: str = ""
+    error: str = ""
+    attempts: int = 0
+    latency_ms: float = 0.0
+
+    def record(self) -> dict:
+        """The order dict plus execution fields, as logged to trades.csv."""
+        return {
+            **self.order,
+            "order_id": self.order_id,
+            "client_order_id": self.client_order_id,
+            "attempts": self.attempts,
+            "latency_ms": round(self.latency_ms, 3),
+        }
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def make_client_order_id(run_id: str, index: int, order: dict) -> str:
+    """Deterministic per (run, order): the same id is reused on every retry."""
+    return f"{CLIENT_ORDER_ID_PREFIX}-{run_id}-{index:05d}-{order['symbol']}-{order['side']}"[:128]
+
+
+def is_bot_order(order) -> bool:
+    """True for a broker order this bot submitted (client_order_id prefix)."""
+    return str(getattr(order, "client_order_id", None) or "").startswith(f"{CLIENT_ORDER_ID_PREFIX}-")
+
+
+def _is_duplicate_id(exc: BaseException) -> bool:
+    return isinstance(exc, APIError) and exc.status_code == 422 and "client_order_id" in str(exc)
+
+
+def submit_with_retry(
+    alpaca,
+    order: dict,
+    client_order_id: str,
+    bucket: TokenBucket | None = None,
+    max_attempts: int = 5,
+    base_delay: float = 0.5,
+    max_delay: float = 8.0,
+) -> OrderResult:
+    """Submit one order; never raises (failures come back as status="error")."""
+    t0 = time.perf_counter()
+
+    def result(status: str, **kw) -> OrderResult:
+        seconds = time.perf_counter() - t0
+        metrics.observe("order_submit", seconds, symbol=order["symbol"])
+        metrics.incr(f"orders.{status}")
+        if attempt > 1:
+            metrics.incr("orders.retries", attempt - 1)
+        return OrderResult(order, client_order_id, status, attempts=attempt, latency_ms=1000.0 * seconds, **kw)
+
+    attempt = 0
+    while True:
+        attempt += 1
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            resp = alpaca.submit_market_order(
+                symbol=order["symbol"],
+                side=order["side"],
+                notional_usd=order["notional"],
+                client_order_id=client_order_id,
+                qty=order.get("qty"),
+            )
+            return result("success", order_id=str(getattr(resp, "id", "")))
+        except Exception as e:
+            if attempt > 1 and _is_duplicate_id(e):
+                # an earlier attempt went through but its response was lost
+                try:
+                    existing = call_with_retry(
+                        lambda: alpaca.get_order_by_client_id(client_order_id),
+                        bucket=bucket,
+                        max_attempts=max_attempts,
+                        base_delay=base_delay,
+                        max_delay=max_delay,
+                    )
+                    return result("success", order_id=str(getattr(existing, "id", "")))
+                except Exception as lookup_error:
+                    return result("error", error=f"duplicate client_order_id, lookup failed: {lookup_error}")
+            if attempt >= max_attempts or not is_transient_error(e):
+                return result("error", error=f"{type(e).__name__}: {e}")
+            time.sleep(backoff_delay(attempt, base_delay, max_delay))
+
+
+def dispatch_orders(
+    alpaca,
+    orders: list[dict],
+    workers: int | None = None,
+    calls_per_minute: float | None = None,
+    max_attempts: int = 5,
+    run_id: str | None = None,
+    on_result: Callable[[OrderResult], None] | None = None,
+) -> list[OrderResult]:
+    """
+    Submit all orders concurrently. Returns results in the input order;
+    `on_result` is called from the calling thread as each one completes.
+    """
+    if not orders:
+        return []
+    workers = max(1, workers or settings.order_workers)
+    bucket = TokenBucket(calls_per_minute or settings.api_calls_per_minute)
+    run_id = run_id or new_run_id()
+
+    results: list[OrderResult | None] = [None] * len(orders)
+    with ThreadPoolExecutor(max_workers=min(workers, len(orders))) as pool:
+        futures = {
+            pool.submit(
+                submit_with_retry, alpaca, o, make_client_order_id(run_id, i, o), bucket, max_attempts
+            ): i
+            for i, o in enumerate(orders)
+        }
+        for fut in as_completed(futures):
+            res = fut.result()
+            results[futures[fut]] = res
+            if on_result is not None:
+                on_result(res)
+    return results
@@ -0,0 +1,110 @@
+# src/order_registry.py
+"""
+Per-symbol ARIMA orders from the tuning reports (reports/arima_tuning_*.csv).
+
+The reports are parsed once per process into a {symbol: order} lookup and
+re-parsed only when a report file is added, removed or modified (mtime).
+When a symbol appears in several reports, the row for the requested
+portfolio wins, otherwise the lowest RMSE. Unknown symbols fall back to
+DEFAULT_ORDER.
+"""
+from __future__ import annotations
+
+import ast
+import logging
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from .config import PROJECT_ROOT
+from .config_strategy import DEFAULT_ORDER
+
+log = logging.getLogger(__name__)
+
+REPORTS_DIR = PROJECT_ROOT / "reports"
+REPORT_GLOB = "arima_tuning_*.csv"
+
+
+def parse_order(value) -> tuple:
+    """'(2, 0, 0)' / '2,0,0' / (2, 0, 0) → (2, 0, 0)"""
+    if isinstance(value, str):
+        value = value.strip()
+        value = ast.literal_eval(value if value.startswith("(") else f"({value})")
+    order = tuple(int(v) for v in value)
+    if len(order) != 3:
+        raise ValueError(f"Expected a (p, d, q) order, got {value!r}")
+    return order
+
+
+class OrderRegistry:
+    def __init__(self, reports_dir: Path | str | None = None, default_order=DEFAULT_ORDER):
+        self.reports_dir = Path(reports_dir) if reports_dir is not None else REPORTS_DIR
+        self.default_order = tuple(default_order)
+        self._lock = threading.Lock()
+        self._signature: tuple | None = None
+        self._rows = pd.DataFrame(columns=["symbol", "order", "rmse", "portfolio"])
+        self._best: dict[str, tuple] = {}
+        self._by_portfolio: dict[tuple[str, str], tuple] = {}
+
+    def _current_signature(self) -> tuple:
+        files = sorted(self.reports_dir.glob(REPORT_GLOB))
+        return tuple((str(f), f.stat().st_mtime_ns) for f in files)
+
+    def _load(self, signature: tuple):
+        frames = []
+        for path, _ in signature:
+            try:
+                df = pd.read_csv(path, usecols=lambda c: c in ("symbol", "order", "rmse", "portfolio"))
+            except (OSError, ValueError, pd.errors.ParserError) as e:
+                log.warning("Skipping unreadable tuning report %s: %r", path, e)
+                continue
+            if "portfolio" not in df.columns:
+                df["portfolio"] = Path(path).stem[len("arima_tuning_"):]
+            frames.append(df)
+
+        rows = pd.concat(frames, ignore_index=True) if frames else self._rows.iloc[0:0]
+        rows = rows.dropna(subset=["symbol", "order"])
+        rows["order"] = rows["order"].map(parse_order)
+        rows["rmse"] = pd.to_numeric(rows.get("rmse"), errors="coerce")
+        rows = rows.sort_values("rmse", na_position="last")
+
+        self._rows = rows
+        best = rows.drop_duplicates("symbol")
+        self._best = dict(zip(best["symbol"], best["order"]))
+        dedup = rows.drop_duplicates(["portfolio", "symbol"])
+        self._by_portfolio = {
+            (p, s): o for p, s, o in zip(dedup["portfolio"], dedup["symbol"], dedup["order"])
+        }
+        self._signature = signature
+
+    def refresh(self):
+        """Re-parse the reports if any of them changed since the last load."""
+        signature = self._current_signature()
+        with self._lock:
+            if signature != self._signature:
+                self._load(signature)
+
+    def _lookup(self, symbol: str, portfolio: str | None) -> tuple:
+        if portfolio is not None and (portfolio, symbol) in self._by_portfolio:
+            return self._by_portfolio[(portfolio, symbol)]
+        return self._best.get(symbol, self.default_order)
+
+    def order_for(self, symbol: str, portfolio: str | None = None) -> tuple:
+        self.refresh()
+        return self._lookup(symbol, portfolio)
+
+    def orders_for(self, symbols: list[str], portfolio: str | None = None) -> dict[str, tuple]:
+        self.refresh()
+        return {sym: self._lookup(sym, portfolio) for sym in symbols}
+
+
+_REGISTRY: OrderRegistry | None = None
+
+
+def get_order_registry() -> OrderRegistry:
+    """Process-wide registry (reports are parsed at most once per change)."""
+    global _REGISTRY
+    if _REGISTRY is None:
+        _REGISTRY = OrderRegistry()
+    return _REGISTRY
@@ -0,0 +1,218 @@
+# src/panel.py
+"""
+UniversePanel: one field (returns or close) for a whole symbol universe as
+a single 2-D array, built once per run and shared by the signal, tuning
+and backtest code instead of one pandas DataFrame per symbol.
+
+- values: (bars × symbols) float64 or float32, NaN where a symbol has no
+  bar; stored column-major, so each symbol's history is one contiguous
+  block (series() hands it out without copying when it has no gaps).
+- ts: the union of all bar timestamps as int64 nanoseconds since the
+  epoch (UTC), sorted.
+- Memory-mapped panels: get_panel(..., mmap=True) keeps the panel under
+  <store root>/panels/ as plain .npy files and reuses it while the stored
+  series are unchanged (same index signatures), so a tuning run, a
+  backtest and a --no-update signal run all open the same file. Pool
+  workers map values.npy themselves and read their column (see
+  tune_arima / backtest), so nothing is pickled or packed per symbol.
+"""
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .bar_store import BarStore, entry_signature
+from .config_strategy import PANEL_DTYPE
+from .file_lock import file_lock
+from .timeframes import validate
+
+# field → (kind stored in the bar store, column)
+FIELDS = {
+    "return": ("returns", "return"),
+    "close": ("bars", "close"),
+}
+
+
+def valid_values(col: np.ndarray) -> np.ndarray:
+    """The non-NaN values of a panel column; a view when they are contiguous."""
+    ok = ~np.isnan(col)
+    idx = np.flatnonzero(ok)
+    if len(idx) == 0:
+        return col[:0]
+    first, last = idx[0], idx[-1] + 1
+    if last - first == len(idx):
+        return col[first:last]
+    return col[ok]
+
+
+def _epoch_ns(ts: pd.Series) -> np.ndarray:
+    return pd.DatetimeIndex(pd.to_datetime(ts, utc=True)).as_unit("ns").asi8
+
+
+@dataclasses.dataclass
+class UniversePanel:
+    symbols: list[str]
+    ts: np.ndarray                      # int64 ns since epoch (UTC), sorted
+    values: np.ndarray                  # (len(ts), len(symbols)), column-major, NaN = no bar
+    field: str = "return"
+    timeframe: str = "1Day"
+    path: Path | None = None            # directory, for memory-mapped panels
+    missing: list[str] = dataclasses.field(default_factory=list)  # requested symbols with nothing stored
+
+    def __post_init__(self):
+        self._col = {sym: j for j, sym in enumerate(self.symbols)}
+
+    # --- building -----------------------------------------------------------
+
+    @classmethod
+    def from_store(
+        cls,
+        store: BarStore,
+        symbols: list[str],
+        timeframe: str = "1Day",
+        field: str = "return",
+        dtype: str = PANEL_DTYPE,
+        start=None,
+        skip_missing: bool = False,
+    ) -> UniversePanel:
+        """
+        Read `field` for every symbol and align it on the union of their
+        timestamps. Each series is reduced to (ts, value) arrays as soon as
+        it is read. A symbol with nothing stored raises FileNotFoundError,
+        or is listed in .missing with skip_missing.
+        """
+        kind, col = FIELDS[field]
+        validate(timeframe)
+        ts_parts, val_parts, found, missing = [], [], [], []
+        for sym in symbols:
+            try:
+                df = store.read(sym, timeframe, kind=kind, start=start)
+            except FileNotFoundError:
+                if not skip_missing:
+                    raise
+                missing.append(sym)
+                continue
+            ok = df[col].notna().to_numpy()
+            ts_parts.append(_epoch_ns(df["ts"])[ok])
+            val_parts.append(df[col].to_numpy(dtype=dtype)[ok])
+            found.append(sym)
+
+        ts = np.unique(np.concatenate(ts_parts)) if ts_parts else np.empty(0, dtype="int64")
+        values = np.full((len(ts), len(found)), np.nan, dtype=dtype, order="F")
+        for j, (t, v) in enumerate(zip(ts_parts, val_parts)):
+            values[np.searchsorted(ts, t), j] = v
+        return cls(found, ts, values, field=field, timeframe=timeframe, missing=missing)
+
+    # --- access -------------------------------------------------------------
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._col
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    @property
+    def dates(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self.ts.astype("datetime64[ns]")).tz_localize("UTC")
+
+    def column(self, symbol: str) -> int:
+        return self._col[symbol]
+
+    def series(self, symbol: str) -> np.ndarray:
+        """A symbol's values without the rows where it has no bar (like dropna)."""
+        return valid_values(self.values[:, self._col[symbol]])
+
+    def rows(self, symbol: str) -> np.ndarray:
+        """Row positions of series(symbol) on the panel index."""
+        return np.flatnonzero(~np.isnan(self.values[:, self._col[symbol]]))
+
+    # --- persistence --------------------------------------------------------
+
+    def save(self, path: Path | str, meta: dict | None = None) -> UniversePanel:
+        """Write values.npy / ts.npy / meta.json into `path` (replaced atomically) and return the mapped panel."""
+        path = Path(path)
+        tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        np.save(tmp / "values.npy", np.asfortranarray(self.values))
+        np.save(tmp / "ts.npy", self.ts)
+        with (tmp / "meta.json").open("w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "symbols": self.symbols,
+                    "missing": self.missing,
+                    "field": self.field,
+                    "timeframe": self.timeframe,
+                    **(meta or {}),
+                },
+                f,
+            )
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        return UniversePanel.load(path)
+
+    @classmethod
+    def load(cls, path: Path | str, mmap: bool = True) -> UniversePanel:
+        path = Path(path)
+        with (path / "meta.json").open("r", encoding="utf-8") as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        return cls(
+            meta["symbols"],
+            np.load(path / "ts.npy", mmap_mode=mode),
+            np.load(path / "values.npy", mmap_mode=mode),
+            field=meta["field"],
+            timeframe=meta["timeframe"],
+            path=path,
+            missing=meta.get("missing", []),
+        )
+
+    @property
+    def values_path(self) -> Path | None:
+        return None if self.path is None else self.path / "values.npy"
+
+
+def get_panel(
+    store: BarStore,
+    symbols: list[str],
+    timeframe: str = "1Day",
+    field: str = "return",
+    dtype: str = PANEL_DTYPE,
+    mmap: bool = False,
+    skip_missing: bool = False,
+) -> UniversePanel:
+    """
+    The panel for `symbols`. With mmap, it is kept on disk under
+    <store root>/panels/ and memory-mapped; the saved copy is reused as
+    long as every series has the same index signature (rows, content hash,
+    last ts) as when it was built.
+    """
+    if not mmap:
+        return UniversePanel.from_store(store, symbols, timeframe, field, dtype, skip_missing=skip_missing)
+
+    kind = FIELDS[field][0]
+    signatures = {}
+    for sym in symbols:
+        entry = store.info(sym, timeframe, kind)
+        signatures[sym] = None if entry is None else list(entry_signature(entry))
+    name = hashlib.sha1(json.dumps([symbols, timeframe, field, dtype]).encode()).hexdigest()[:16]
+    path = store.root / "panels" / f"{field}_{timeframe}_{name}"
+
+    with file_lock(path.with_name(path.name + ".lock")):
+        try:
+            panel = UniversePanel.load(path)
+            with (path / "meta.json").open("r", encoding="utf-8") as f:
+                if json.load(f).get("signatures") == signatures and (skip_missing or not panel.missing):
+                    return panel
+        except (FileNotFoundError, json.JSONDecodeError, ValueError):
+            pass
+
+        panel = UniversePanel.from_store(store, symbols, timeframe, field, dtype, skip_missing=skip_missing)
+        return panel.save(path, meta={"signatures": signatures, "dtype": dtype})
@@ -0,0 +1,151 @@
+# src/portfolio.py
+"""
+Portfolio construction: signals → target weights → target dollars →
+netted orders against what is currently held.
+
+- target_weights: longs share LONG_EXPOSURE, shorts share SHORT_EXPOSURE
+  (equally, or in proportion to |forecast|), each symbol capped at
+  MAX_POSITION_WEIGHT of equity. Capped weight is not handed to the other
+  symbols, so the caps can only lower the gross exposure.
+- fixed_notional_targets: the test-trade sizing, $notional per long.
+- rebalance_orders: one order per symbol for target − current, dropped
+  when smaller than MIN_TRADE_NOTIONAL. Without ALLOW_SHORT, negative
+  targets are held at 0 (Alpaca does not short fractional/notional
+  orders), so a short signal only closes a long. A full exit (target 0)
+  sells the shares held by quantity, so the order matches the position
+  whatever the price does between the snapshot and the fill; partial
+  resizes stay notional.
+
+Everything works on whole arrays (no per-row Python), so a universe of
+thousands of symbols is sized in a few milliseconds.
+"""
+from __future__ import annotations
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .config_strategy import (
+    ALLOW_SHORT,
+    LONG_EXPOSURE,
+    MAX_POSITION_WEIGHT,
+    MIN_TRADE_NOTIONAL,
+    SHORT_EXPOSURE,
+    WEIGHTING_SCHEME,
+)
+
+log = logging.getLogger(__name__)
+
+ORDER_COLUMNS = ["symbol", "side", "notional", "qty", "signal", "forecast_return", "target", "current"]
+
+
+def _latest(signals_df: pd.DataFrame) -> pd.DataFrame:
+    """One row per symbol (the last one), so a repeated symbol is sized once."""
+    if signals_df["symbol"].is_unique:
+        return signals_df
+    return signals_df.drop_duplicates("symbol", keep="last")
+
+
+def _side_weights(mask: np.ndarray, strength: np.ndarray, exposure: float, max_weight: float | None) -> np.ndarray:
+    total = strength[mask].sum()
+    w = np.zeros(len(mask))
+    if total > 0:
+        w[mask] = abs(exposure) * strength[mask] / total
+    if max_weight is not None:
+        w = np.minimum(w, max_weight)
+    return w
+
+
+def target_weights(
+    signals_df: pd.DataFrame,
+    long_exposure: float = LONG_EXPOSURE,
+    short_exposure: float = SHORT_EXPOSURE,
+    max_weight: float | None = MAX_POSITION_WEIGHT,
+    scheme: str = WEIGHTING_SCHEME,
+) -> pd.Series:
+    """
+    Weight per symbol (fraction of equity, negative = short) from a
+    signals frame [symbol, signal, forecast_return].
+
+    scheme: "equal"    → each side's exposure is shared equally
+            "forecast" → in proportion to |forecast_return|
+    """
+    signals_df = _latest(signals_df)
+    sig = signals_df["signal"].to_numpy()
+    if scheme == "equal":
+        strength = np.ones(len(sig))
+    elif scheme == "forecast":
+        strength = np.abs(signals_df["forecast_return"].to_numpy(dtype="float64"))
+    else:
+        raise ValueError(f"Unknown weighting scheme: {scheme}")
+
+    w = _side_weights(sig == "long", strength, long_exposure, max_weight)
+    w -= _side_weights(sig == "short", strength, short_exposure, max_weight)
+    return pd.Series(w, index=signals_df["symbol"].to_numpy(), name="weight")
+
+
+def fixed_notional_targets(signals_df: pd.DataFrame, notional_usd: float) -> pd.Series:
+    """Test-trade sizing: $notional long per "long" signal, -$notional per "short"."""
+    signals_df = _latest(signals_df)
+    sig = signals_df["signal"].to_numpy()
+    dollars = np.where(sig == "long", notional_usd, np.where(sig == "short", -notional_usd, 0.0))
+    return pd.Series(dollars, index=signals_df["symbol"].to_numpy(), name="target")
+
+
+def rebalance_orders(
+    targets: pd.Series,
+    signals_df: pd.DataFrame,
+    current: pd.Series | None = None,
+    min_trade: float = MIN_TRADE_NOTIONAL,
+    allow_short: bool = ALLOW_SHORT,
+    shares: pd.Series | None = None,
+) -> pd.DataFrame:
+    """
+    Netted orders taking `current` dollar holdings (market value by symbol,
+    missing = 0) to `targets`, for the symbols in `targets`; holdings in
+    other symbols are left alone. Columns: ORDER_COLUMNS.
+    With `shares` (shares held by symbol), a sell to a target of 0 gets
+    qty = those shares (NaN on every other order).
+    """
+    targets = targets.groupby(level=0, sort=False).sum()
+    if not allow_short:
+        n_short = int((targets < 0).sum())
+        if n_short:
+            log.debug("Holding %d short target(s) at 0 (shorting notional orders is not supported).", n_short)
+        targets = targets.clip(lower=0.0)
+
+    held = np.zeros(len(targets)) if current is None else current.reindex(targets.index).fillna(0.0).to_numpy()
+    delta = np.round(targets.to_numpy(dtype="float64") - held, 2)
+    keep = np.abs(delta) >= max(min_trade, 0.01)
+
+    qty = np.full(len(targets), np.nan)
+    if shares is not None:
+        held_shares = shares.reindex(targets.index).fillna(0.0).to_numpy(dtype="float64")
+        exit_ = (targets.to_numpy() == 0) & (delta < 0) & (held_shares > 0)
+        qty[exit_] = held_shares[exit_]
+
+    info = _latest(signals_df).set_index("symbol")
+    symbols = targets.index[keep]
+    return pd.DataFrame(
+        {
+            "symbol": symbols,
+            "side": np.where(delta[keep] > 0, "buy", "sell"),
+            "notional": np.abs(delta[keep]),
+            "qty": qty[keep],
+            "signal": info["signal"].reindex(symbols).fillna("flat").to_numpy(),
+            "forecast_return": info["forecast_return"].reindex(symbols).fillna(0.0).to_numpy(dtype="float64"),
+            "target": targets.to_numpy()[keep],
+            "current": held[keep],
+        },
+        columns=ORDER_COLUMNS,
+    )
+
+
+def order_records(orders: pd.DataFrame) -> list[dict]:
+    """Order dicts for order_dispatch / the trades log (qty None on notional orders)."""
+    records = orders.to_dict(orient="records")
+    for rec in records:
+        if pd.isna(rec.get("qty")):
+            rec["qty"] = None
+    return records
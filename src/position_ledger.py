@@ -0,0 +1,107 @@
+# src/position_ledger.py
+"""
+What the bot itself holds: shares per symbol, built only from the fills of
+its own orders (client_order_id prefix, order_dispatch.is_bot_order) read
+back from the broker. Positions opened outside the bot never count as its
+own, and neither do its orders that were canceled or never filled.
+
+- One JSON file, <DATA_DIR>/bot_positions.json, kept apart from the
+  rotated audit logs; updates happen under a file lock (like signal_cache).
+- sync(): closed orders submitted since the previous sync (minus
+  SYNC_OVERLAP, which covers orders that were still open back then) are
+  applied once each, by order id, with their filled_qty.
+- Orders still open in the broker snapshot are skipped (their full value
+  is in BrokerSnapshot.own_pending) and applied by a later sync.
+- The bot's share is capped at the shares the account holds, so shares
+  sold outside the bot stop counting.
+"""
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from .file_lock import file_lock
+from .order_dispatch import is_bot_order
+from .rate_limit import call_with_retry
+
+# orders are DAY orders, so anything still open at one sync is closed well within this
+SYNC_OVERLAP = timedelta(days=3)
+
+
+def _float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _iso(ts) -> str:
+    if isinstance(ts, datetime):
+        return (ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)).isoformat()
+    return str(ts)
+
+
+class PositionLedger:
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+
+    def _read(self) -> dict:
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        data.setdefault("positions", {})
+        data.setdefault("applied", {})
+        data.setdefault("synced_at", None)
+        return data
+
+    def _write(self, data: dict):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def positions(self) -> dict[str, float]:
+        """Shares held by the bot, by symbol (as of the last sync)."""
+        return dict(self._read()["positions"])
+
+    def sync(self, alpaca, held: dict[str, float] | None = None, skip: set[str] | None = None) -> dict[str, float]:
+        """
+        Apply the fills of the bot's closed orders not applied yet and
+        return the bot's shares by symbol, capped at `held` (shares in the
+        account). `skip`: ids of orders that were still open in the
+        snapshot `held` came from.
+        """
+        skip = skip or set()
+        with file_lock(self.lock_path):
+            data = self._read()
+            now = datetime.now(timezone.utc)
+            after = None if data["synced_at"] is None else datetime.fromisoformat(data["synced_at"]) - SYNC_OVERLAP
+            orders = call_with_retry(lambda: alpaca.get_closed_orders(after=after))
+
+            positions, applied = data["positions"], data["applied"]
+            for o in orders:
+                oid = str(o.id)
+                if oid in applied or oid in skip or not is_bot_order(o):
+                    continue
+                qty = _float(o.filled_qty)
+                if qty:
+                    sign = 1.0 if str(getattr(o.side, "value", o.side)).lower() == "buy" else -1.0
+                    positions[o.symbol] = positions.get(o.symbol, 0.0) + sign * qty
+                applied[oid] = _iso(o.submitted_at)
+
+            if held is not None:
+                for sym in list(positions):
+                    positions[sym] = min(positions[sym], max(held.get(sym, 0.0), 0.0))
+            data["positions"] = {sym: round(q, 9) for sym, q in positions.items() if abs(q) > 1e-9}
+            # orders submitted before the next sync's window can't come back
+            horizon = now - SYNC_OVERLAP
+            data["applied"] = {oid: ts for oid, ts in applied.items() if datetime.fromisoformat(ts) >= horizon}
+            data["synced_at"] = now.isoformat()
+            self._write(data)
+            return dict(data["positions"])
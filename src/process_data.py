@@ -1,3 +1,84 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pandas as pd
+
+from .bar_store import AppendResult, BarStore
+
+
+def compute_returns(
+    df: pd.DataFrame,
+    ts_col: str = "ts",
+    price_col: str = "close",
+    prev_close: float | None = None,
+) -> pd.DataFrame:
+    """
+    Simple percent returns [ts, return] from a price frame sorted by ts.
+
+    prev_close is the close of the bar right before df (if any), so the
+    first row of an appended chunk still gets its return.
+    """
+    if price_col not in df.columns:
+        raise ValueError(f"'{price_col}' column not found")
+
+    prices = df[price_col].astype("float64")
+    prev = prices.shift(1)
+    if prev_close is not None and len(prev):
+        prev.iloc[0] = prev_close
+
+    out = pd.DataFrame({ts_col: df[ts_col].values, "return": (prices / prev - 1.0).values})
+    return out.dropna(subset=["return"]).reset_index(drop=True)
+
+
+def update_returns(
+    store: BarStore,
+    symbol: str,
+    timeframe: str,
+    bars_update: AppendResult | None = None,
+) -> int:
+    """
+    Bring the stored returns series in line with the stored bars.
+
+    - Incremental: when bars_update only appended bars right after the bars
+      the returns were last computed from, compute returns for just those
+      bars (carrying the previous close forward) and append them.
+    - Full rebuild: when history was rewritten, no returns exist yet, or the
+      returns index entry doesn't line up with the bars before the append.
+
+    Returns the number of return rows written.
+    """
+    entry = store.info(symbol, timeframe, kind="returns")
+
+    incremental = (
+        bars_update is not None
+        and not bars_update.rewritten
+        and entry is not None
+        and entry.get("last_close") is not None
+        and bars_update.prev_last_ts is not None
+        and entry.get("source_last_ts") == bars_update.prev_last_ts.isoformat()
+    )
+
+    if incremental:
+        new_bars = bars_update.appended
+        if new_bars is None or new_bars.empty:
+            return 0
+        rets = compute_returns(new_bars, prev_close=float(entry["last_close"]))
+        meta = {
+            "source_last_ts": new_bars["ts"].max().isoformat(),
+            "last_close": float(new_bars["close"].iloc[-1]),
+        }
+        return store.append(symbol, timeframe, rets, kind="returns", meta=meta).added
+
+    bars = store.read(symbol, timeframe)
+    rets = compute_returns(bars)
+    meta = {
+        "source_last_ts": None if bars.empty else bars["ts"].max().isoformat(),
+        "last_close": None if bars.empty else float(bars["close"].iloc[-1]),
+    }
+    return store.write(symbol, timeframe, rets, kind="returns", meta=meta)
+
+
 def save_returns_only(
     in_csv: str,
     out_csv: str | None = None,
@@ -24,9 +105,6 @@ def save_returns_only(
     save_returns_only('data/SPY_1Day.csv')
     save_returns_only('data/AAPL_1Day.csv', ts_col='date', price_col='adj_close')
     """
-    import pandas as pd
-    from pathlib import Path
-
     in_path = Path(in_csv)
     if not in_path.exists():
         raise FileNotFoundError(f"Input file not found: {in_csv}")
@@ -42,8 +120,7 @@ def save_returns_only(
     if price_col not in df.columns:
         raise ValueError(f"'{price_col}' column not found in {in_csv}")
 
-    df["return"] = df[price_col].pct_change()
-    df = df.dropna(subset=["return"])[[ts_col, "return"]]
+    df = compute_returns(df, ts_col=ts_col, price_col=price_col)
 
     df.to_csv(out_csv, index=False)
     print(f"✅ Saved {len(df)} rows → {out_csv}")
@@ -0,0 +1,141 @@
+# src/rate_limit.py
+"""
+Shared helpers for talking to the Alpaca REST API from several threads:
+
+- TokenBucket   → caps API calls per minute across all workers
+- call_with_retry → retries transient failures (429 / 5xx / connection errors)
+                    with exponential backoff
+- paced / pace_requests → take one token per HTTP request instead of per
+                    call: alpaca-py follows next_page_token inside a single
+                    get_stock_bars call, so one call can be many requests
+"""
+from __future__ import annotations
+
+import functools
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, TypeVar
+
+from alpaca.common.exceptions import APIError
+from requests.exceptions import ConnectionError as RequestsConnectionError, Timeout
+
+T = TypeVar("T")
+
+# the bucket paced() installed for the current thread
+_local = threading.local()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    - Holds at most `capacity` tokens, refilled continuously at
+      `calls_per_minute / 60` tokens per second.
+    - acquire() blocks until a token is available.
+    """
+
+    def __init__(self, calls_per_minute: float, capacity: float | None = None):
+        if calls_per_minute <= 0:
+            raise ValueError("calls_per_minute must be positive")
+        self.rate = calls_per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, tokens: float = 1.0):
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """429 / 5xx API errors and network hiccups are worth retrying."""
+    if isinstance(exc, APIError):
+        status = exc.status_code
+        return status is not None and (status == 429 or status >= 500)
+    return isinstance(exc, (RequestsConnectionError, Timeout))
+
+
+def backoff_delay(attempt: int, base_delay: float = 1.0, max_delay: float = 30.0) -> float:
+    """Jittered exponential backoff before retry number `attempt` (1-based)."""
+    delay = min(max_delay, base_delay * 2 ** (attempt - 1))
+    return delay * (0.5 + random.random() / 2)
+
+
+def call_with_retry(
+    fn: Callable[[], T],
+    bucket: TokenBucket | None = None,
+    max_attempts: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+) -> T:
+    """
+    Call fn(), taking one token from `bucket` per attempt.
+    Transient errors are retried with jittered exponential backoff;
+    anything else (or the last failure) is re-raised.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= max_attempts or not is_transient_error(e):
+                raise
+            time.sleep(backoff_delay(attempt, base_delay, max_delay))
+
+
+@contextmanager
+def paced(bucket: TokenBucket | None) -> Iterator[None]:
+    """
+    Requests made by this thread through a client set up with
+    pace_requests() take one token each from `bucket` while inside the block.
+    """
+    prev = getattr(_local, "bucket", None)
+    _local.bucket = bucket
+    try:
+        yield
+    finally:
+        _local.bucket = prev
+
+
+def _acquire_paced():
+    bucket = getattr(_local, "bucket", None)
+    if bucket is not None:
+        bucket.acquire()
+
+
+def pace_requests(client):
+    """
+    Make `client` take a token from the paced() bucket for every HTTP request
+    (every page) it sends, and turn off alpaca-py's own retry of 429s so
+    call_with_retry is the only retry layer. Clients without the REST hook
+    (the offline fake answers in one page) take one token per bars call.
+    """
+    name = "_one_request" if hasattr(client, "_one_request") else "get_stock_bars"
+    send = getattr(client, name)
+
+    @functools.wraps(send)
+    def paced_send(*args, **kwargs):
+        _acquire_paced()
+        return send(*args, **kwargs)
+
+    setattr(client, name, paced_send)
+    if hasattr(client, "_retry"):
+        # alpaca-py ignores retry_attempts=0 in the constructor, hence the attribute
+        client._retry = 0
+    return client
@@ -0,0 +1,138 @@
+# src/signal_cache.py
+"""
+Content-addressed cache of 1-step forecasts.
+
+An entry is keyed by a hash of the returns values a forecast was fitted
+on, the (p,d,q) order and the model backend, so a symbol whose inputs did
+not change (a --no-update rerun, a holiday, a failed fetch for that symbol)
+gets its previous forecast back without touching the model at all.
+
+- One JSON file, data/cache/signals.json, read once and written once per
+  run; concurrent writers are merged under a file lock (like bar_index).
+- LRU: hits and puts stamp the entry; on flush, entries beyond
+  SIGNAL_CACHE_MAX_ENTRIES are dropped least recently used first.
+- hits / misses are counted per cache instance (stats()), and
+  build_signals_df reports its own counts at the end of each run.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .config import PROJECT_ROOT
+from .config_strategy import SIGNAL_CACHE_MAX_ENTRIES
+from .file_lock import file_lock
+
+CACHE_PATH = PROJECT_ROOT / "data" / "cache" / "signals.json"
+
+
+def _stat(path: Path) -> tuple[int, int] | None:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def forecast_key(y: np.ndarray, order, backend: str) -> str:
+    h = hashlib.sha1(np.ascontiguousarray(y, dtype="float64").tobytes())
+    h.update(f"|{tuple(int(o) for o in order)}|{backend}".encode())
+    return h.hexdigest()
+
+
+class SignalCache:
+    def __init__(self, path: Path | str | None = None, max_entries: int = SIGNAL_CACHE_MAX_ENTRIES):
+        self.path = Path(path) if path is not None else CACHE_PATH
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[str, dict] = {}
+        self._loaded_stat: tuple[int, int] | None = None
+        self._dirty: set[str] = set()
+        self._lock = threading.RLock()
+
+    def _read_disk(self) -> dict[str, dict]:
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                return json.load(f).get("entries", {})
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _maybe_reload(self):
+        st = _stat(self.path)
+        if st != self._loaded_stat:
+            disk = self._read_disk()
+            for key in self._dirty:
+                disk[key] = self._entries[key]
+            self._entries = disk
+            self._loaded_stat = st
+
+    def get(self, key: str) -> float | None:
+        with self._lock:
+            self._maybe_reload()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry["used"] = time.time()
+            self._dirty.add(key)
+            return float(entry["forecast"])
+
+    def put(self, key: str, forecast: float, symbol: str = ""):
+        if forecast is None or not math.isfinite(forecast):
+            return
+        with self._lock:
+            self._entries[key] = {"forecast": float(forecast), "symbol": symbol, "used": time.time()}
+            self._dirty.add(key)
+
+    def flush(self):
+        """Merge our changes into the file and apply the LRU cap."""
+        with self._lock:
+            if not self._dirty:
+                return
+            with file_lock(self.lock_path):
+                merged = self._read_disk()
+                for key in self._dirty:
+                    merged[key] = self._entries[key]
+                if len(merged) > self.max_entries:
+                    keep = sorted(merged, key=lambda k: merged[k]["used"], reverse=True)[: self.max_entries]
+                    merged = {k: merged[k] for k in keep}
+
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+                with tmp.open("w", encoding="utf-8") as f:
+                    json.dump({"version": 1, "entries": merged}, f)
+                os.replace(tmp, self.path)
+
+                self._entries = merged
+                self._loaded_stat = _stat(self.path)
+                self._dirty.clear()
+
+    def clear(self):
+        with self._lock, file_lock(self.lock_path):
+            self.path.unlink(missing_ok=True)
+            self._entries, self._dirty, self._loaded_stat = {}, set(), None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+_CACHE: SignalCache | None = None
+
+
+def get_signal_cache() -> SignalCache:
+    """Process-wide signal cache."""
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = SignalCache()
+    return _CACHE
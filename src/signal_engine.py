@@ -0,0 +1,179 @@
+# src/signal_engine.py
+"""
+Process-pool forecasting for many symbols at once.
+
+- All return series are packed into one float64 .npy file that workers open
+  with mmap_mode="r", so each task only pickles (symbol, offset, length, order).
+- Symbols are dispatched in chunks; results come back in input order, and
+  each forecast runs the exact same code as the serial path
+  (modeling_arima.forecast_next_return_checked), so output is identical.
+- Per-symbol timeouts (SIGALRM where available) and per-symbol exception
+  handling keep one bad series from taking down the run; failed symbols
+  (including failed fits) get forecast 0.0 and an error string.
+- One overall deadline backstops SIGALRM (which can't interrupt a fit stuck
+  in native code): chunks not done by then are marked timed out and the
+  pool's worker processes are terminated, so nothing hung outlives the run.
+"""
+from __future__ import annotations
+
+import os
+import signal
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from .model_cache import ModelStateCache
+from .logging_utils import init_worker_logging, worker_logging_args
+from .modeling_arima import forecast_next_return_checked
+
+# Per-worker caches: opened memory maps (path → array), model caches (root → cache)
+_MMAPS: dict[str, np.ndarray] = {}
+_MODEL_CACHES: dict[str, ModelStateCache] = {}
+
+
+@dataclass
+class ForecastResult:
+    symbol: str
+    forecast: float
+    n_points: int
+    error: str = ""
+    seconds: float = 0.0  # time spent on this symbol in the worker
+
+
+class _SymbolTimeout(Exception):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise _SymbolTimeout()
+
+
+def pack_series(arrays: list[np.ndarray], path: str) -> np.ndarray:
+    """Concatenate arrays into one float64 .npy at path; returns start offsets (len+1)."""
+    arrays = [np.asarray(a, dtype="float64") for a in arrays]
+    np.save(path, np.concatenate(arrays) if arrays else np.empty(0))
+    return np.concatenate([[0], np.cumsum([len(a) for a in arrays])]).astype("int64")
+
+
+def open_mmap(path: str) -> np.ndarray:
+    """Read-only memory map of a packed .npy, cached per worker process."""
+    arr = _MMAPS.get(path)
+    if arr is None:
+        arr = np.load(path, mmap_mode="r")
+        _MMAPS[path] = arr
+    return arr
+
+
+def _model_cache(root: str | None) -> ModelStateCache | None:
+    if root is None:
+        return None
+    if root not in _MODEL_CACHES:
+        _MODEL_CACHES[root] = ModelStateCache(root)
+    return _MODEL_CACHES[root]
+
+
+def _forecast_one(y: np.ndarray, order: tuple, timeout_s: float | None, symbol: str, cache) -> tuple[float, str]:
+    use_alarm = timeout_s and hasattr(signal, "setitimer")
+    if use_alarm:
+        old = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout_s)
+    try:
+        return forecast_next_return_checked(y, order=order, symbol=symbol, cache=cache)
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, old)
+
+
+def _run_chunk(path: str, tasks: list[tuple], timeout_s: float | None, cache_root: str | None) -> list[ForecastResult]:
+    """Worker entry point: forecast every (symbol, offset, length, order) in the chunk."""
+    data = open_mmap(path)
+    cache = _model_cache(cache_root)
+    out = []
+    for sym, offset, length, order in tasks:
+        t0 = time.perf_counter()
+        try:
+            y = np.array(data[offset:offset + length], dtype="float64")
+            forecast, error = _forecast_one(y, order, timeout_s, sym, cache)
+            res = ForecastResult(sym, forecast, length, error)
+        except _SymbolTimeout:
+            res = ForecastResult(sym, 0.0, length, f"timeout after {timeout_s}s")
+        except Exception as e:
+            res = ForecastResult(sym, 0.0, length, repr(e))
+        res.seconds = time.perf_counter() - t0
+        out.append(res)
+    return out
+
+
+def forecast_many(
+    series: dict[str, np.ndarray],
+    orders: dict[str, tuple] | tuple = (1, 0, 1),
+    workers: int | None = None,
+    chunksize: int | None = None,
+    timeout_s: float | None = 60.0,
+    model_cache: ModelStateCache | None = None,
+) -> list[ForecastResult]:
+    """
+    Forecast the next return for every symbol in `series` (clean float64 arrays).
+
+    orders: one (p,d,q) for all symbols, or {symbol: order}.
+    workers: pool size (default: os.cpu_count()); chunksize: symbols per task
+    (default: spread evenly, ~4 chunks per worker).
+    model_cache: workers reuse stored fits from the same cache directory.
+    """
+    symbols = list(series)
+    if not symbols:
+        return []
+
+    def order_for(sym):
+        return tuple(orders.get(sym, (1, 0, 1))) if isinstance(orders, dict) else tuple(orders)
+
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, -(-len(symbols) // (workers * 4)))
+
+    cache_root = None if model_cache is None else str(model_cache.root)
+    results: dict[str, ForecastResult] = {}
+
+    with tempfile.TemporaryDirectory(prefix="signals_", ignore_cleanup_errors=True) as tmp:
+        path = str(Path(tmp) / "series.npy")
+        offsets = pack_series([series[s] for s in symbols], path)
+
+        tasks = [
+            (sym, int(offsets[i]), int(offsets[i + 1] - offsets[i]), order_for(sym))
+            for i, sym in enumerate(symbols)
+        ]
+        chunks = [tasks[i:i + chunksize] for i in range(0, len(tasks), chunksize)]
+
+        # each worker runs at most its share of the symbols plus one chunk, every one within timeout_s
+        deadline = None if not timeout_s else timeout_s * (-(-len(tasks) // workers) + chunksize) + 30.0
+
+        pool = ProcessPoolExecutor(
+            max_workers=workers, initializer=init_worker_logging, initargs=worker_logging_args()
+        )
+        futures = {}
+        try:
+            futures = {pool.submit(_run_chunk, path, chunk, timeout_s, cache_root): chunk for chunk in chunks}
+            done, not_done = wait(futures, timeout=deadline)
+            for fut in done:
+                try:
+                    for res in fut.result():
+                        results[res.symbol] = res
+                except Exception as e:  # e.g. a worker process died
+                    for sym, _, length, _ in futures[fut]:
+                        results[sym] = ForecastResult(sym, 0.0, length, repr(e))
+            for fut in not_done:
+                for sym, _, length, _ in futures[fut]:
+                    results[sym] = ForecastResult(sym, 0.0, length, f"timed out after {deadline:.0f}s")
+        finally:
+            if not all(fut.done() for fut in futures):
+                # a fit stuck in native code ignores SIGALRM: kill the workers rather than leave them running
+                for proc in list((pool._processes or {}).values()):
+                    proc.terminate()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    return [results[sym] for sym in symbols]
@@ -0,0 +1,470 @@
+# src/streaming.py
+"""
+Streaming bar ingestion for intraday signals.
+
+    python -m src.streaming live --timeframe 5Min [--allow-trade] [--record data/replay/today.csv]
+    python -m src.streaming synth --days 5 --out data/replay/tier1.csv
+    python -m src.streaming replay data/replay/tier1.csv --speed 600 --warmup-days 3 [--allow-trade --fake-broker]
+
+- Sources: alpaca-py's StockDataStream (minute bars over a websocket) or
+  ReplaySource, which plays a recorded bar file at `speed`x (0 = as fast
+  as possible) through the same subscribe_bars() / run() / stop() calls.
+- StreamIngestor buffers incoming bars and flushes them as micro-batches
+  (once `batch_bars` bars are waiting or after `max_delay_s`) on its own
+  thread, so the websocket loop never waits on disk. A flush appends the
+  1Min bars to the bar store (kept resident), extends their returns and
+  resamples the signal timeframe (update_data.resample_into).
+- After each flush, signals are recomputed for the symbols that got a new
+  bar in the signal timeframe; the model cache filters the new points with
+  the stored params instead of refitting.
+- With allow_trade, every signal change (including to flat) is sent to
+  trading_engine.execute_test_trades, which diffs it against the broker
+  snapshot: a new long buys, a long that turns flat/short is sold.
+- Live bars can be teed to a replay file (--record) for later load tests;
+  `replay` prints throughput and bar → signal latency and saves them to
+  reports/stream_replay.json.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from .bar_store import BarStore, get_bar_store
+from .config import PROJECT_ROOT, settings
+from .config_strategy import DEFAULT_PORTFOLIO, PORTFOLIOS
+from .event_sink import get_sink
+from .market_calendar import MARKET_TZ
+from .process_data import update_returns
+from .timeframes import BASE_INTRADAY, INTRADAY, validate
+
+log = logging.getLogger(__name__)
+
+REPORTS_DIR = PROJECT_ROOT / "reports"
+
+BAR_FIELDS = ["ts", "open", "high", "low", "close", "volume", "trade_count", "vwap"]
+REPLAY_FIELDS = ["symbol"] + BAR_FIELDS
+
+
+# --- replay files -------------------------------------------------------------
+
+def load_replay(path: Path | str) -> pd.DataFrame:
+    """Recorded bars [symbol, ts, open, ..., vwap] sorted by ts (CSV or Parquet)."""
+    path = Path(path)
+    df = pd.read_parquet(path) if path.suffix == ".parquet" else pd.read_csv(path)
+    df["ts"] = pd.to_datetime(df["ts"], utc=True)
+    return df.sort_values(["ts", "symbol"], kind="stable").reset_index(drop=True)
+
+
+def save_replay(df: pd.DataFrame, path: Path | str) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df = df.reindex(columns=REPLAY_FIELDS)
+    if path.suffix == ".parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+def synthetic_replay(symbols: list[str], days: int, end=None) -> pd.DataFrame:
+    """Minute bars for the last `days` business days from the offline fake (fake_alpaca)."""
+    from .fake_alpaca import synthetic_minute_bars
+
+    end = pd.Timestamp.now(tz="UTC").normalize() if end is None else pd.Timestamp(end, tz="UTC")
+    start = end - pd.tseries.offsets.BDay(days)
+    df = synthetic_minute_bars(symbols, start, end)
+    return df.reset_index().rename(columns={"timestamp": "ts"})
+
+
+class ReplaySource:
+    """
+    Plays a replay file like a StockDataStream: bars are handed to the
+    subscribed (async) handler in timestamp order, `speed` times faster than
+    recorded (0 = no waiting).
+    """
+
+    def __init__(self, bars: pd.DataFrame | Path | str, speed: float = 60.0):
+        self.bars = bars if isinstance(bars, pd.DataFrame) else load_replay(bars)
+        self.speed = speed
+        self._handler = None
+        self._symbols: set[str] = set()
+        self._stop = threading.Event()
+
+    def subscribe_bars(self, handler, *symbols: str):
+        self._handler = handler
+        self._symbols.update(symbols)
+
+    def run(self):
+        asyncio.run(self._run())
+
+    def stop(self):
+        self._stop.set()
+
+    async def _run(self):
+        df = self.bars
+        if self._symbols and "*" not in self._symbols:
+            df = df[df["symbol"].isin(self._symbols)]
+        if df.empty or self._handler is None:
+            return
+
+        t0_wall, t0_data = time.perf_counter(), df["ts"].iloc[0]
+        for ts, grp in df.groupby("ts", sort=True):
+            if self._stop.is_set():
+                break
+            if self.speed > 0:
+                delay = (ts - t0_data).total_seconds() / self.speed - (time.perf_counter() - t0_wall)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            for rec in grp.to_dict("records"):
+                rec["timestamp"] = rec.pop("ts")
+                await self._handler(SimpleNamespace(**rec))
+
+
+# --- ingestion ------------------------------------------------------------------
+
+@dataclass
+class StreamStats:
+    bars: int = 0
+    flushes: int = 0
+    signal_runs: int = 0
+    orders: int = 0
+    errors: int = 0
+    flush_ms: list = field(default_factory=list)
+    bar_to_signal_ms: list = field(default_factory=list)
+
+    def summary(self) -> dict:
+        def pct(values: list) -> dict:
+            if not values:
+                return {}
+            a = np.asarray(values)
+            return {"p50": round(float(np.percentile(a, 50)), 2), "p95": round(float(np.percentile(a, 95)), 2),
+                    "max": round(float(a.max()), 2)}
+
+        return {
+            "bars": self.bars,
+            "flushes": self.flushes,
+            "signal_runs": self.signal_runs,
+            "orders": self.orders,
+            "errors": self.errors,
+            "flush_ms": pct(self.flush_ms),
+            "bar_to_signal_ms": pct(self.bar_to_signal_ms),
+        }
+
+
+class StreamIngestor:
+    def __init__(
+        self,
+        portfolio: str = DEFAULT_PORTFOLIO,
+        timeframe: str = BASE_INTRADAY,
+        store: BarStore | None = None,
+        batch_bars: int | None = None,
+        max_delay_s: float = 1.0,
+        model_cache=None,
+        allow_trade: bool = False,
+        notional: float = 1.0,
+        order_workers: int | None = None,
+        record_path: Path | str | None = None,
+    ):
+        from .model_cache import MODELS_DIR, ModelStateCache
+
+        if validate(timeframe) not in INTRADAY:
+            raise ValueError(f"Streaming needs an intraday timeframe, not {timeframe}")
+        self.portfolio = portfolio
+        self.symbols = list(dict.fromkeys(PORTFOLIOS[portfolio]))
+        self.timeframe = timeframe
+        self.store = store or get_bar_store()
+        self.store.keep_resident()
+        # one flush per minute once every symbol's bar is in
+        self.batch_bars = batch_bars or len(self.symbols)
+        self.max_delay_s = max_delay_s
+        self.model_cache = model_cache or ModelStateCache(root=MODELS_DIR / timeframe)
+        self.allow_trade = allow_trade
+        self.notional = notional if notional > 0 else 1.0
+        self.order_workers = order_workers
+        self.record_path = None if record_path is None else Path(record_path)
+
+        self.stats = StreamStats()
+        self.signals: dict[str, dict] = {}
+        self._pending: list[dict] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # --- receiving (stream thread) ------------------------------------------
+
+    async def on_bar(self, bar):
+        """StockDataStream handler (must be a coroutine); just queues the bar."""
+        self.add(bar)
+
+    def add(self, bar):
+        row = {"symbol": bar.symbol, "ts": bar.timestamp}
+        row.update({k: getattr(bar, k, None) for k in BAR_FIELDS[1:]})
+        if self.record_path is not None:
+            get_sink(self.record_path, REPLAY_FIELDS).write(row)
+        row["received"] = time.perf_counter()
+        with self._lock:
+            self._pending.append(row)
+            n = len(self._pending)
+        if n >= self.batch_bars:
+            self._wake.set()
+
+    # --- flushing (ingest thread) -------------------------------------------
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="stream-ingest", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Flush what is left and stop the ingest thread."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.record_path is not None:
+            get_sink(self.record_path, REPLAY_FIELDS).flush()
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            self._wake.wait(timeout=self.max_delay_s)
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+    def seed(self, bars: pd.DataFrame):
+        """Bulk-load history [symbol, ts, ...] before streaming (no signals, no orders)."""
+        for rec in bars.to_dict("records"):
+            rec["timestamp"] = rec.pop("ts")
+            self.add(SimpleNamespace(**rec))
+        with self._lock:
+            batch, self._pending = self._pending, []
+        self._save(batch)
+
+    def _save(self, batch: list[dict]) -> list[str]:
+        """Append a micro-batch to the store; symbols with a new signal-timeframe bar."""
+        from .update_data import resample_into
+
+        updated = []
+        df = pd.DataFrame(batch)
+        with self.store.index.batch():
+            for sym, rows in df.groupby("symbol", sort=False):
+                try:
+                    saved = self.store.append(sym, BASE_INTRADAY, rows[BAR_FIELDS])
+                    update_returns(self.store, sym, BASE_INTRADAY, saved)
+                    if self.timeframe != BASE_INTRADAY:
+                        saved = resample_into(self.store, sym, self.timeframe)
+                    if saved.added:
+                        updated.append(sym)
+                except Exception as e:
+                    self.stats.errors += 1
+                    log.warning("Stream append failed for %s: %r", sym, e, extra={"symbol": sym})
+        return updated
+
+    def flush(self) -> pd.DataFrame | None:
+        """Save pending bars, recompute signals for updated symbols, trade on changes."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return None
+
+        t0 = time.perf_counter()
+        updated = self._save(batch)
+        self.stats.bars += len(batch)
+        self.stats.flushes += 1
+        self.stats.flush_ms.append(1000.0 * (time.perf_counter() - t0))
+        if not updated:
+            return None
+
+        from .generate_signals import build_signals_df
+
+        try:
+            signals_df = build_signals_df(
+                self.portfolio,
+                store=self.store,
+                model_cache=self.model_cache,
+                timeframe=self.timeframe,
+                symbols=updated,
+                signal_cache=False,
+            )
+        except Exception as e:
+            self.stats.errors += 1
+            log.warning("Stream signal update failed: %r", e)
+            return None
+        done = time.perf_counter()
+        self.stats.signal_runs += 1
+        self.stats.bar_to_signal_ms.extend(1000.0 * (done - row["received"]) for row in batch if row["symbol"] in updated)
+
+        changed = []
+        for rec in signals_df.to_dict("records"):
+            prev = self.signals.get(rec["symbol"])
+            if prev is None or prev["signal"] != rec["signal"]:
+                changed.append(rec)
+            self.signals[rec["symbol"]] = rec
+        if changed and self.allow_trade:
+            self._trade(pd.DataFrame(changed))
+        return signals_df
+
+    def _trade(self, changed: pd.DataFrame):
+        from .trading_engine import execute_test_trades
+
+        log.info("Signal change: %s", ", ".join(f"{r.symbol}→{r.signal}" for r in changed.itertuples()))
+        try:
+            results = execute_test_trades(changed, notional_usd=self.notional, workers=self.order_workers)
+            self.stats.orders += len(results)
+        except Exception as e:
+            self.stats.errors += 1
+            log.warning("Stream order submission failed: %r", e)
+
+
+def run_stream(source, ingestor: StreamIngestor, duration_s: float | None = None) -> dict:
+    """Feed `source` into `ingestor` until the source ends (replay), duration_s passes or Ctrl-C."""
+    source.subscribe_bars(ingestor.on_bar, *ingestor.symbols)
+    ingestor.start()
+    timer = None
+    if duration_s:
+        timer = threading.Timer(duration_s, source.stop)
+        timer.daemon = True
+        timer.start()
+    t0 = time.perf_counter()
+    try:
+        source.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if timer is not None:
+            timer.cancel()
+        ingestor.stop()
+    elapsed = time.perf_counter() - t0
+    summary = ingestor.stats.summary()
+    summary["elapsed_s"] = round(elapsed, 3)
+    summary["bars_per_s"] = round(summary["bars"] / elapsed, 1) if elapsed > 0 else None
+    return summary
+
+
+def _split_warmup(bars: pd.DataFrame, days: int) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """First `days` trading days (New York dates) vs the rest."""
+    if days <= 0:
+        return bars.iloc[:0], bars
+    dates = bars["ts"].dt.tz_convert(MARKET_TZ).dt.date
+    cutoff = sorted(dates.unique())[min(days, dates.nunique()) - 1]
+    return bars[dates <= cutoff], bars[dates > cutoff]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming bar ingestion (live or replayed)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    def common(p):
+        p.add_argument("--portfolio", default=DEFAULT_PORTFOLIO)
+        p.add_argument("--timeframe", default=BASE_INTRADAY, choices=list(INTRADAY), help="Signal timeframe")
+        p.add_argument("--batch-bars", type=int, default=None, help="Flush after this many bars (default: one per symbol)")
+        p.add_argument("--max-delay", type=float, default=1.0, help="Flush at least every N seconds")
+        p.add_argument("--allow-trade", action="store_true", help="Place orders when a signal changes (a change to flat sells what the bot bought)")
+        p.add_argument("--notional", type=float, default=1.0)
+        p.add_argument("--order-workers", type=int, default=None)
+        p.add_argument("--duration", type=float, default=None, help="Stop after N seconds")
+
+    p_live = sub.add_parser("live", help="Subscribe to Alpaca minute bars")
+    common(p_live)
+    p_live.add_argument("--no-update", action="store_true", help="Skip the catch-up update before streaming")
+    p_live.add_argument("--record", default=None, help="Also write every bar to this replay file (CSV)")
+
+    p_synth = sub.add_parser("synth", help="Write a synthetic replay file (offline fake data)")
+    p_synth.add_argument("--portfolio", default=DEFAULT_PORTFOLIO)
+    p_synth.add_argument("--days", type=int, default=5)
+    p_synth.add_argument("--out", required=True)
+
+    p_replay = sub.add_parser("replay", help="Play a recorded bar file through the stream → signal → order path")
+    common(p_replay)
+    p_replay.add_argument("path")
+    p_replay.add_argument("--speed", type=float, default=60.0, help="Replay speed-up (0 = as fast as possible)")
+    p_replay.add_argument("--warmup-days", type=int, default=0, help="Load the first N days directly as history")
+    p_replay.add_argument("--data-dir", default=None, help="Bar store root (default: a scratch directory)")
+    p_replay.add_argument("--fake-broker", action="store_true", help="Send orders to the offline fake broker")
+    p_replay.add_argument("--latency-ms", type=float, default=0.0, help="Fake broker latency per call")
+    p_replay.add_argument("--out", default=str(REPORTS_DIR / "stream_replay.json"))
+
+    args = parser.parse_args()
+
+    if args.cmd == "synth":
+        path = save_replay(synthetic_replay(PORTFOLIOS[args.portfolio], args.days), args.out)
+        print(f"✅ Saved synthetic replay → {path}")
+        return
+
+    from .logging_utils import setup_logging
+
+    setup_logging(console=True, level=settings.log_level)
+    kwargs = dict(
+        portfolio=args.portfolio,
+        timeframe=args.timeframe,
+        batch_bars=args.batch_bars,
+        max_delay_s=args.max_delay,
+        allow_trade=args.allow_trade,
+        notional=args.notional,
+        order_workers=args.order_workers,
+    )
+
+    if args.cmd == "live":
+        from .clients import make_data_stream
+        from .update_data import update_portfolio_data
+
+        if not args.no_update:
+            update_portfolio_data(portfolio_name=args.portfolio, timeframe=args.timeframe)
+        ingestor = StreamIngestor(record_path=args.record, **kwargs)
+        summary = run_stream(make_data_stream(), ingestor, duration_s=args.duration)
+        print(json.dumps(summary, indent=2))
+        return
+
+    from contextlib import nullcontext
+
+    from .clients import use_clients
+    from .fake_alpaca import FakeTradingClient
+
+    broker = nullcontext()
+    if args.fake_broker:
+        broker = use_clients(trading=FakeTradingClient(latency_s=args.latency_ms / 1000.0))
+
+    bars = load_replay(args.path)
+    history, live = _split_warmup(bars, args.warmup_days)
+    with tempfile.TemporaryDirectory(prefix="replay_", ignore_cleanup_errors=True) as tmp, broker:
+        from . import trading_engine
+        from .model_cache import ModelStateCache
+
+        root = Path(args.data_dir) if args.data_dir else Path(tmp) / "data"
+        if args.fake_broker:
+            # keep fake fills out of logs/trades.csv and the position ledger
+            trading_engine.TRADES_LOG = Path(tmp) / "trades.csv"
+            trading_engine.LEDGER_PATH = Path(tmp) / "bot_positions.json"
+
+        ingestor = StreamIngestor(
+            store=get_bar_store(settings.bar_store, root),
+            model_cache=ModelStateCache(root=root / "models" / args.timeframe),
+            **kwargs,
+        )
+        if not history.empty:
+            ingestor.seed(history)
+            print(f"Loaded {len(history)} warm-up bars; replaying {len(live)} at {args.speed:g}x")
+        summary = run_stream(ReplaySource(live, speed=args.speed), ingestor, duration_s=args.duration)
+
+    summary.update({"source": str(args.path), "speed": args.speed, "timeframe": args.timeframe})
+    print(json.dumps(summary, indent=2))
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    print(f"Saved stream replay report → {out_path}")
+
+
+if __name__ == "__main__":
+    main()
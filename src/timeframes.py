@@ -0,0 +1,109 @@
+# src/timeframes.py
+"""
+Bar timeframes used across the bot.
+
+- "1Day" bars are fetched from Alpaca as daily bars.
+- Intraday timeframes ("1Min", "5Min", "15Min", "30Min", "1Hour") are all
+  built from the stored 1Min series: only minute bars are fetched, and
+  higher timeframes are resampled from them (resample_bars), so every
+  intraday series agrees with the same source data.
+- Intraday series are stored partitioned by (New York) trading date,
+  see bar_store.
+
+pandas is imported lazily: the CLI imports this module for its argument
+choices (see bench_import).
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+BASE_INTRADAY = "1Min"
+DAILY = "1Day"
+
+# timeframe → bar length in minutes
+TIMEFRAMES = {
+    "1Min": 1,
+    "5Min": 5,
+    "15Min": 15,
+    "30Min": 30,
+    "1Hour": 60,
+    "1Day": 24 * 60,
+}
+
+INTRADAY = tuple(tf for tf in TIMEFRAMES if tf != DAILY)
+
+
+def validate(timeframe: str) -> str:
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"Unsupported timeframe: {timeframe} (choose from {list(TIMEFRAMES)})")
+    return timeframe
+
+
+def is_intraday(timeframe: str) -> bool:
+    return timeframe in INTRADAY
+
+
+def bar_delta(timeframe: str) -> pd.Timedelta:
+    import pandas as pd
+
+    return pd.Timedelta(minutes=TIMEFRAMES[validate(timeframe)])
+
+
+def source_timeframe(timeframe: str) -> str:
+    """The timeframe that is actually fetched to build `timeframe`."""
+    return BASE_INTRADAY if is_intraday(validate(timeframe)) else timeframe
+
+
+def alpaca_timeframe(timeframe: str):
+    """alpaca-py TimeFrame for a timeframe name."""
+    from alpaca.data.timeframe import TimeFrame, TimeFrameUnit
+
+    minutes = TIMEFRAMES[validate(timeframe)]
+    if timeframe == DAILY:
+        return TimeFrame.Day
+    if minutes % 60 == 0:
+        return TimeFrame(minutes // 60, TimeFrameUnit.Hour)
+    return TimeFrame(minutes, TimeFrameUnit.Minute)
+
+
+def resample_bars(bars: pd.DataFrame, timeframe: str, complete_before: pd.Timestamp | None = None) -> pd.DataFrame:
+    """
+    Aggregate 1Min bars [ts, open, high, low, close, volume, ...] into
+    `timeframe` bars, each stamped with its bucket start (like Alpaca).
+
+    - Buckets are aligned to the clock (5Min → :00, :05, ...), as Alpaca
+      does: the 09:30 open starts a bucket up to 30Min, 1Hour bars start
+      on the hour.
+    - Only complete buckets are returned: a bucket is kept once its end is
+      at or before `complete_before` (default: one minute after the last
+      input bar). The still-forming bucket is built on the next update.
+    - vwap is volume-weighted, trade_count summed, when present.
+    """
+    import pandas as pd
+
+    delta = bar_delta(timeframe)
+    cols = [c for c in ("ts", "open", "high", "low", "close", "volume", "trade_count", "vwap") if c in bars.columns]
+    if bars.empty:
+        return pd.DataFrame(columns=cols)
+
+    df = bars[cols].copy()
+    df["ts"] = pd.to_datetime(df["ts"], utc=True)
+    if complete_before is None:
+        complete_before = df["ts"].max() + bar_delta(BASE_INTRADAY)
+
+    df["bucket"] = df["ts"].dt.floor(delta)
+    agg = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+    if "trade_count" in df.columns:
+        agg["trade_count"] = "sum"
+    if "vwap" in df.columns:
+        df["_pv"] = df["vwap"] * df["volume"]
+        agg["_pv"] = "sum"
+
+    out = df.sort_values("ts").groupby("bucket", sort=True).agg(agg)
+    if "_pv" in out.columns:
+        out["vwap"] = (out.pop("_pv") / out["volume"]).where(out["volume"] > 0, out["close"])
+    out = out[out.index + delta <= complete_before]
+    return out.rename_axis("ts").reset_index()[cols]
@@ -1,56 +1,88 @@
 # src/trading_engine.py
 
-from pathlib import Path
+import logging
 from datetime import datetime
-import csv
 from typing import List, Dict
 
 import pandas as pd
-from alpaca.common.exceptions import APIError
 
-from .alpaca_client import AlpacaWrapper
-from .config_strategy import LONG_EXPOSURE, SHORT_EXPOSURE
+from .alpaca_client import get_alpaca
+from .config import PROJECT_ROOT, settings
+from .order_dispatch import OrderResult, dispatch_orders
+from .event_sink import get_sink
+from .config_strategy import ORDER_SIZING
+from .position_ledger import PositionLedger
+from .portfolio import fixed_notional_targets, order_records, rebalance_orders, target_weights
+from .rate_limit import call_with_retry
 
 
-LOG_DIR = Path("logs")
-LOG_DIR.mkdir(exist_ok=True)
+LOG_DIR = PROJECT_ROOT / settings.log_dir
 TRADES_LOG = LOG_DIR / "trades.csv"
+LEDGER_PATH = PROJECT_ROOT / settings.data_dir / "bot_positions.json"
 
+log = logging.getLogger(__name__)
 
-def compute_test_orders(signals_df: pd.DataFrame, notional_usd: float = 1.0) -> List[Dict]:
+
+def compute_test_orders(
+    signals_df: pd.DataFrame,
+    notional_usd: float = 1.0,
+    current: pd.Series | None = None,
+    shares: pd.Series | None = None,
+) -> List[Dict]:
     """
     For now:
-    - 'long'  → BUY $notional
-    - 'short' → NO ORDER (skipped; fractional shorts not allowed)
-    - 'flat'  → NO ORDER
+    - 'long'  → hold $notional
+    - 'short' → hold nothing (fractional shorts not allowed)
+    - 'flat'  → hold nothing
+    With `current` holdings (USD by symbol), only the difference is
+    ordered: an existing $notional long needs no order, a long in a
+    symbol that turned short/flat is sold. Without it, every long buys.
+    execute_test_trades only passes the bot's own share of each holding
+    (position_ledger), so shares bought outside the bot are never sold.
+    With `shares` held, a full exit sells those shares by quantity.
+    A symbol listed more than once gets one order (its last signal).
     """
-    orders = []
-
-    for _, row in signals_df.iterrows():
-        sym = row["symbol"]
-        signal = row["signal"]
-        forecast = float(row["forecast_return"])
-
-        if signal == "flat":
-            continue
-
-        if signal == "short":
-            # Just log that we'd *like* to short, but skip placing an order for now
-            print(f"Skipping SHORT signal for {sym} (forecast={forecast:.6f}) – shorting fractional notional not supported.")
-            continue
-
-        # If we got here, signal == "long"
-        orders.append(
-            {
-                "symbol": sym,
-                "side": "buy",
-                "notional": float(notional_usd),
-                "signal": signal,
-                "forecast_return": forecast,
-            }
-        )
-
-    return orders
+    targets = fixed_notional_targets(signals_df, notional_usd)
+    return order_records(rebalance_orders(targets, signals_df, current, shares=shares))
+
+
+def compute_weighted_orders(
+    signals_df: pd.DataFrame,
+    equity: float,
+    current: pd.Series | None = None,
+    shares: pd.Series | None = None,
+) -> List[Dict]:
+    """Orders to the target weights (LONG_EXPOSURE / SHORT_EXPOSURE, capped per symbol) of `equity`."""
+    targets = target_weights(signals_df) * equity
+    return order_records(rebalance_orders(targets, signals_df, current, shares=shares))
+
+
+TRADES_FIELDS = [
+    "timestamp",
+    "symbol",
+    "side",
+    "notional",
+    "signal",
+    "forecast_return",
+    "status",
+    "error",
+    "order_id",
+    "client_order_id",
+    "attempts",
+    "latency_ms",
+    "qty",
+]
+
+
+def bot_holdings(snapshot, shares: dict[str, float]) -> pd.Series:
+    """
+    The bot's own holdings in USD by symbol: its ledger shares at the
+    snapshot price plus its orders still open.
+    """
+    out = {sym: q * snapshot.prices.get(sym, 0.0) for sym, q in shares.items()}
+    for sym, value in snapshot.own_pending.items():
+        out[sym] = out.get(sym, 0.0) + value
+    return pd.Series(out, dtype="float64")
 
 
 def append_trades_log(records: List[Dict], status: str, error: str = ""):
@@ -61,94 +93,114 @@ def append_trades_log(records: List[Dict], status: str, error: str = ""):
     if not records:
         return
 
-    file_exists = TRADES_LOG.exists()
-
-    with TRADES_LOG.open("a", newline="") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=[
-                "timestamp",
-                "symbol",
-                "side",
-                "notional",
-                "signal",
-                "forecast_return",
-                "status",
-                "error",
-                "order_id",
-            ],
-        )
-        if not file_exists:
-            writer.writeheader()
-
-        ts = datetime.utcnow().isoformat()
-
-        for rec in records:
-            writer.writerow(
-                {
-                    "timestamp": ts,
-                    "symbol": rec["symbol"],
-                    "side": rec["side"],
-                    "notional": rec["notional"],
-                    "signal": rec["signal"],
-                    "forecast_return": rec["forecast_return"],
-                    "status": status,
-                    "error": error,
-                    "order_id": rec.get("order_id", ""),
-                }
-            )
-
+    ts = datetime.utcnow().isoformat()
 
-def execute_test_trades(signals_df: pd.DataFrame, notional_usd: float = 1.0):
+    get_sink(TRADES_LOG, TRADES_FIELDS).write_many(
+        [
+            {
+                "timestamp": ts,
+                "symbol": rec["symbol"],
+                "side": rec["side"],
+                "notional": rec["notional"],
+                "signal": rec["signal"],
+                "forecast_return": rec["forecast_return"],
+                "status": status,
+                "error": error,
+                "order_id": rec.get("order_id", ""),
+                "client_order_id": rec.get("client_order_id", ""),
+                "attempts": rec.get("attempts", ""),
+                "latency_ms": rec.get("latency_ms", ""),
+                "qty": rec.get("qty") or "",
+            }
+            for rec in records
+        ]
+    )
+
+
+def execute_test_trades(
+    signals_df: pd.DataFrame,
+    notional_usd: float = 1.0,
+    workers: int | None = None,
+    calls_per_minute: float | None = None,
+    sizing: str | None = None,
+):
     """
     End-to-end:
-    - build tiny $1 test orders from ARIMA signals
-    - send them to Alpaca paper trading
-    - log results to logs/trades.csv
+    - build tiny $1 test orders from ARIMA signals (sizing="notional", the
+      ORDER_SIZING default), or orders to the target weights × account
+      equity (sizing="weights"; see portfolio.py)
+    - diff the targets against current positions plus open orders (one
+      AlpacaWrapper.snapshot per run), so only the deltas are submitted
+      and a rerun after a partial failure doesn't buy twice. Only the
+      bot's own share counts (bot_holdings: filled shares of its own
+      orders from the position ledger, plus its open orders): a
+      flat/short signal sells what the bot bought, and shares bought
+      outside the bot are never sold, even in the same symbol. A full exit
+      sells the bot's shares by quantity; everything else is notional
+    - send them to Alpaca paper trading, concurrently and rate-limited
+      (order_dispatch; default settings.order_workers threads)
+    - log each result to logs/trades.csv as it completes (buffered event_sink,
+      flushed once all orders are done)
+    Returns the OrderResults (empty when nothing was placed).
     """
-    alpaca = AlpacaWrapper()
+    alpaca = get_alpaca()
 
     if alpaca.is_trading_blocked():
-        print("❌ Trading is blocked on this account.")
-        return
+        log.warning("Trading is blocked on this account.")
+        return []
+
+    snapshot = call_with_retry(lambda: alpaca.snapshot(refresh=True))
+    shares = PositionLedger(LEDGER_PATH).sync(alpaca, held=snapshot.qty, skip=snapshot.own_open)
+    current = bot_holdings(snapshot, shares)
+    shares = pd.Series(shares, dtype="float64")
+    log.info(
+        "Broker snapshot: %d position(s) (%d held by the bot), %d open order(s)",
+        len(snapshot.positions), len(shares), snapshot.n_open_orders,
+    )
+
+    sizing = sizing or ORDER_SIZING
+    if sizing == "notional":
+        orders = compute_test_orders(signals_df, notional_usd=notional_usd, current=current, shares=shares)
+    elif sizing == "weights":
+        orders = compute_weighted_orders(
+            signals_df, equity=float(alpaca.account().equity), current=current, shares=shares
+        )
+    else:
+        raise ValueError(f"Unknown order sizing: {sizing}")
 
-    orders = compute_test_orders(signals_df, notional_usd=notional_usd)
+    # sells wait for the bot's own open orders in the symbol: their shares aren't held yet
+    busy = snapshot.busy | {o["symbol"] for o in orders if o["side"] == "sell" and o["symbol"] in snapshot.own_pending}
+    if busy:
+        log.info("Skipping %s: open orders not yet filled.", ", ".join(sorted(busy)))
+        orders = [o for o in orders if o["symbol"] not in busy]
 
     if not orders:
-        print("No trades to place (all signals flat).")
-        return
-
-    success_records = []
-    error_records = []
+        log.info("No trades to place (holdings already match the signals).")
+        return []
 
+    log.info("Placing %d orders", len(orders))
     for o in orders:
-        print(
-            f"Placing {o['side'].upper()} ${o['notional']} in {o['symbol']} "
-            f"(signal={o['signal']}, forecast={o['forecast_return']:.6f})"
+        log.debug(
+            "Placing %s $%s in %s (signal=%s, forecast=%.6f)",
+            o["side"].upper(), o["notional"], o["symbol"], o["signal"], o["forecast_return"],
         )
-        try:
-            resp = alpaca.submit_market_order(
-                symbol=o["symbol"],
-                side=o["side"],
-                notional_usd=o["notional"],
+
+    def on_result(res: OrderResult):
+        if res.status == "success":
+            append_trades_log([res.record()], status="success", error="")
+        else:
+            log.warning(
+                "Order failed for %s after %d attempt(s): %s", res.order["symbol"], res.attempts, res.error,
+                extra={"client_order_id": res.client_order_id, "latency_ms": res.latency_ms},
             )
-            o["order_id"] = getattr(resp, "id", "")
-            success_records.append(o)
-
-        except APIError as e:
-            print(f"  ❌ APIError for {o['symbol']}: {e}")
-            o["order_id"] = ""
-            error_records.append(o)
-        except Exception as e:
-            print(f"  ❌ Unexpected error for {o['symbol']}: {e}")
-            o["order_id"] = ""
-            error_records.append(o)
-
-    # Log successes and errors
-    if success_records:
-        append_trades_log(success_records, status="success", error="")
-    if error_records:
-        append_trades_log(error_records, status="error", error="see console")
-
-    print(f"✅ Done. Success: {len(success_records)}, Errors: {len(error_records)}")
-    print(f"Trades logged to: {TRADES_LOG}")
+            append_trades_log([res.record()], status="error", error=res.error)
+
+    results = dispatch_orders(
+        alpaca, orders, workers=workers, calls_per_minute=calls_per_minute, on_result=on_result
+    )
+
+    get_sink(TRADES_LOG, TRADES_FIELDS).flush()
+
+    n_ok = sum(r.status == "success" for r in results)
+    log.info("Done. Success: %d, Errors: %d. Trades logged to: %s", n_ok, len(results) - n_ok, TRADES_LOG)
+    return results
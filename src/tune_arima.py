@@ -0,0 +1,252 @@
+# src/tune_arima.py
+"""
+Grid-search ARIMA tuning for a whole portfolio, on a process pool.
+
+For every symbol in config_symbols.PORTFOLIOS[portfolio]:
+- split returns into train / last n_test points (like the tuning notebook)
+- fit candidate (p,d,q) orders on train, in order of increasing p+q
+- pick the lowest-AIC order and score its n_test-step forecast (RMSE)
+
+Pruning: a candidate is only fitted if a "parent" ((p-1,d,q) or (p,d,q-1))
+was fitted and kept. Candidates whose fit raises or has a non-finite AIC,
+or whose AIC is more than aic_margin above the best AIC so far for that d,
+are not expanded. Fits that don't converge are never selected.
+
+Returns are loaded once into a memory-mapped UniversePanel (panel.py,
+reused across runs while the data is unchanged); workers map the same
+file and read their symbol's column. Each finished symbol is
+appended to a JSONL checkpoint, so an interrupted run resumes where it
+stopped. Output: reports/arima_tuning_{portfolio}.csv with the same
+symbol,order,rmse,train_len,test_len,portfolio schema as the notebook.
+
+Usage:
+    python -m src.tune_arima --portfolio all --p 0-3 --d 0 --q 0-3 --workers 8
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .bar_store import get_bar_store
+from .config import PROJECT_ROOT
+from .config_symbols import PORTFOLIOS
+from .modeling_arima import build_model
+from .logging_utils import init_worker_logging, worker_logging_args
+from .panel import get_panel, valid_values
+from .signal_engine import open_mmap
+
+REPORTS_DIR = PROJECT_ROOT / "reports"
+
+
+def parse_range(text: str) -> list[int]:
+    """'0-3' → [0, 1, 2, 3]; '0,2' → [0, 2]; '1' → [1]"""
+    out = []
+    for part in str(text).split(","):
+        if "-" in part:
+            lo, hi = part.split("-")
+            out.extend(range(int(lo), int(hi) + 1))
+        else:
+            out.append(int(part))
+    return sorted(set(out))
+
+
+def build_grid(ps: list[int], ds: list[int], qs: list[int]) -> list[tuple]:
+    """All (p,d,q) candidates, simplest first."""
+    grid = [(p, d, q) for p in ps for d in ds for q in qs]
+    return sorted(grid, key=lambda o: (o[1], o[0] + o[2], o[0], o[2]))
+
+
+def _fit_candidate(train: np.ndarray, order: tuple):
+    """(results, converged), or (None, False) if the fit failed outright."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        try:
+            res = build_model(train, order).fit()
+        except Exception:
+            return None, False
+    if not np.isfinite(res.aic):
+        return None, False
+    return res, bool(res.mle_retvals.get("converged", True))
+
+
+def tune_series(y: np.ndarray, grid: list[tuple], n_test: int = 100, aic_margin: float = 2.0) -> dict:
+    """Tune one returns series. Returns order/rmse/train_len/test_len plus search stats."""
+    if len(y) <= n_test + 10:
+        raise ValueError(f"Not enough data (len={len(y)})")
+
+    train, test = y[:-n_test], y[-n_test:]
+    in_grid = set(grid)
+    kept: set[tuple] = set()
+    best_aic_by_d: dict[int, float] = {}
+    best = None  # (aic, order, results)
+    n_fitted = n_pruned = 0
+
+    for order in grid:
+        p, d, q = order
+        parents = [o for o in ((p - 1, d, q), (p, d, q - 1)) if o in in_grid]
+        if parents and not any(o in kept for o in parents):
+            n_pruned += 1
+            continue
+
+        res, converged = _fit_candidate(train, order)
+        n_fitted += 1
+        if res is None:
+            continue
+
+        aic = float(res.aic)
+        if aic > best_aic_by_d.get(d, np.inf) + aic_margin:
+            continue
+        kept.add(order)
+        if not converged:
+            continue
+        best_aic_by_d[d] = min(best_aic_by_d.get(d, np.inf), aic)
+        if best is None or aic < best[0]:
+            best = (aic, order, res)
+
+    if best is None:
+        raise RuntimeError("No candidate order converged")
+
+    aic, order, res = best
+    preds = np.asarray(res.forecast(steps=len(test)))
+    rmse = float(np.sqrt(np.mean((preds - test) ** 2)))
+
+    return {
+        "order": str(tuple(order)),
+        "rmse": rmse,
+        "train_len": int(len(train)),
+        "test_len": int(len(test)),
+        "aic": aic,
+        "n_fitted": n_fitted,
+        "n_pruned": n_pruned,
+    }
+
+
+def _tune_task(path: str, sym: str, col: int, grid: list, n_test: int, aic_margin: float) -> dict:
+    """Worker entry point: tune column `col` of the panel at `path`."""
+    y = np.array(valid_values(open_mmap(path)[:, col]), dtype="float64")
+    try:
+        return {"symbol": sym, **tune_series(y, [tuple(o) for o in grid], n_test, aic_margin)}
+    except Exception as e:
+        return {"symbol": sym, "error": repr(e)}
+
+
+def _load_checkpoint(path: Path, signature: dict) -> dict[str, dict]:
+    done = {}
+    if not path.exists():
+        return done
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a partially written last line from an interrupted run
+            if rec.get("signature") == signature and "error" not in rec:
+                done[rec["symbol"]] = rec
+    return done
+
+
+def tune_portfolio(
+    portfolio: str,
+    grid: list[tuple],
+    n_test: int = 100,
+    aic_margin: float = 2.0,
+    workers: int | None = None,
+    resume: bool = True,
+    timeframe: str = "1Day",
+) -> pd.DataFrame:
+    symbols = PORTFOLIOS[portfolio]
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    checkpoint = REPORTS_DIR / f".tune_checkpoint_{portfolio}.jsonl"
+    signature = {"grid": [list(o) for o in grid], "n_test": n_test, "aic_margin": aic_margin, "timeframe": timeframe}
+
+    done = _load_checkpoint(checkpoint, signature) if resume else {}
+    if not resume:
+        checkpoint.unlink(missing_ok=True)
+    todo = [s for s in symbols if s not in done]
+    print(f"Tuning {len(todo)} symbols ({len(done)} already done) over {len(grid)} candidate orders.")
+
+    panel = get_panel(get_bar_store(), symbols, timeframe, field="return", mmap=True, skip_missing=True)
+    for sym in panel.missing:
+        if sym in todo:
+            print(f"  Error for {sym}: no returns stored for {timeframe}")
+    names = [sym for sym in todo if sym in panel]
+
+    if names:
+        with checkpoint.open("a", encoding="utf-8") as ckpt, \
+                ProcessPoolExecutor(
+                    max_workers=workers or os.cpu_count() or 1,
+                    initializer=init_worker_logging,
+                    initargs=worker_logging_args(),
+                ) as pool:
+            path = str(panel.values_path)
+            futures = [
+                pool.submit(_tune_task, path, sym, panel.column(sym), grid, n_test, aic_margin)
+                for sym in names
+            ]
+            for fut in as_completed(futures):
+                rec = fut.result()
+                sym = rec["symbol"]
+                if "error" in rec:
+                    print(f"  Error for {sym}: {rec['error']}")
+                else:
+                    print(f"  Done: {sym} order={rec['order']}, rmse={rec['rmse']:.6f} "
+                          f"(fitted={rec['n_fitted']}, pruned={rec['n_pruned']})")
+                    done[sym] = rec
+                ckpt.write(json.dumps({**rec, "signature": signature}) + "\n")
+                ckpt.flush()
+
+    rows = [
+        {
+            "symbol": sym,
+            "order": done[sym]["order"],
+            "rmse": done[sym]["rmse"],
+            "train_len": done[sym]["train_len"],
+            "test_len": done[sym]["test_len"],
+            "portfolio": portfolio,
+        }
+        for sym in symbols if sym in done
+    ]
+    results_df = pd.DataFrame(rows, columns=["symbol", "order", "rmse", "train_len", "test_len", "portfolio"])
+    results_df = results_df.sort_values("rmse").reset_index(drop=True)
+
+    out_path = REPORTS_DIR / f"arima_tuning_{portfolio}.csv"
+    results_df.to_csv(out_path, index=False)
+    print(f"Saved tuning results → {out_path}")
+
+    if len(done) == len(symbols):
+        checkpoint.unlink(missing_ok=True)
+    return results_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grid-search ARIMA orders for a portfolio")
+    parser.add_argument("--portfolio", default="all", choices=list(PORTFOLIOS))
+    parser.add_argument("--p", default="0-3", help="AR orders, e.g. 0-3 or 0,1,2")
+    parser.add_argument("--d", default="0", help="Differencing orders, e.g. 0 or 0-1")
+    parser.add_argument("--q", default="0-3", help="MA orders, e.g. 0-3")
+    parser.add_argument("--n-test", type=int, default=100, help="Last N points held out for RMSE")
+    parser.add_argument("--aic-margin", type=float, default=2.0, help="Prune candidates this far above the best AIC")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: all cores)")
+    parser.add_argument("--fresh", action="store_true", help="Ignore any checkpoint from an earlier run")
+    args = parser.parse_args()
+
+    grid = build_grid(parse_range(args.p), parse_range(args.d), parse_range(args.q))
+    tune_portfolio(
+        args.portfolio,
+        grid,
+        n_test=args.n_test,
+        aic_margin=args.aic_margin,
+        workers=args.workers,
+        resume=not args.fresh,
+    )
+
+
+if __name__ == "__main__":
+    main()
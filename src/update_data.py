@@ -2,81 +2,111 @@ from __future__ import annotations
 
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
-import csv
+from concurrent.futures import ThreadPoolExecutor
 
 import pandas as pd
 
 from alpaca.data.historical import StockHistoricalDataClient
 from alpaca.data.requests import StockBarsRequest
-from alpaca.data.timeframe import TimeFrame
 
+from . import metrics
 from .config import settings
+from .clients import get_data_client
 from .config_strategy import PORTFOLIOS, DEFAULT_PORTFOLIO
+from .rate_limit import TokenBucket, call_with_retry, paced
+from .bar_store import AppendResult, BarStore, get_bar_store
+from .process_data import update_returns
+from .event_sink import get_sink
+from .timeframes import BASE_INTRADAY, alpaca_timeframe, bar_delta, is_intraday, resample_bars, source_timeframe, validate
 
 
 ROOT_DIR = Path(__file__).resolve().parents[1]
-DATA_DIR = ROOT_DIR / "data"
-LOG_DIR = ROOT_DIR / "logs"
-LOG_DIR.mkdir(exist_ok=True)
+LOG_DIR = ROOT_DIR / settings.log_dir
 
 AUDIT_LOG = LOG_DIR / "data_updates.csv"
 
+# default timeframe; intraday ones are built from the 1Min series (timeframes)
+TIMEFRAME = "1Day"
+
+AUDIT_FIELDS = [
+    "timestamp_utc",
+    "symbol",
+    "bars_file",
+    "had_existing_file",
+    "last_ts_before",
+    "requested_start",
+    "requested_end",
+    "new_rows_fetched",
+    "rows_after_save",
+    "status",
+    "message",
+    "timeframe",
+]
+
 
 def _append_audit(row: dict):
-    file_exists = AUDIT_LOG.exists()
-    with AUDIT_LOG.open("a", newline="") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=[
-                "timestamp_utc",
-                "symbol",
-                "bars_file",
-                "had_existing_file",
-                "last_ts_before",
-                "requested_start",
-                "requested_end",
-                "new_rows_fetched",
-                "rows_after_save",
-                "status",
-                "message",
-            ],
-        )
-        if not file_exists:
-            writer.writeheader()
-        writer.writerow(row)
-
-
-def _read_existing_last_ts(path: Path) -> tuple[bool, datetime | None]:
-    if not path.exists():
+    # buffered; flushed at the end of update_portfolio_data
+    get_sink(AUDIT_LOG, AUDIT_FIELDS).write(row)
+
+
+def _read_existing_last_ts(store: BarStore, symbol: str, timeframe: str = TIMEFRAME) -> tuple[bool, datetime | None]:
+    if not store.exists(symbol, timeframe):
         return False, None
 
-    df = pd.read_csv(path, parse_dates=["ts"])
-    if df.empty:
+    last_ts = store.last_ts(symbol, timeframe)
+    if last_ts is None:
         return True, None
 
-    df = df.dropna(subset=["ts"]).sort_values("ts")
-    last_ts = df["ts"].iloc[-1]
     # Ensure timezone-aware UTC for safe comparisons
     if last_ts.tzinfo is None:
         last_ts = last_ts.replace(tzinfo=timezone.utc)
     else:
         last_ts = last_ts.astimezone(timezone.utc)
-    return True, last_ts
+    return True, last_ts.to_pydatetime()
+
+
+def _make_data_client():
+    """The process-wide market-data client (shares the HTTP connection pool)."""
+    return get_data_client()
+
+
+def _empty_bars() -> pd.DataFrame:
+    return pd.DataFrame(columns=["ts", "open", "high", "low", "close", "volume"])
+
+
+def _normalize_bars(bars: pd.DataFrame, timeframe: str = TIMEFRAME) -> pd.DataFrame:
+    """Keep common columns (+ vwap/trade_count for minute bars, for resampling), ensure UTC ts, sort by ts."""
+    cols = ["ts", "open", "high", "low", "close", "volume"]
+    if is_intraday(timeframe):
+        cols += ["trade_count", "vwap"]
+    keep = [c for c in cols if c in bars.columns]
+    bars = bars[keep].copy()
+
+    # Ensure ts is datetime
+    bars["ts"] = pd.to_datetime(bars["ts"], utc=True)
+
+    return bars.sort_values("ts").reset_index(drop=True)
 
 
-def _fetch_daily_bars(symbol: str, start_utc: datetime, end_utc: datetime) -> pd.DataFrame:
+def _fetch_bars_batch(
+    symbols: list[str],
+    start_utc: datetime,
+    end_utc: datetime,
+    client: StockHistoricalDataClient | None = None,
+    timeframe: str = TIMEFRAME,
+) -> dict[str, pd.DataFrame]:
     """
-    Fetch daily bars from Alpaca between start_utc and end_utc (UTC).
-    Returns DataFrame with columns at least: ts, open, high, low, close, volume
+    Fetch bars for several symbols with a single StockBarsRequest (alpaca-py
+    follows next_page_token, so one call returns every page of the window;
+    under rate_limit.paced each page takes its own token).
+    Returns {symbol: DataFrame}; symbols without bars map to an empty frame.
     """
-    client = StockHistoricalDataClient(
-        api_key=settings.api_key,
-        secret_key=settings.api_secret,
-    )
+    if client is None:
+        client = _make_data_client()
 
     req = StockBarsRequest(
-        symbol_or_symbols=symbol,
-        timeframe=TimeFrame.Day,
+        symbol_or_symbols=list(symbols),
+        timeframe=alpaca_timeframe(timeframe),
         start=start_utc,
         end=end_utc,
         adjustment="raw",
@@ -85,7 +115,7 @@ def _fetch_daily_bars(symbol: str, start_utc: datetime, end_utc: datetime) -> pd
     bars = client.get_stock_bars(req).df
 
     if bars is None or len(bars) == 0:
-        return pd.DataFrame(columns=["ts", "open", "high", "low", "close", "volume"])
+        return {sym: _empty_bars() for sym in symbols}
 
     # Alpaca returns multi-index df: (symbol, timestamp)
     bars = bars.reset_index()
@@ -94,118 +124,283 @@ def _fetch_daily_bars(symbol: str, start_utc: datetime, end_utc: datetime) -> pd
     if "timestamp" in bars.columns:
         bars = bars.rename(columns={"timestamp": "ts"})
 
-    # Keep only this symbol (defensive)
-    if "symbol" in bars.columns:
-        bars = bars[bars["symbol"] == symbol].copy()
+    if "symbol" not in bars.columns:
+        # Single-symbol responses may come back without the symbol level
+        if len(symbols) != 1:
+            raise ValueError("Multi-symbol bars response is missing the 'symbol' column")
+        bars["symbol"] = symbols[0]
 
-    # Keep common columns
-    keep = [c for c in ["ts", "open", "high", "low", "close", "volume"] if c in bars.columns]
-    bars = bars[keep].copy()
-
-    # Ensure ts is datetime
-    bars["ts"] = pd.to_datetime(bars["ts"], utc=True)
+    by_symbol = {sym: grp for sym, grp in bars.groupby("symbol", sort=False)}
 
-    return bars.sort_values("ts").reset_index(drop=True)
+    return {
+        sym: _normalize_bars(by_symbol[sym], timeframe) if sym in by_symbol else _empty_bars()
+        for sym in symbols
+    }
 
 
-def _merge_save_bars(existing_path: Path, new_bars: pd.DataFrame) -> tuple[int, int]:
+def _fetch_daily_bars(
+    symbol: str,
+    start_utc: datetime,
+    end_utc: datetime,
+    client: StockHistoricalDataClient | None = None,
+) -> pd.DataFrame:
     """
-    Merge new bars into existing CSV:
-    - dedupe on ts
-    - sort by ts
-    Returns (new_rows_added, total_rows_after_save)
+    Fetch daily bars from Alpaca between start_utc and end_utc (UTC).
+    Returns DataFrame with columns at least: ts, open, high, low, close, volume
     """
-    if existing_path.exists():
-        df_old = pd.read_csv(existing_path, parse_dates=["ts"])
-        df_old["ts"] = pd.to_datetime(df_old["ts"], utc=True)
-    else:
-        df_old = pd.DataFrame(columns=["ts", "open", "high", "low", "close", "volume"])
-
-    before = len(df_old)
+    return _fetch_bars_batch([symbol], start_utc, end_utc, client=client)[symbol]
 
-    if not new_bars.empty:
-        df = pd.concat([df_old, new_bars], ignore_index=True)
-    else:
-        df = df_old.copy()
 
-    df = df.drop_duplicates(subset=["ts"]).sort_values("ts").reset_index(drop=True)
+def _fetch_windows(start_utc: datetime, end_utc: datetime, timeframe: str) -> list[tuple[datetime, datetime]]:
+    """
+    Split [start_utc, end_utc] into request windows: one for daily bars,
+    settings.intraday_chunk_days each for minute bars, so a long backfill is
+    a series of bounded requests that are retried (and saved) one by one.
+    """
+    if not is_intraday(timeframe):
+        return [(start_utc, end_utc)]
+    step = timedelta(days=max(1, settings.intraday_chunk_days))
+    windows = []
+    while start_utc < end_utc:
+        windows.append((start_utc, min(start_utc + step, end_utc)))
+        start_utc = start_utc + step
+    return windows
+
+
+def _plan_batches(
+    plans: list[dict],
+    batch_size: int,
+    start_tolerance_days: int,
+) -> list[tuple[datetime, list[dict]]]:
+    """
+    Group per-symbol plans into multi-symbol requests.
 
-    after = len(df)
-    new_rows_added = max(0, after - before)
+    - Plans are sorted by start_utc; a batch is closed once it holds batch_size
+      symbols or the next start is more than start_tolerance_days after the
+      batch's first (earliest) start.
+    - Each batch is requested from its earliest start; rows before a symbol's
+      own start are dropped again after the fetch.
+    """
+    batch_size = max(1, int(batch_size))
+    tolerance = timedelta(days=start_tolerance_days)
+
+    batches: list[tuple[datetime, list[dict]]] = []
+    for plan in sorted(plans, key=lambda p: p["start_utc"]):
+        if (
+            batches
+            and len(batches[-1][1]) < batch_size
+            and plan["start_utc"] - batches[-1][0] <= tolerance
+        ):
+            batches[-1][1].append(plan)
+        else:
+            batches.append((plan["start_utc"], [plan]))
+    return batches
 
-    existing_path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(existing_path, index=False)
 
-    return new_rows_added, after
+def _merge_save_bars(store: BarStore, symbol: str, new_bars: pd.DataFrame, timeframe: str = TIMEFRAME) -> AppendResult:
+    """
+    Merge new bars into the stored series:
+    - appends bars newer than the last stored ts without rewriting history
+    - dedupes on ts and rewrites only when older bars are backfilled
+    """
+    return store.append(symbol, timeframe, new_bars)
 
 
-def _write_returns_only(bars_csv: Path, returns_csv: Path):
-    df = pd.read_csv(bars_csv, parse_dates=["ts"])
-    df = df.sort_values("ts").reset_index(drop=True)
-    df["return"] = df["close"].pct_change()
-    df = df.dropna(subset=["return"])[["ts", "return"]]
-    returns_csv.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(returns_csv, index=False)
+def resample_into(store: BarStore, symbol: str, timeframe: str) -> AppendResult:
+    """
+    Extend a higher intraday timeframe (and its returns) from the stored
+    1Min bars: only minute bars after the last stored bucket are read, and
+    only complete buckets are appended.
+    """
+    last = store.last_ts(symbol, timeframe)
+    start = None if last is None else last + bar_delta(timeframe)
+    minutes = store.read(symbol, BASE_INTRADAY, start=start)
+    saved = store.append(symbol, timeframe, resample_bars(minutes, timeframe))
+    update_returns(store, symbol, timeframe, saved)
+    return saved
 
 
 def update_portfolio_data(
     portfolio_name: str = DEFAULT_PORTFOLIO,
-    lookback_days_if_missing: int = 3650,  # ~10 years
+    lookback_days_if_missing: int | None = None,
     end_buffer_days: int = 3,              # extend end a bit to avoid market holiday gaps
+    batch_size: int | None = None,
+    start_tolerance_days: int = 5,
+    workers: int = 1,
+    calls_per_minute: int | None = None,
+    store: BarStore | None = None,
+    timeframe: str = TIMEFRAME,
 ):
     """
-    Incrementally update daily bars + returns-only CSVs for all symbols in a portfolio.
-
-    - If bars CSV doesn't exist, fetch lookback_days_if_missing of history.
-    - If it exists, fetch from last_ts + 1 day to now + end_buffer_days.
-    - Always rewrites returns-only CSV from bars CSV (fast enough).
-    - Logs one audit row per symbol to logs/data_updates.csv
+    Incrementally update bars + returns-only series for all symbols in a portfolio.
+
+    - Bars/returns live in the bar store (default: settings.bar_store, CSV).
+    - timeframe "1Day" fetches daily bars. Intraday timeframes fetch 1Min
+      bars and, for 5Min/15Min/..., resample the stored minute bars into the
+      requested timeframe (resample_into) instead of fetching it separately.
+    - If no bars are stored yet, fetch lookback_days_if_missing of history
+      (default: ~10 years daily, settings.intraday_lookback_days intraday).
+    - If it exists, fetch from last_ts + one bar to now + end_buffer_days.
+      Minute bars are requested in windows of settings.intraday_chunk_days,
+      each saved as soon as it arrives; a failed window stops that batch so
+      no gap is left behind (the next run resumes from the last saved bar).
+    - Symbols with similar start dates (within start_tolerance_days) are fetched
+      together, up to batch_size symbols per request (default: settings.fetch_batch_size).
+      One data client is shared by the whole run.
+    - With workers > 1, batches are fetched and saved on a thread pool; all
+      requests share a token bucket of calls_per_minute (default:
+      settings.api_calls_per_minute), one token per page, and retry 429/5xx
+      with backoff (call_with_retry; alpaca-py's own retry is turned off).
+    - Returns are extended incrementally from the newly appended bars; the
+      returns series is only rebuilt when bar history was rewritten.
+    - Logs one audit row per symbol to logs/data_updates.csv (buffered
+      event_sink, written in batches and flushed before returning)
     """
-    symbols = PORTFOLIOS[portfolio_name]
+    # Each symbol owns its bars/returns files, so duplicates must not race
+    symbols = list(dict.fromkeys(PORTFOLIOS[portfolio_name]))
+    fetch_tf = source_timeframe(validate(timeframe))
+    derive_tf = timeframe if timeframe != fetch_tf else None
+    if lookback_days_if_missing is None:
+        lookback_days_if_missing = settings.intraday_lookback_days if is_intraday(timeframe) else 3650
+    if batch_size is None:
+        batch_size = settings.fetch_batch_size
+    if calls_per_minute is None:
+        calls_per_minute = settings.api_calls_per_minute
+    if store is None:
+        store = get_bar_store()
 
     now_utc = datetime.now(timezone.utc)
     end_utc = now_utc + timedelta(days=end_buffer_days)
 
-    for sym in symbols:
-        bars_path = DATA_DIR / f"{sym}_1Day.csv"
-        returns_path = DATA_DIR / f"{sym}_1Day_returns_only.csv"
-
-        had_file, last_ts = _read_existing_last_ts(bars_path)
-
-        if last_ts is None:
-            start_utc = now_utc - timedelta(days=lookback_days_if_missing)
-        else:
-            # start after the last saved day (daily bars)
-            start_utc = last_ts + timedelta(days=1)
-
-        audit = {
-            "timestamp_utc": datetime.now(timezone.utc).isoformat(),
-            "symbol": sym,
-            "bars_file": str(bars_path),
-            "had_existing_file": had_file,
-            "last_ts_before": "" if last_ts is None else last_ts.isoformat(),
-            "requested_start": start_utc.isoformat(),
-            "requested_end": end_utc.isoformat(),
-            "new_rows_fetched": 0,
-            "rows_after_save": 0,
-            "status": "started",
-            "message": "",
-        }
+    # One index read for planning, one index flush at the end of the run
+    with store.index.batch():
+        plans = []
+        for sym in symbols:
+            had_file, last_ts = _read_existing_last_ts(store, sym, fetch_tf)
+
+            if last_ts is None:
+                start_utc = now_utc - timedelta(days=lookback_days_if_missing)
+            else:
+                # start after the last saved bar
+                start_utc = last_ts + bar_delta(fetch_tf)
+
+            plans.append(
+                {
+                    "symbol": sym,
+                    "had_file": had_file,
+                    "last_ts": last_ts,
+                    "start_utc": start_utc,
+                    "fetched": 0,
+                    "added": 0,
+                    "total": store.count(sym, fetch_tf) if had_file else 0,
+                    "derived": None,
+                    "error": None,
+                }
+            )
+
+        if workers > 1:
+            # Give every worker at least one batch to work on
+            batch_size = min(batch_size, -(-len(plans) // workers))
+
+        client = _make_data_client()
+        bucket = TokenBucket(calls_per_minute)
+        batches = _plan_batches(plans, batch_size, start_tolerance_days)
+
+        def run_batch(batch_start: datetime, batch: list[dict]):
+            for window_start, window_end in _fetch_windows(batch_start, end_utc, fetch_tf):
+                live = [p for p in batch if p["error"] is None and p["start_utc"] <= window_end]
+                if not live:
+                    continue
+                try:
+                    # one token per page requested, retries included
+                    with metrics.timer("fetch"), paced(bucket):
+                        fetched = call_with_retry(
+                            lambda: _fetch_bars_batch(
+                                [p["symbol"] for p in live],
+                                start_utc=window_start,
+                                end_utc=window_end,
+                                client=client,
+                                timeframe=fetch_tf,
+                            )
+                        )
+                    metrics.incr("fetch.requests")
+                except Exception as e:
+                    # later windows would leave a gap in the stored series
+                    for plan in batch:
+                        plan["error"] = plan["error"] or e
+                    break
+
+                for plan in live:
+                    _update_symbol(store, plan, fetched.get(plan["symbol"]), fetch_tf)
+
+            for plan in batch:
+                if derive_tf is not None and plan["error"] is None:
+                    try:
+                        with metrics.timer("resample", symbol=plan["symbol"]):
+                            plan["derived"] = resample_into(store, plan["symbol"], derive_tf)
+                    except Exception as e:
+                        plan["error"] = e
+                _append_audit(_audit_row(store, plan, end_utc, timeframe))
 
         try:
-            new_bars = _fetch_daily_bars(sym, start_utc=start_utc, end_utc=end_utc)
-            audit["new_rows_fetched"] = int(len(new_bars))
-
-            new_added, total_after = _merge_save_bars(bars_path, new_bars)
-            audit["rows_after_save"] = int(total_after)
-
-            _write_returns_only(bars_path, returns_path)
-
-            audit["status"] = "success"
-            audit["message"] = f"added={new_added}, saved_total={total_after}"
-
-        except Exception as e:
-            audit["status"] = "error"
-            audit["message"] = repr(e)
-
-        _append_audit(audit)
+            if workers <= 1:
+                for batch_start, batch in batches:
+                    run_batch(batch_start, batch)
+            else:
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="update") as pool:
+                    futures = [pool.submit(run_batch, batch_start, batch) for batch_start, batch in batches]
+                    for fut in futures:
+                        fut.result()
+        finally:
+            get_sink(AUDIT_LOG, AUDIT_FIELDS).flush()
+
+
+def _update_symbol(
+    store: BarStore,
+    plan: dict,
+    new_bars: pd.DataFrame | None,
+    timeframe: str = TIMEFRAME,
+):
+    """Merge one fetch window of a symbol's bars and extend its returns; errors are kept on the plan."""
+    sym = plan["symbol"]
+    try:
+        # Batches are requested from their earliest start; drop rows before ours
+        new_bars = new_bars[new_bars["ts"] >= plan["start_utc"]]
+        plan["fetched"] += int(len(new_bars))
+        metrics.incr("bars_fetched", len(new_bars), symbol=sym)
+
+        with metrics.timer("merge", symbol=sym):
+            saved = _merge_save_bars(store, sym, new_bars, timeframe)
+        plan["added"] += saved.added
+        plan["total"] = int(saved.total)
+        metrics.incr("bars_added", saved.added, symbol=sym)
+
+        with metrics.timer("returns", symbol=sym):
+            update_returns(store, sym, timeframe, saved)
+    except Exception as e:
+        plan["error"] = e
+
+
+def _audit_row(store: BarStore, plan: dict, end_utc: datetime, timeframe: str) -> dict:
+    last_ts = plan["last_ts"]
+    fetch_tf = source_timeframe(timeframe)
+    audit = {
+        "timestamp_utc": datetime.now(timezone.utc).isoformat(),
+        "symbol": plan["symbol"],
+        "bars_file": str(store.path_for(plan["symbol"], fetch_tf)),
+        "had_existing_file": plan["had_file"],
+        "last_ts_before": "" if last_ts is None else last_ts.isoformat(),
+        "requested_start": plan["start_utc"].isoformat(),
+        "requested_end": end_utc.isoformat(),
+        "new_rows_fetched": plan["fetched"],
+        "rows_after_save": plan["total"],
+        "status": "success",
+        "message": f"added={plan['added']}, saved_total={plan['total']}",
+        "timeframe": timeframe,
+    }
+    if plan["derived"] is not None:
+        audit["message"] += f", {timeframe}_added={plan['derived'].added}, {timeframe}_total={plan['derived'].total}"
+    if plan["error"] is not None:
+        audit["status"] = "error"
+        audit["message"] = repr(plan["error"])
+    return audit
@@ -0,0 +1,93 @@
+import pandas as pd
+import pytest
+
+from src.bar_index import frame_hash
+from src.bar_store import ColumnarBarStore, CsvBarStore
+
+
+def bars(timestamps, close=1.0) -> pd.DataFrame:
+    ts = pd.to_datetime(timestamps, utc=True)
+    n = len(ts)
+    return pd.DataFrame(
+        {"ts": ts, "open": [close] * n, "high": [close] * n, "low": [close] * n,
+         "close": [close] * n, "volume": [100.0] * n}
+    )
+
+
+def minutes(day: str, n: int = 3) -> list[pd.Timestamp]:
+    # 10:00 New York onwards, all on the same market day
+    start = pd.Timestamp(f"{day} 15:00", tz="UTC")
+    return [start + pd.Timedelta(minutes=i) for i in range(n)]
+
+
+@pytest.fixture(params=["csv", "parquet"])
+def store(request, tmp_path):
+    return CsvBarStore(tmp_path) if request.param == "csv" else ColumnarBarStore(tmp_path, fmt="parquet")
+
+
+def assert_index_matches(store, symbol, timeframe):
+    entry = store.info(symbol, timeframe)
+    df = store.read(symbol, timeframe)
+    assert entry["rows"] == len(df)
+    assert pd.Timestamp(entry["last_ts"]) == df["ts"].max()
+    assert int(entry["content_hash"], 16) == frame_hash(df)
+
+
+def test_daily_tail_append_skips_stored_rows(store):
+    store.write("SPY", "1Day", bars(pd.date_range("2024-01-01", periods=5, freq="D")))
+
+    res = store.append("SPY", "1Day", bars(pd.date_range("2024-01-04", periods=4, freq="D")))
+
+    assert (res.added, res.total, res.rewritten) == (2, 7, False)
+    assert list(res.appended["ts"]) == list(pd.date_range("2024-01-06", periods=2, freq="D", tz="UTC"))
+    assert res.prev_last_ts == pd.Timestamp("2024-01-05", tz="UTC")
+    assert_index_matches(store, "SPY", "1Day")
+
+
+def test_daily_backfill_rewrites_and_keeps_existing_rows(store):
+    store.write("SPY", "1Day", bars(pd.date_range("2024-01-03", periods=3, freq="D"), close=1.0))
+
+    res = store.append("SPY", "1Day", bars(["2024-01-01", "2024-01-03"], close=2.0))
+
+    assert (res.added, res.total, res.rewritten) == (1, 4, True)
+    df = store.read("SPY", "1Day")
+    assert df["ts"].is_monotonic_increasing
+    # existing rows win on duplicate timestamps
+    assert df.set_index("ts").loc[pd.Timestamp("2024-01-03", tz="UTC"), "close"] == 1.0
+    assert_index_matches(store, "SPY", "1Day")
+
+
+def test_partitioned_tail_append_adds_a_partition(store):
+    store.write("SPY", "1Min", bars(minutes("2024-01-02") + minutes("2024-01-03")))
+
+    res = store.append("SPY", "1Min", bars(minutes("2024-01-03", 5) + minutes("2024-01-04")))
+
+    assert (res.added, res.total, res.rewritten) == (5, 11, False)
+    days = [day for day, _ in store._partitions(store.path_for("SPY", "1Min"))]
+    assert days == ["2024-01-02", "2024-01-03", "2024-01-04"]
+    assert_index_matches(store, "SPY", "1Min")
+
+
+def test_partitioned_backfill_reads_only_affected_days(store, monkeypatch):
+    days = ["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"]
+    store.write("SPY", "1Min", bars([ts for day in days for ts in minutes(day)]))
+    path = store.path_for("SPY", "1Min")
+
+    reads = []
+    read = store._read
+    monkeypatch.setattr(store, "_read", lambda p: reads.append(p) or read(p))
+
+    # one new minute inside 2024-01-03, one already stored minute of the same day
+    new = bars([minutes("2024-01-03")[0] - pd.Timedelta(minutes=1), minutes("2024-01-03")[1]], close=2.0)
+    res = store.append("SPY", "1Min", new)
+
+    assert (res.added, res.total, res.rewritten) == (1, 13, True)
+    touched = {p for p in reads if "2024-01-03" in str(p)}
+    assert touched and touched == set(reads)
+    monkeypatch.undo()
+
+    df = store.read("SPY", "1Min")
+    assert len(df) == 13 and df["ts"].is_monotonic_increasing
+    assert df.set_index("ts").loc[minutes("2024-01-03")[1], "close"] == 1.0
+    assert_index_matches(store, "SPY", "1Min")
+    assert [day for day, _ in store._partitions(path)] == days
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import pytest
+from alpaca.common.exceptions import APIError
+
+from src.order_dispatch import dispatch_orders, is_bot_order, make_client_order_id, submit_with_retry
+
+
+def api_error(status: int, message: str) -> APIError:
+    return APIError(f'{{"code": {status}00000, "message": "{message}"}}', SimpleNamespace(response=SimpleNamespace(status_code=status)))
+
+
+DUPLICATE = api_error(422, "client_order_id must be unique")
+UNAVAILABLE = api_error(503, "service unavailable")
+ORDER = {"symbol": "SPY", "side": "buy", "notional": 1.0, "signal": "long", "forecast_return": 0.01}
+
+
+class Broker:
+    """Raises the queued errors in turn, then accepts; remembers accepted client_order_ids."""
+
+    def __init__(self, *errors, lookup_error=None):
+        self.errors = list(errors)
+        self.lookup_error = lookup_error
+        self.submitted: list[dict] = []
+        self.accepted: dict[str, str] = {}
+
+    def submit_market_order(self, symbol, side, notional_usd=None, client_order_id=None, qty=None):
+        self.submitted.append({"symbol": symbol, "client_order_id": client_order_id, "qty": qty})
+        if self.errors:
+            raise self.errors.pop(0)
+        self.accepted[client_order_id] = f"order-{len(self.accepted)}"
+        return SimpleNamespace(id=self.accepted[client_order_id])
+
+    def get_order_by_client_id(self, client_order_id):
+        if self.lookup_error is not None:
+            raise self.lookup_error
+        return SimpleNamespace(id=self.accepted.get(client_order_id, "lost-order"))
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr("src.order_dispatch.time.sleep", lambda s: None)
+    monkeypatch.setattr("src.rate_limit.time.sleep", lambda s: None)
+
+
+def test_client_order_id_is_deterministic_and_marks_bot_orders():
+    coid = make_client_order_id("run1", 3, ORDER)
+    assert coid == make_client_order_id("run1", 3, ORDER) == "arima-run1-00003-SPY-buy"
+    assert is_bot_order(SimpleNamespace(client_order_id=coid))
+    assert not is_bot_order(SimpleNamespace(client_order_id="manual-1"))
+    assert not is_bot_order(SimpleNamespace(client_order_id=None))
+
+
+def test_duplicate_id_after_lost_response_looks_up_the_original():
+    # attempt 1 reached the broker but its response was lost; attempt 2 is rejected as a duplicate
+    broker = Broker(UNAVAILABLE, DUPLICATE)
+    res = submit_with_retry(broker, ORDER, "arima-run1-00000-SPY-buy")
+
+    assert (res.status, res.order_id, res.attempts) == ("success", "lost-order", 2)
+    assert {o["client_order_id"] for o in broker.submitted} == {"arima-run1-00000-SPY-buy"}
+
+
+def test_duplicate_id_on_first_attempt_is_an_error():
+    # no earlier attempt of ours: the id clashes with some other order
+    res = submit_with_retry(Broker(DUPLICATE), ORDER, "arima-run1-00000-SPY-buy")
+    assert (res.status, res.order_id, res.attempts) == ("error", "", 1)
+    assert res.error.startswith("APIError")
+
+
+def test_failed_duplicate_lookup_is_an_error():
+    broker = Broker(UNAVAILABLE, DUPLICATE, lookup_error=api_error(404, "order not found"))
+    res = submit_with_retry(broker, ORDER, "arima-run1-00000-SPY-buy")
+    assert res.status == "error" and res.error.startswith("duplicate client_order_id, lookup failed")
+
+
+def test_dispatch_keeps_input_order_and_passes_qty():
+    orders = [dict(ORDER, symbol=s) for s in ("AAA", "BBB", "CCC")]
+    orders[1].update(side="sell", qty=2.5)
+    broker = Broker()
+    results = dispatch_orders(broker, orders, workers=3, calls_per_minute=6000, run_id="run1")
+
+    assert [r.order["symbol"] for r in results] == ["AAA", "BBB", "CCC"]
+    assert all(r.status == "success" for r in results)
+    assert [r.client_order_id for r in results] == [make_client_order_id("run1", i, o) for i, o in enumerate(orders)]
+    assert {o["symbol"]: o["qty"] for o in broker.submitted} == {"AAA": None, "BBB": 2.5, "CCC": None}
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.portfolio import fixed_notional_targets, order_records, rebalance_orders, target_weights
+
+
+def signals(rows) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=["symbol", "signal", "forecast_return"])
+
+
+def by_symbol(orders: pd.DataFrame) -> dict:
+    return orders.set_index("symbol")[["side", "notional"]].apply(tuple, axis=1).to_dict()
+
+
+def test_orders_net_targets_against_current_holdings():
+    sig = signals([("AAA", "long", 0.01), ("BBB", "long", 0.02), ("CCC", "flat", 0.0), ("DDD", "long", 0.01)])
+    targets = pd.Series({"AAA": 100.0, "BBB": 50.0, "CCC": 0.0, "DDD": 80.0})
+    current = pd.Series({"AAA": 100.0, "BBB": 80.0, "CCC": 30.0, "ZZZ": 500.0})
+
+    orders = rebalance_orders(targets, sig, current, min_trade=1.0)
+
+    # AAA already on target; ZZZ has no target and is left alone
+    assert by_symbol(orders) == {"BBB": ("sell", 30.0), "CCC": ("sell", 30.0), "DDD": ("buy", 80.0)}
+    assert orders.set_index("symbol").loc["DDD", "current"] == 0.0
+
+
+def test_orders_below_min_trade_are_dropped():
+    sig = signals([("AAA", "long", 0.01), ("BBB", "long", 0.01)])
+    targets = pd.Series({"AAA": 100.0, "BBB": 100.0})
+    current = pd.Series({"AAA": 99.5, "BBB": 97.0})
+
+    assert by_symbol(rebalance_orders(targets, sig, current, min_trade=1.0)) == {"BBB": ("buy", 3.0)}
+    assert rebalance_orders(targets, sig, current, min_trade=5.0).empty
+
+
+def test_repeated_symbols_are_netted_into_one_order():
+    sig = signals([("AAA", "short", -0.01), ("AAA", "long", 0.02)])
+    orders = rebalance_orders(fixed_notional_targets(sig, 10.0), sig)
+    assert by_symbol(orders) == {"AAA": ("buy", 10.0)}
+    assert orders["signal"].tolist() == ["long"]
+
+
+def test_short_targets_are_held_at_zero_without_allow_short():
+    sig = signals([("AAA", "short", -0.01)])
+    targets = pd.Series({"AAA": -50.0})
+
+    assert rebalance_orders(targets, sig, allow_short=False).empty
+    assert by_symbol(rebalance_orders(targets, sig, pd.Series({"AAA": 20.0}), allow_short=False)) == {"AAA": ("sell", 20.0)}
+    assert by_symbol(rebalance_orders(targets, sig, allow_short=True)) == {"AAA": ("sell", 50.0)}
+
+
+def test_full_exits_sell_the_shares_held_and_resizes_stay_notional():
+    sig = signals([("AAA", "flat", 0.0), ("BBB", "long", 0.01)])
+    targets = pd.Series({"AAA": 0.0, "BBB": 40.0})
+    current = pd.Series({"AAA": 60.0, "BBB": 100.0})
+    shares = pd.Series({"AAA": 0.5, "BBB": 1.0})
+
+    records = {r["symbol"]: r for r in order_records(rebalance_orders(targets, sig, current, shares=shares))}
+
+    assert records["AAA"]["side"] == "sell" and records["AAA"]["qty"] == 0.5
+    assert records["BBB"]["side"] == "sell" and records["BBB"]["qty"] is None
+    assert records["BBB"]["notional"] == 60.0
+
+
+def test_target_weights_are_capped_per_symbol():
+    sig = signals([("AAA", "long", 0.03), ("BBB", "long", 0.01), ("CCC", "short", -0.02)])
+
+    w = target_weights(sig, long_exposure=0.2, short_exposure=-0.2, max_weight=0.12, scheme="forecast")
+
+    # AAA's 0.15 is capped at 0.12 and the rest is not handed to BBB
+    assert w.to_dict() == pytest.approx({"AAA": 0.12, "BBB": 0.05, "CCC": -0.12})
+    assert np.abs(w).sum() <= 0.4
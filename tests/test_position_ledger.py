@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from src import trading_engine
+from src.alpaca_client import AlpacaWrapper
+from src.clients import use_clients
+from src.fake_alpaca import FAKE_PRICE, FakeTradingClient
+from src.order_dispatch import make_client_order_id
+from src.position_ledger import PositionLedger
+
+
+@pytest.fixture
+def broker():
+    return FakeTradingClient()
+
+
+@pytest.fixture
+def alpaca(broker):
+    return AlpacaWrapper(client=broker)
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return PositionLedger(tmp_path / "bot_positions.json")
+
+
+def bot_buy(alpaca, symbol, shares, index=0, run_id="run1"):
+    order = {"symbol": symbol, "side": "buy"}
+    return alpaca.submit_market_order(
+        symbol, "buy", notional_usd=shares * FAKE_PRICE, client_order_id=make_client_order_id(run_id, index, order)
+    )
+
+
+def sync(ledger, alpaca):
+    snap = alpaca.snapshot(refresh=True)
+    return ledger.sync(alpaca, held=snap.qty, skip=snap.own_open)
+
+
+def test_only_the_bots_own_fills_count(alpaca, ledger):
+    bot_buy(alpaca, "AAPL", 2.0)
+    alpaca.submit_market_order("AAPL", "buy", notional_usd=5 * FAKE_PRICE, client_order_id="manual-1")
+    alpaca.submit_market_order("MSFT", "buy", notional_usd=FAKE_PRICE)
+
+    assert sync(ledger, alpaca) == pytest.approx({"AAPL": 2.0})
+
+
+def test_canceled_orders_count_zero(broker, alpaca, ledger):
+    broker.fill_orders = False
+    bot_buy(alpaca, "AAPL", 2.0)
+
+    # still open: left to own_pending, not applied
+    assert sync(ledger, alpaca) == {}
+    assert alpaca.snapshot().own_pending["AAPL"] == pytest.approx(2.0 * FAKE_PRICE)
+
+    broker.cancel_open_orders()
+    assert sync(ledger, alpaca) == {}
+    assert ledger.positions() == {}
+
+
+def test_orders_open_at_one_sync_are_applied_once_filled(broker, alpaca, ledger):
+    broker.fill_orders = False
+    bot_buy(alpaca, "AAPL", 2.0)
+    assert sync(ledger, alpaca) == {}
+
+    broker.fill_open_orders()
+    assert sync(ledger, alpaca) == pytest.approx({"AAPL": 2.0})
+    # applied once, however often it is seen again
+    assert sync(ledger, alpaca) == pytest.approx({"AAPL": 2.0})
+
+
+def test_exits_ignore_trade_log_rotation(broker, tmp_path, monkeypatch):
+    monkeypatch.setattr(trading_engine, "TRADES_LOG", tmp_path / "trades.csv")
+    monkeypatch.setattr(trading_engine, "LEDGER_PATH", tmp_path / "bot_positions.json")
+    manual = broker.submit_order(SimpleNamespace(symbol="AAPL", side="buy", notional=None, qty=5.0))
+
+    def run(signal):
+        signals = pd.DataFrame({"symbol": ["AAPL"], "signal": [signal], "forecast_return": [0.0]})
+        with use_clients(trading=broker):
+            return trading_engine.execute_test_trades(signals, notional_usd=10.0, workers=1)
+
+    [buy] = run("long")
+    assert buy.status == "success" and not run("long")  # already held: no second buy
+
+    # the log rotated away; the ledger still knows which shares are the bot's
+    (tmp_path / "trades.csv").unlink()
+    [sell] = run("flat")
+    assert sell.order["side"] == "sell" and sell.order["qty"] == pytest.approx(10.0 / FAKE_PRICE)
+    assert broker.positions == pytest.approx({"AAPL": float(manual.qty)})
+
+
+def test_bot_shares_are_capped_at_the_account_position(broker, alpaca, ledger):
+    bot_buy(alpaca, "AAPL", 3.0)
+    sync(ledger, alpaca)
+
+    # 2 shares sold outside the bot
+    alpaca.submit_market_order("AAPL", "sell", qty=2.0, client_order_id="manual-sell")
+    assert sync(ledger, alpaca) == pytest.approx({"AAPL": 1.0})
+
+    alpaca.submit_market_order("AAPL", "sell", qty=1.0, client_order_id="manual-sell-2")
+    assert sync(ledger, alpaca) == {}
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.bar_store import CsvBarStore
+from src.process_data import update_returns
+
+
+def bars(start: str, closes) -> pd.DataFrame:
+    ts = pd.date_range(start, periods=len(closes), freq="D", tz="UTC")
+    return pd.DataFrame({"ts": ts, "open": closes, "high": closes, "low": closes, "close": closes, "volume": 1.0})
+
+
+@pytest.fixture
+def stores(tmp_path):
+    return CsvBarStore(tmp_path / "incremental"), CsvBarStore(tmp_path / "full")
+
+
+def test_incremental_returns_match_a_full_rebuild(stores):
+    inc, full = stores
+    closes = np.linspace(100.0, 120.0, 30)
+    for store in (inc, full):
+        store.write("SPY", "1Day", bars("2024-01-01", closes[:20]))
+        update_returns(store, "SPY", "1Day")
+
+    for chunk in (closes[20:25], closes[25:]):
+        start = inc.last_ts("SPY", "1Day") + pd.Timedelta(days=1)
+        for store in (inc, full):
+            res = store.append("SPY", "1Day", bars(str(start.date()), chunk))
+            assert not res.rewritten
+        # incremental: only the appended bars; full: no AppendResult → rebuild
+        assert update_returns(inc, "SPY", "1Day", res) == len(chunk)
+        update_returns(full, "SPY", "1Day")
+
+    got, want = inc.read("SPY", "1Day", kind="returns"), full.read("SPY", "1Day", kind="returns")
+    assert len(got) == len(closes) - 1
+    pd.testing.assert_frame_equal(got, want)
+    assert inc.info("SPY", "1Day", "returns")["content_hash"] == full.info("SPY", "1Day", "returns")["content_hash"]
+
+
+def test_backfill_rebuilds_returns(stores):
+    inc, full = stores
+    for store in (inc, full):
+        store.write("SPY", "1Day", bars("2024-01-05", [10.0, 11.0, 12.0]))
+        update_returns(store, "SPY", "1Day")
+
+    res = inc.append("SPY", "1Day", bars("2024-01-03", [8.0, 9.0]))
+    full.append("SPY", "1Day", bars("2024-01-03", [8.0, 9.0]))
+    assert res.rewritten
+
+    assert update_returns(inc, "SPY", "1Day", res) == 4
+    update_returns(full, "SPY", "1Day")
+    pd.testing.assert_frame_equal(inc.read("SPY", "1Day", kind="returns"), full.read("SPY", "1Day", kind="returns"))